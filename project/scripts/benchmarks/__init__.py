@@ -0,0 +1 @@
+"""Sahte LLM ve yerel MCP sunucusuyla çevrimdışı performans ölçümleri (bkz. benchmarks/run.py)."""
@@ -0,0 +1,91 @@
+"""LLMInterface ile aynı arayüze sahip, deterministik ve gecikmesi ayarlanabilir sahte model."""
+import asyncio
+import json
+import re
+from collections import Counter
+from typing import AsyncIterator, Optional
+
+# Soru içindeki anahtar kelimeye göre seçilecek araç (ilk eşleşen kazanır)
+TOOL_KEYWORDS = [
+    ("getFlightStatus", ("durum", "status", "rötar", "gecikme")),
+    ("listAirports", ("havaliman", "airport")),
+    ("searchFlights", ("uçuş", "bilet", "flight", "uçak")),
+]
+
+SAMPLE_ARGUMENTS = {
+    "searchFlights": {"origin": "IST", "destination": "ESB", "date": "2026-01-15", "passengers": 1},
+    "getFlightStatus": {"flightNumber": "TK2124"},
+    "listAirports": {},
+}
+
+
+class FakeLLM:
+    """Gemini yerine benchmark'larda kullanılan sahte LLM.
+
+    Gecikme `latency_ms + üretilen token / tokens_per_sec` olarak hesaplanır.
+    Yanıtlar `agent` parametresine göre üretilir; böylece graph gerçek
+    akıştaki gibi araç seçer, parametre çıkarır ve cevap üretir. Çağrı
+    sayıları ajan bazında `calls` içinde tutulur.
+    """
+
+    def __init__(self, latency_ms: float = 300.0, tokens_per_sec: float = 200.0,
+                 output_tokens: int = 80, model_name: str = "fake-llm"):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.output_tokens = output_tokens
+        self.model_name = model_name
+        self.calls = Counter()
+
+    def _delay(self, tokens: int) -> float:
+        return self.latency_ms / 1000 + (tokens / self.tokens_per_sec if self.tokens_per_sec else 0)
+
+    @staticmethod
+    def _question(prompt: str) -> str:
+        """Prompt'taki kullanıcı sorusunu (yoksa tüm prompt'u) döndür."""
+        match = re.search(r"User request: (.*)", prompt) or re.search(r"Latest user message: (.*)", prompt)
+        return (match.group(1) if match else prompt).lower()
+
+    def _pick_tool(self, prompt: str) -> str:
+        question = self._question(prompt)
+        for tool, keywords in TOOL_KEYWORDS:
+            if tool in prompt and any(keyword in question for keyword in keywords):
+                return tool
+        return "searchFlights" if "searchFlights" in prompt else "no_tool_found"
+
+    def _respond(self, prompt: str, agent: Optional[str]) -> str:
+        if agent == "tool_selecting":
+            return self._pick_tool(prompt)
+        if agent == "input_parameter":
+            for tool in ("getFlightStatus", "searchFlights"):
+                if any(f'"{name}"' in prompt for name in SAMPLE_ARGUMENTS[tool]):
+                    return json.dumps(SAMPLE_ARGUMENTS[tool])
+            return "{}"
+        if agent == "fused_tool_call":
+            tool = self._pick_tool(prompt)
+            return json.dumps({"tool": tool, "arguments": SAMPLE_ARGUMENTS.get(tool, {})})
+        if agent == "orchestrator":
+            return "new_request"
+        if agent == "history_summary":
+            return "Kullanıcı İstanbul'dan Ankara'ya uçuş arıyor ve seçenekleri karşılaştırıyor."
+        return " ".join(f"kelime{i}" for i in range(self.output_tokens))
+
+    def generate(self, question: str) -> str:
+        self.calls["sync"] += 1
+        return self._respond(question, None)
+
+    async def agenerate(self, question: str, timeout: Optional[float] = None,
+                        generation_config: Optional[dict] = None, agent: Optional[str] = None) -> str:
+        self.calls[agent or "unknown"] += 1
+        response = self._respond(question, agent)
+        await asyncio.sleep(self._delay(len(response.split())))
+        return response
+
+    async def astream(self, question: str, timeout: Optional[float] = None,
+                      agent: Optional[str] = None) -> AsyncIterator[str]:
+        self.calls[agent or "unknown"] += 1
+        words = self._respond(question, agent).split()
+        await asyncio.sleep(self.latency_ms / 1000)
+        for word in words:
+            if self.tokens_per_sec:
+                await asyncio.sleep(1 / self.tokens_per_sec)
+            yield word + " "
@@ -0,0 +1,66 @@
+"""Benchmark'lar için yerel stdio MCP sunucusu.
+
+Gerçek uç noktadaki uçuş araçlarına benzeyen, deterministik çıktılı birkaç araç
+sunar. `MCP_SERVER_COMMAND="python -m benchmarks.fake_mcp_server"` ile
+`open_client` npx mcp-remote yerine bu süreci başlatır.
+
+Ortam değişkenleri:
+    FAKE_MCP_LATENCY_MS  Her araç çağrısına eklenen gecikme (varsayılan 20)
+    FAKE_MCP_ROWS        searchFlights'ın döndürdüğü uçuş sayısı (varsayılan 50)
+"""
+import asyncio
+import json
+import os
+from mcp.server.fastmcp import FastMCP
+
+LATENCY = float(os.getenv("FAKE_MCP_LATENCY_MS", "20")) / 1000
+ROWS = int(os.getenv("FAKE_MCP_ROWS", "50"))
+
+AIRPORTS = [
+    {"code": "IST", "name": "Istanbul Airport", "city": "Istanbul"},
+    {"code": "SAW", "name": "Sabiha Gokcen", "city": "Istanbul"},
+    {"code": "ESB", "name": "Esenboga", "city": "Ankara"},
+    {"code": "ADB", "name": "Adnan Menderes", "city": "Izmir"},
+    {"code": "AYT", "name": "Antalya Airport", "city": "Antalya"},
+]
+
+mcp = FastMCP("benchmark-flights")
+
+
+@mcp.tool()
+async def searchFlights(origin: str, destination: str, date: str, passengers: int = 1) -> str:
+    """Search one-way flights between two airports on a given date (YYYY-MM-DD)."""
+    await asyncio.sleep(LATENCY)
+    flights = [{
+        "flightNumber": f"TK{2100 + i}",
+        "origin": origin,
+        "destination": destination,
+        "departureDate": date,
+        "departureTime": f"{6 + i % 16:02d}:{(i * 7) % 60:02d}",
+        "arrivalTime": f"{7 + i % 16:02d}:{(i * 7 + 15) % 60:02d}",
+        "price": 1200 + (i * 37) % 900,
+        "currency": "TRY",
+        "cabinClass": "ECONOMY" if i % 4 else "BUSINESS",
+        "seatsLeft": 9 - i % 9,
+        "aircraftType": "A321neo" if i % 2 else "B737-800",
+        "fareRules": "Change allowed with fee. Refund not allowed. Baggage 15kg included. " * 2,
+    } for i in range(ROWS)]
+    return json.dumps({"passengers": passengers, "count": len(flights), "flights": flights})
+
+
+@mcp.tool()
+async def getFlightStatus(flightNumber: str, date: str = "") -> str:
+    """Get the live status of a flight by flight number."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps({"flightNumber": flightNumber, "date": date, "status": "ON_TIME", "gate": "B12"})
+
+
+@mcp.tool()
+async def listAirports() -> str:
+    """List the airports served, with their codes and cities."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps({"airports": AIRPORTS})
+
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,273 @@
+"""Çevrimdışı benchmark çalıştırıcısı.
+
+Gerçek Gemini anahtarı veya uzak MCP uç noktası gerekmez: `FakeLLM` ve yerel
+stdio MCP sunucusu (`fake_mcp_server.py`) kullanılır. scripts dizininden:
+
+    python -m benchmarks.run                          # tüm senaryolar
+    python -m benchmarks.run --scenarios short,api --llm-latency-ms 100
+    python -m benchmarks.run --output report.json
+
+Senaryolar:
+    short       Çok sayıda kısa sohbet (oturum başına birkaç tur)
+    long        Tek oturumda uzun sohbet (varsayılan 200 tur)
+    concurrent  Aynı anda başlayan çok sayıda oturum (varsayılan 1000, 3 tur); her
+                oturum soru listesine farklı bir yerden başlar, böylece yük selamlaşma
+                kuralında kalmaz, araç seçimi, MCP ve durum yazma yolundan geçer
+    api         FastAPI uygulaması üzerinden /chat istekleri (ASGI, ağ yok)
+
+Her senaryo için düğüm bazında gecikme yüzdelikleri, tur/saniye, LLM çağrı
+sayıları, StateStore G/Ç (yazılan satırlar, dosya boyutu, önbellek) ve oturum
+başına bellek raporlanır.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench"
+SCENARIOS = ("short", "long", "concurrent", "api")
+
+QUESTIONS = [
+    "Merhaba",
+    "İstanbul'dan Ankara'ya 15 Ocak için uçuş bileti ara",
+    "daha fazla göster",
+    "TK2124 uçuşunun durumu nedir?",
+    "Hangi havalimanlarına uçuyorsunuz?",
+    "teşekkürler",
+]
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))], 2)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 2),
+            "p50": rank(50), "p95": rank(95), "p99": rank(99), "max": round(ordered[-1], 2)}
+
+
+def store_io(db_path: str) -> Dict[str, Any]:
+    """StateStore dosyasının satır sayıları ve boyutu (ayrı, salt okunur bağlantıyla)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        kinds = dict(conn.execute("SELECT kind, COUNT(*) FROM workflow_states GROUP BY kind").fetchall())
+        messages = conn.execute("SELECT COUNT(*) FROM conversation_messages").fetchone()[0]
+    finally:
+        conn.close()
+    sizes = {suffix or "db": os.path.getsize(db_path + suffix) if os.path.exists(db_path + suffix) else 0
+             for suffix in ("", "-wal")}
+    return {"state_rows": kinds, "message_rows": messages, "bytes": sizes}
+
+
+def io_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "state_rows_written": {kind: count - before["state_rows"].get(kind, 0)
+                               for kind, count in after["state_rows"].items()},
+        "message_rows_written": after["message_rows"] - before["message_rows"],
+        "db_bytes": after["bytes"],
+    }
+
+
+async def run_engine_scenario(name: str, sessions: int, turns: int, llm_options: dict, pool, store, db_path: str,
+                              stagger: bool = False):
+    from benchmarks.fake_llm import FakeLLM
+    from src.main.workflow import WorkflowEngine
+
+    llm = FakeLLM(**llm_options)
+    node_timings: Dict[str, List[float]] = defaultdict(list)
+    turn_latencies: List[float] = []
+    errors: List[str] = []
+    io_before = store_io(db_path)
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    engines = [WorkflowEngine(llm_interface=llm, client_session=await pool.acquire(BENCH_USER, BENCH_PASSWORD),
+                              data_store=store, session_id=f"{name}-{i}") for i in range(sessions)]
+
+    async def chat(index, engine):
+        offset = index if stagger else 0
+        for turn in range(turns):
+            started = time.perf_counter()
+            try:
+                result = await engine.process(QUESTIONS[(offset + turn) % len(QUESTIONS)])
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            turn_latencies.append((time.perf_counter() - started) * 1000)
+            for node, elapsed in (result.get("node_timings") or {}).items():
+                node_timings[node].append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(index, engine) for index, engine in enumerate(engines)))
+    wall = time.perf_counter() - started
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store.flush()
+    for engine in engines:
+        await engine.close()
+
+    completed = len(turn_latencies)
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "completed_turns": completed,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": round(wall, 2),
+        "turns_per_sec": round(completed / wall, 2) if wall else 0.0,
+        "turn_latency_ms": percentiles(turn_latencies),
+        "node_latency_ms": {node: percentiles(values) for node, values in sorted(node_timings.items())},
+        "llm_calls": dict(llm.calls),
+        "llm_calls_per_turn": round(sum(llm.calls.values()) / completed, 2) if completed else None,
+        "state_store_io": io_delta(io_before, store_io(db_path)),
+        "state_cache": store.cache_stats(),
+        "memory_per_session_kb": round((memory_after - memory_before) / 1024 / sessions, 1),
+    }
+
+
+async def run_api_scenario(sessions: int, turns: int, llm_options: dict, db_path: str):
+    import httpx
+    from benchmarks.fake_llm import FakeLLM
+
+    sys.path.insert(0, str(SCRIPTS_DIR / "chatbot-backend"))
+    import main as backend
+
+    llm = FakeLLM(**llm_options)
+    # Sunucu oturumlara LLMInterface.shared(api_key) ile model verir; sahte modeli ver
+    class FakeLLMPool(backend.LLMInterface):
+        @classmethod
+        def shared(cls, api_key):
+            return llm
+
+    backend.LLMInterface = FakeLLMPool
+    latencies: List[float] = []
+    errors: List[str] = []
+    io_before = store_io(db_path)
+
+    async with backend.lifespan(backend.app):
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            async def chat(session_index: int):
+                for turn in range(turns):
+                    payload = {"message": QUESTIONS[turn % len(QUESTIONS)], "session_id": f"api-{session_index}",
+                               "gemini_api_key": "fake", "mcp_user": BENCH_USER, "mcp_password": BENCH_PASSWORD}
+                    started = time.perf_counter()
+                    response = await client.post("/chat", json=payload)
+                    if response.status_code != 200:
+                        errors.append(f"{response.status_code}: {response.text[:200]}")
+                        continue
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(chat(i) for i in range(sessions)))
+            wall = time.perf_counter() - started
+            server_stats = (await client.get("/sessions/stats")).json()
+
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "completed_turns": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": round(wall, 2),
+        "turns_per_sec": round(len(latencies) / wall, 2) if wall else 0.0,
+        "request_latency_ms": percentiles(latencies),
+        "llm_calls": dict(llm.calls),
+        "state_store_io": io_delta(io_before, store_io(db_path)),
+        "server_stats": server_stats,
+    }
+
+
+async def main(args) -> Dict[str, Any]:
+    from src.agents.mcp_pool import MCPConnectionPool
+    from src.database.state_store import StateStore
+
+    llm_options = {"latency_ms": args.llm_latency_ms, "tokens_per_sec": args.tokens_per_sec,
+                   "output_tokens": args.output_tokens}
+    db_path = os.environ["STATE_DB_PATH"]
+    store = StateStore.shared()
+    pool = MCPConnectionPool()
+    report: Dict[str, Any] = {"config": vars(args), "scenarios": {}}
+
+    plan = {
+        "short": (args.short_sessions, args.short_turns),
+        "long": (1, args.long_turns),
+        "concurrent": (args.concurrent_sessions, args.concurrent_turns),
+    }
+    try:
+        for scenario in args.scenarios:
+            print(f"Running scenario '{scenario}'...", file=sys.stderr)
+            if scenario == "api":
+                result = await run_api_scenario(args.api_sessions, args.api_turns, llm_options, db_path)
+            else:
+                sessions, turns = plan[scenario]
+                result = await run_engine_scenario(scenario, sessions, turns, llm_options, pool, store, db_path,
+                                                   stagger=scenario == "concurrent")
+            report["scenarios"][scenario] = result
+    finally:
+        await pool.close()
+        StateStore.close_shared()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline workflow benchmarks with a fake LLM and a local MCP server.")
+    parser.add_argument("--scenarios", default="short,long,concurrent,api",
+                        type=lambda value: [item.strip() for item in value.split(",") if item.strip()])
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=80)
+    parser.add_argument("--short-sessions", type=int, default=50)
+    parser.add_argument("--short-turns", type=int, default=6)
+    parser.add_argument("--long-turns", type=int, default=200)
+    parser.add_argument("--concurrent-sessions", type=int, default=1000)
+    parser.add_argument("--concurrent-turns", type=int, default=3)
+    parser.add_argument("--api-sessions", type=int, default=20)
+    parser.add_argument("--api-turns", type=int, default=6)
+    parser.add_argument("--workdir", help="Directory for the benchmark databases (default: a temp dir)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    # api senaryosu uygulamanın lifespan'ini çalıştırır ve paylaşılan StateStore'u kapatır; en sona kalır
+    args.scenarios = [scenario for scenario in SCENARIOS if scenario in args.scenarios]
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="inzva-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # src modülleri import edilmeden önce: yerel MCP sunucusu ve ayrı veritabanları
+    os.environ["MCP_SERVER_COMMAND"] = f"{shlex.quote(sys.executable)} {shlex.quote(str(Path(__file__).with_name('fake_mcp_server.py')))}"
+    os.environ.setdefault("STATE_DB_PATH", os.path.join(workdir, "workflow_state.db"))
+    os.environ.setdefault("LLM_CACHE_DB_PATH", os.path.join(workdir, "llm_cache.db"))
+    os.environ["MCP_USER"], os.environ["MCP_PASSWORD"] = BENCH_USER, BENCH_PASSWORD
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    report = asyncio.run(main(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
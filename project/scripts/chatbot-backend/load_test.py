@@ -0,0 +1,274 @@
+"""Backend için asyncio tabanlı yük üreteci.
+
+Çok sayıda eşzamanlı oturumu gerçekçi, çok turlu senaryolarla çalıştırır ve
+throughput, p50/p95/p99 gecikme ve hata oranlarını raporlar.
+
+Varış modelleri:
+    closed  Sabit sayıda sanal kullanıcı (--sessions). Her biri senaryosunu
+            bitirip düşünme süresi (--think-time) bekledikten sonra yeni bir
+            oturumla devam eder; sistem yavaşladıkça yük de azalır.
+    open    Oturumlar sistemden bağımsız olarak Poisson süreciyle (--rate
+            oturum/saniye) gelir; sistem yavaşlarsa bekleyen istek sayısı artar.
+
+Örnekler:
+    python load_test.py --sessions 50 --ramp-up 10 --duration 60
+    python load_test.py --model open --rate 5 --duration 120 --stream
+    ADMIN_TOKEN=... python load_test.py --sessions 1 --iterations 1 --check-history
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Çok turlu örnek sohbetler (her oturum bunlardan birini baştan sona oynar)
+SCRIPTS = {
+    "flight_search": [
+        "Merhaba! Nasılsın?",
+        "İstanbul'dan Ankara'ya uçmak istiyorum",
+        "Yarın için, 1 yetişkin",
+        "En ucuz seçenek hangisi?",
+        "daha fazla göster",
+        "Teşekkürler",
+    ],
+    "flight_status": [
+        "TK2124 uçuşunun durumu nedir?",
+        "Peki kapı numarası ne?",
+        "Teşekkürler",
+    ],
+    "compare": [
+        "Önümüzdeki cuma İstanbul'dan Ankara ve İzmir uçuşlarını karşılaştır",
+        "Hangisi daha erken kalkıyor?",
+    ],
+    "small_talk": [
+        "Selam",
+        "Neler yapabiliyorsun?",
+        "Görüşürüz",
+    ],
+}
+
+
+def percentile(ordered: List[float], p: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))], 1)
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_token: List[float] = []
+        self.errors: Counter = Counter()
+        self.requests = 0
+        self.sessions_started = 0
+        self.sessions_completed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, endpoint: str, started: float, error: Optional[str] = None):
+        self.requests += 1
+        if error:
+            self.errors[f"{endpoint}: {error}"] += 1
+        else:
+            self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+
+    def summary(self, wall: float) -> Dict[str, Any]:
+        succeeded = sum(len(values) for values in self.latencies.values())
+        failed = sum(self.errors.values())
+
+        def describe(values: List[float]) -> Dict[str, Any]:
+            ordered = sorted(values)
+            return {"count": len(ordered), "p50_ms": percentile(ordered, 50), "p95_ms": percentile(ordered, 95),
+                    "p99_ms": percentile(ordered, 99), "max_ms": round(ordered[-1], 1) if ordered else None}
+
+        return {
+            "wall_seconds": round(wall, 2),
+            "requests": self.requests,
+            "succeeded": succeeded,
+            "failed": failed,
+            "error_rate": round(failed / self.requests, 4) if self.requests else 0.0,
+            "throughput_rps": round(succeeded / wall, 2) if wall else 0.0,
+            "sessions_started": self.sessions_started,
+            "sessions_completed": self.sessions_completed,
+            "max_in_flight": self.max_in_flight,
+            "latency": {endpoint: describe(values) for endpoint, values in sorted(self.latencies.items())},
+            "time_to_first_token": describe(self.first_token) if self.first_token else None,
+            "errors": dict(self.errors.most_common(10)),
+        }
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.stats = LoadStats()
+        self.completed_sessions: List[str] = []
+        limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+        self.client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+
+    def _payload(self, message: str, session_id: str) -> Dict[str, Any]:
+        payload = {"message": message, "session_id": session_id, "gemini_api_key": self.args.gemini_api_key}
+        if self.args.mcp_user and self.args.mcp_password:
+            payload.update(mcp_user=self.args.mcp_user, mcp_password=self.args.mcp_password)
+        return payload
+
+    async def _send(self, message: str, session_id: str) -> bool:
+        endpoint = "/chat/stream" if self.args.stream else "/chat"
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        started = time.perf_counter()
+        try:
+            if self.args.stream:
+                return await self._send_stream(message, session_id, started)
+            response = await self.client.post(endpoint, json=self._payload(message, session_id))
+            if response.status_code != 200:
+                self.stats.record(endpoint, started, f"HTTP {response.status_code}")
+                return False
+            self.stats.record(endpoint, started)
+            return True
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            self.stats.record(endpoint, started, type(e).__name__)
+            return False
+        finally:
+            self.stats.in_flight -= 1
+
+    async def _send_stream(self, message: str, session_id: str, started: float) -> bool:
+        endpoint = "/chat/stream"
+        async with self.client.stream("POST", endpoint, json=self._payload(message, session_id)) as response:
+            if response.status_code != 200:
+                self.stats.record(endpoint, started, f"HTTP {response.status_code}")
+                return False
+            first_token = True
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event.get("event") == "token" and first_token:
+                    first_token = False
+                    self.stats.first_token.append((time.perf_counter() - started) * 1000)
+                elif event.get("event") == "error":
+                    self.stats.record(endpoint, started, "stream error event")
+                    return False
+        self.stats.record(endpoint, started)
+        return True
+
+    async def run_session(self):
+        """Rastgele bir senaryoyu yeni bir oturumda baştan sona oyna."""
+        session_id = f"load-{uuid.uuid4()}"
+        script = SCRIPTS[random.choice(self.args.scripts)]
+        self.stats.sessions_started += 1
+        for turn, message in enumerate(script):
+            if turn and self.args.think_time > 0:
+                await asyncio.sleep(random.expovariate(1 / self.args.think_time))
+            if not await self._send(message, session_id):
+                return
+        self.stats.sessions_completed += 1
+        self.completed_sessions.append(session_id)
+
+    async def closed_loop(self, deadline: float):
+        async def user(index: int):
+            # Kullanıcılar ramp-up süresine yayılarak başlar
+            await asyncio.sleep(self.args.ramp_up * index / max(self.args.sessions, 1))
+            iterations = 0
+            while time.perf_counter() < deadline and (not self.args.iterations or iterations < self.args.iterations):
+                await self.run_session()
+                iterations += 1
+
+        await asyncio.gather(*(user(i) for i in range(self.args.sessions)))
+
+    async def open_loop(self, deadline: float):
+        tasks = set()
+        while time.perf_counter() < deadline:
+            task = asyncio.create_task(self.run_session())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(random.expovariate(self.args.rate))
+        # Gelişler durdu; süren oturumların bitmesini bekle
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def check_health(self) -> bool:
+        try:
+            response = await self.client.get("/health")
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            print(f"Health check failed: {e}", file=sys.stderr)
+            return False
+
+    async def check_history(self) -> Optional[Dict[str, Any]]:
+        """Tamamlanan bir oturumun geçmişinin sunucuda tam kaydedildiğini doğrula."""
+        if not self.completed_sessions:
+            return None
+        session_id = random.choice(self.completed_sessions)
+        response = await self.client.get(f"/sessions/{session_id}/history",
+                                          headers={"X-Admin-Token": self.args.admin_token or ""})
+        if response.status_code != 200:
+            return {"session_id": session_id, "ok": False, "status": response.status_code}
+        return {"session_id": session_id, "ok": True, "messages": response.json()["count"]}
+
+    async def run(self) -> Dict[str, Any]:
+        try:
+            if not await self.check_health():
+                raise SystemExit(f"Backend at {self.args.base_url} is not healthy; start it first.")
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            if self.args.model == "open":
+                await self.open_loop(deadline)
+            else:
+                await self.closed_loop(deadline)
+            report = {"config": {k: v for k, v in vars(self.args).items() if k not in ("gemini_api_key", "mcp_password", "admin_token")},
+                      **self.stats.summary(time.perf_counter() - started)}
+            if self.args.check_history:
+                report["history_check"] = await self.check_history()
+            return report
+        finally:
+            await self.client.aclose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Async load generator for the chatbot backend.")
+    parser.add_argument("--base-url", default=os.getenv("BACKEND_URL", "http://localhost:8080"))
+    parser.add_argument("--model", choices=("closed", "open"), default="closed", help="Arrival model")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent virtual users (closed loop)")
+    parser.add_argument("--rate", type=float, default=1.0, help="New sessions per second (open loop)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep generating load")
+    parser.add_argument("--iterations", type=int, default=0, help="Sessions per user in closed loop (0 = until duration)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which closed-loop users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between turns of a session")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS),
+                        type=lambda value: [item.strip() for item in value.split(",") if item.strip()])
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and measure time to first token")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--gemini-api-key", default=os.getenv("GEMINI_API_KEY", ""))
+    parser.add_argument("--mcp-user", default=os.getenv("MCP_USER"))
+    parser.add_argument("--mcp-password", default=os.getenv("MCP_PASSWORD"))
+    parser.add_argument("--check-history", action="store_true", help="Verify a finished session's stored history")
+    parser.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN"), help="X-Admin-Token for --check-history")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.scripts) - set(SCRIPTS)
+    if unknown:
+        parser.error(f"unknown scripts: {', '.join(sorted(unknown))} (available: {', '.join(SCRIPTS)})")
+    if args.model == "open" and args.rate <= 0:
+        parser.error("--rate must be positive for the open-loop model")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = asyncio.run(LoadGenerator(args).run())
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
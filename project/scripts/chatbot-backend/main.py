@@ -1,22 +1,57 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import sys
+import json
 from pathlib import Path
 import logging
+import secrets
+from contextlib import asynccontextmanager
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.main.workflow import WorkflowEngine
 import os
-from src.agents.utils import open_client
+from src.agents.mcp_pool import MCPConnectionPool
+from src.agents.tool_result_cache import tool_result_cache
+from src.agents.agent_orchestrator import routing_stats
+from src.agents.result_compactor import result_compactor
 from src.database.state_store import StateStore
 from src.main.model import LLMInterface
+from src.main.session_registry import SessionRegistry
+from src.main.history import history_manager
+from src.main.llm_cache import shared_cache_stats
+from src.main.telemetry import telemetry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Chatbot Backend API", version="Final")
+# Tüm sohbet oturumlarının paylaştığı MCP bağlantı havuzu
+mcp_pool = MCPConnectionPool()
+# Boyutu ve boşta kalma süresi sınırlı oturum kaydı
+session_engines = SessionRegistry()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # env'de kimlik bilgisi varsa bağlantıları önceden ısıt
+    mcp_user = os.getenv("MCP_USER")
+    mcp_password = os.getenv("MCP_PASSWORD")
+    prewarm_count = int(os.getenv("MCP_POOL_PREWARM", "1"))
+    if mcp_user and mcp_password and prewarm_count > 0:
+        try:
+            await mcp_pool.prewarm(mcp_user, mcp_password, count=prewarm_count)
+        except Exception as e:
+            logger.warning(f"MCP pool prewarm failed, connections will be opened on demand: {e}")
+    mcp_pool.start()
+    session_engines.start()
+    yield
+    await session_engines.close()
+    await mcp_pool.close()
+    # Kuyrukta bekleyen state kayıtlarını diske yaz
+    StateStore.close_shared()
+
+app = FastAPI(title="Chatbot Backend API", version="Final", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,8 +61,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-session_engines = {}
-
 class ChatRequest(BaseModel):
     message: str
     session_id: str
@@ -41,41 +74,127 @@ class ChatResponse(BaseModel):
     answer: str
     session_id: str
 
+def require_admin(x_admin_token: str | None = Header(None)):
+    """Oturum verisi döndüren yönetim uç noktaları için ADMIN_TOKEN kontrolü.
+
+    Oturum kimlikleri istemci tarafından seçilir ve gizli değildir; bu yüzden
+    bu uç noktalar ADMIN_TOKEN ayarlanmadıkça kapalıdır.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token header")
+
+async def get_session_engine(request: ChatRequest) -> WorkflowEngine:
+    session_id = request.session_id
+
+    async def create_engine():
+        logger.info(f"Creating new WorkflowEngine for session: {session_id}")
+        
+        # MCP bağlantısı - havuzdaki paylaşımlı npx süreçleri kullanılır.
+        # Önce istekten gelen kimlik bilgilerini kontrol et, yoksa env'den al.
+        mcp_user = request.mcp_user or os.getenv("MCP_USER")
+        mcp_password = request.mcp_password or os.getenv("MCP_PASSWORD")
+        if not mcp_user or not mcp_password:
+            raise RuntimeError("MCP kullanıcı bilgileri sağlanmadı. Request içinde veya MCP_USER/MCP_PASSWORD env'de olmalı.")
+        mcp_client = await mcp_pool.acquire(mcp_user, mcp_password)
+        
+        # LLM, kullanıcıdan gelen API anahtarı ile paylaşımlı havuzdan alınıyor
+        llm_interface = LLMInterface.shared(request.gemini_api_key)
+
+        engine = WorkflowEngine(
+            llm_interface=llm_interface,
+            client_session=mcp_client,
+            data_store=StateStore.shared(),
+            session_id=session_id
+        )
+        # Oturum daha önce başka bir worker'da (veya çıkarılmış bir engine'de) sürmüş olabilir
+        snapshot = await engine.rehydrate()
+        if snapshot["messages"]:
+            logger.info(f"Rehydrated session {session_id} on worker {os.getpid()}: {snapshot}")
+        return engine
+
+    return await session_engines.get_or_create(session_id, create_engine)
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     try:
-        session_id = request.session_id
-        
-        if session_id not in session_engines:
-            logger.info(f"Creating new WorkflowEngine for session: {session_id}")
-            
-            # MCP bağlantısı - konteyner içindeki npx'i çalıştıracağız.
-            # Önce istekten gelen kimlik bilgilerini kontrol et, yoksa env'den al.
-            mcp_user = request.mcp_user or os.getenv("MCP_USER")
-            mcp_password = request.mcp_password or os.getenv("MCP_PASSWORD")
-            if not mcp_user or not mcp_password:
-                raise RuntimeError("MCP kullanıcı bilgileri sağlanmadı. Request içinde veya MCP_USER/MCP_PASSWORD env'de olmalı.")
-            mcp_client = await open_client(mcp_user, mcp_password)
-            
-            # LLM, kullanıcıdan gelen API anahtarı ile başlatılıyor
-            llm_interface = LLMInterface(api_key=request.gemini_api_key)
-
-            session_engines[session_id] = WorkflowEngine(
-                llm_interface=llm_interface,
-                client_session=mcp_client,
-                data_store=StateStore(),
-                session_id=session_id
-            )
-
-        session_workflow = session_engines[session_id]
+        session_workflow = await get_session_engine(request)
         result = await session_workflow.process(request.message)
         answer = result.get('answer', 'An answer could not be generated.')
-        return ChatResponse(answer=answer, session_id=session_id)
+        return ChatResponse(answer=answer, session_id=request.session_id)
 
     except Exception as e:
         logger.error(f"Error during chat for session {request.session_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Düğüm ilerlemesini ve cevap token'larını Server-Sent Events olarak akıtır."""
+    try:
+        session_workflow = await get_session_engine(request)
+    except Exception as e:
+        logger.error(f"Error creating engine for session {request.session_id}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+
+    async def event_stream():
+        try:
+            async for event in session_workflow.astream(request.message):
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error during streamed chat for session {request.session_id}: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'event': 'error', 'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/health")
+async def health():
+    """Canlılık kontrolü; yük testleri başlamadan önce bunu çağırır."""
+    return {
+        "status": "ok",
+        "worker_pid": os.getpid(),
+        "live_sessions": session_engines.stats()["live_sessions"],
+        "mcp_connections": mcp_pool.stats()["connections"],
+    }
+
+@app.get("/sessions/{session_id}/history", dependencies=[Depends(require_admin)])
+async def session_history(session_id: str):
+    """Oturumun kayıtlı konuşma geçmişi (StateStore'dan). X-Admin-Token gerektirir."""
+    messages = await StateStore.shared().aget_latest_conversation(session_id)
+    if not messages:
+        raise HTTPException(status_code=404, detail=f"No history found for session {session_id}")
+    return {"session_id": session_id, "count": len(messages), "messages": messages}
+
+@app.get("/sessions/stats")
+async def session_stats():
+    return {
+        "sessions": session_engines.stats(),
+        "llm_pool": LLMInterface.pool_stats(),
+        "mcp_pool": mcp_pool.stats(),
+        "state_cache": StateStore.shared().cache_stats(),
+        "history": history_manager.stats(),
+        "llm_cache": shared_cache_stats(),
+        "tool_result_cache": tool_result_cache.stats(),
+        "routing": routing_stats(),
+        "tool_result_compaction": result_compactor.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metinleri: düğüm, LLM, MCP ve StateStore süre histogramları (TELEMETRY_ENABLED)."""
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces", dependencies=[Depends(require_admin)])
+async def recent_traces(limit: int = 100):
+    """Bellekte tutulan son span'ler (OpenTelemetry benzeri alanlarla). X-Admin-Token gerektirir;
+    span öznitelikleri oturum kimliklerini ve araç adlarını içerir."""
+    return {"enabled": telemetry.enabled, "spans": telemetry.recent_spans(limit)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8080, reload=True)
\ No newline at end of file
@@ -1,19 +1,31 @@
 # neuravoid/inzva_project_mcp/inzva_project_mcp-ede13d7216f472a3544df84fe293f51acc2d9f74/project/scripts/src/agents/agent_executing_tool.py
 
+import asyncio
+import os
 from loguru import logger
-from src.agents.utils import execute_tool_with_params
-from src.database.state_store import StateStore
+from src.agents.utils import execute_tool_with_params, get_tool_validator
 
 class ToolExecutingAgent():
+    """Seçilen aracı (veya çoklu plandaki tüm araç çağrılarını) çalıştırır.
 
-    def __init__(self, llm_interface=None, client_session=None, data_store=None):
-        self.llm_interface = llm_interface
-        self.client_session = client_session
-        self.data_store = data_store or StateStore()
+    `tool_calls` birden fazla çağrı içeriyorsa çağrılar birbirinden bağımsız
+    kabul edilir ve `asyncio.gather` ile eşzamanlı çalıştırılır. Eşzamanlılık
+    TOOL_MAX_CONCURRENCY, çağrı başına süre TOOL_CALL_TIMEOUT ile sınırlanır;
+    başarısız olan bir çağrı diğerlerini etkilemez, hatası kendi sonucuna yazılır.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+        self.call_timeout = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))
 
     async def process(self, state):
         """Process state and execute the selected tool."""
         logger.info("Processing in ToolExecutingAgent")
+        context = state["context"]
+
+        tool_calls = state.get('tool_calls') or []
+        if len(tool_calls) > 1:
+            return await self._process_many(state, tool_calls)
 
         selected_tool = state.get('selected_tool', {})
         # HATA DÜZELTİLDİ: 'input_params' yerine 'tool_inputs' kullanılıyor
@@ -24,16 +36,11 @@ class ToolExecutingAgent():
             logger.error("No valid tool selected for execution.")
             return {"tool_result": {"error": "No valid tool was selected to be executed."}}
 
-        logger.info(f"Executing tool '{tool_name}' with inputs: {tool_inputs}")
-
-        execution_result = await execute_tool_with_params(
-            tool_name,
-            tool_inputs,
-            self.client_session
-        )
-        logger.info(f"Executed tool {tool_name} with result: {execution_result}")
+        tool_inputs, execution_result = await self._execute(context, selected_tool, tool_inputs)
+        if execution_result.get("error") == "validation_error":
+            return {"tool_inputs": tool_inputs, "tool_result": execution_result}
         
-        self.data_store.save_state({
+        context.data_store.save_state({
             "current_agent": "tool_executing",
             "tool_result": execution_result
         }, state.get("session_id"))
@@ -41,4 +48,56 @@ class ToolExecutingAgent():
         # HATA DÜZELTİLDİ: State anahtarı 'tool_result' olarak güncellendi
         return {
             "tool_result": execution_result
-        }
\ No newline at end of file
+        }
+
+    async def _process_many(self, state, tool_calls):
+        context = state["context"]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(call):
+            async with semaphore:
+                try:
+                    return await self._execute(context, call["tool"], call.get("arguments") or {})
+                except Exception as e:
+                    logger.error(f"Tool call '{call['tool'].get('name')}' failed: {e}")
+                    return call.get("arguments") or {}, {"error": "execution_exception", "message": str(e)}
+
+        logger.info(f"Executing {len(tool_calls)} tool calls (max {self.max_concurrency} concurrent)")
+        outcomes = await asyncio.gather(*(run(call) for call in tool_calls))
+
+        executed_calls = [{**call, "arguments": tool_inputs} for call, (tool_inputs, _) in zip(tool_calls, outcomes)]
+        results = [{"tool": call["tool"]["name"], "arguments": tool_inputs, "result": result}
+                   for call, (tool_inputs, result) in zip(tool_calls, outcomes)]
+        failed = sum(1 for entry in results if "error" in entry["result"])
+        if failed:
+            logger.warning(f"{failed}/{len(results)} tool calls failed")
+
+        context.data_store.save_state({
+            "current_agent": "tool_executing",
+            "tool_result": results
+        }, state.get("session_id"))
+
+        return {"tool_calls": executed_calls, "tool_result": results}
+
+    async def _execute(self, context, selected_tool, tool_inputs):
+        """Tek bir çağrıyı doğrula ve çalıştır: (düzeltilmiş argümanlar, sonuç) döndürür."""
+        tool_name = selected_tool.get('name')
+
+        # Argümanlar şemaya uymuyorsa MCP'ye gitmeden eksik/hatalı alanları çıktı ajanına ilet
+        validator = await get_tool_validator(context.client_session, selected_tool)
+        tool_inputs, errors = validator(tool_inputs)
+        if errors:
+            logger.info(f"Skipping MCP call for '{tool_name}', local validation failed: {errors}")
+            return tool_inputs, {"error": "validation_error", "errors": errors}
+
+        logger.info(f"Executing tool '{tool_name}' with inputs: {tool_inputs}")
+        try:
+            execution_result = await asyncio.wait_for(
+                execute_tool_with_params(tool_name, tool_inputs, context.client_session),
+                timeout=self.call_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Tool '{tool_name}' timed out after {self.call_timeout} seconds.")
+            execution_result = {"error": "timeout", "message": f"Tool '{tool_name}' did not respond in {self.call_timeout} seconds."}
+        logger.info(f"Executed tool {tool_name} with result: {execution_result}")
+        return tool_inputs, execution_result
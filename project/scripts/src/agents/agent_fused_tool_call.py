@@ -0,0 +1,83 @@
+# src/agents/agent_fused_tool_call.py
+
+import json
+from loguru import logger
+from ..main.prompts import Prompts, format_prompt
+from .utils import get_structured_tools, parse_json_from_response
+from ..main.history import history_manager
+
+class FusedToolCallAgent():
+    """Araç seçimini ve parametre çıkarımını tek bir LLM çağrısında yapar.
+
+    Model, araçların input şemalarıyla birlikte sorgulanır ve JSON modunda
+    {"tool": ..., "arguments": {...}} veya birden fazla bağımsız çağrı için
+    {"calls": [...]} döndürmesi istenir. Yanıt çözümlenemezse
+    veya bilinmeyen bir araç seçilirse `fused_failed` işaretlenir ve graph iki
+    adımlı (seçim + parametre) yola geri döner.
+    """
+
+    def __init__(self):
+        self.prompt = Prompts.get_fused_tool_call_agent_prompt()
+
+    async def process(self, state):
+        logger.info("Processing in FusedToolCallAgent")
+        context = state["context"]
+
+        try:
+            available_tools_list = await get_structured_tools(context.client_session)
+            conversation_text = await history_manager.render(context, state.get('conversation_history', []), "fused_tool_call")
+
+            prompt = format_prompt(self.prompt,
+                                   user_question=state.get('current_user_query', ''),
+                                   user_conversation=conversation_text,
+                                   available_tools=json.dumps(available_tools_list, ensure_ascii=False))
+
+            response_str = await context.llm_interface.agenerate(
+                prompt, generation_config={"response_mime_type": "application/json"}, agent="fused_tool_call"
+            )
+        except Exception as e:
+            logger.warning(f"Fused tool call failed, falling back to two-step selection: {e}")
+            return {"fused_failed": True}
+
+        logger.info(f"Raw fused tool call from LLM: {response_str}")
+        parsed = parse_json_from_response(response_str)
+        if not isinstance(parsed, dict) or "error" in parsed:
+            logger.warning("Fused tool call response could not be parsed, falling back to two-step selection.")
+            return {"fused_failed": True}
+
+        # Tek çağrı {"tool", "arguments"} veya çoklu plan {"calls": [...]} biçiminde gelebilir
+        raw_calls = parsed["calls"] if isinstance(parsed.get("calls"), list) else [parsed]
+        if not raw_calls or not all(isinstance(call, dict) and isinstance(call.get("arguments") or {}, dict)
+                                    for call in raw_calls):
+            logger.warning("Fused tool call response has an invalid shape, falling back to two-step selection.")
+            return {"fused_failed": True}
+
+        tool_names = [str(call.get("tool", "")).strip() for call in raw_calls]
+        if all(name == "no_tool_found" for name in tool_names):
+            return {"selected_tool": {"name": "no_tool_found", "description": "No suitable tool was found."}}
+
+        tools_by_name = {tool['name']: tool for tool in available_tools_list}
+        tool_calls = []
+        for name, call in zip(tool_names, raw_calls):
+            if name == "no_tool_found":
+                continue
+            if name not in tools_by_name:
+                logger.warning(f"Fused tool call picked unknown tool '{name}', falling back to two-step selection.")
+                return {"fused_failed": True}
+            tool_calls.append({"tool": tools_by_name[name], "arguments": call.get("arguments") or {}})
+
+        selected_tool_definition = tool_calls[0]["tool"]
+        tool_inputs = tool_calls[0]["arguments"]
+        logger.info(f"Fused tool call planned {[(call['tool']['name'], call['arguments']) for call in tool_calls]}")
+
+        context.data_store.save_state({
+            "current_agent": "fused_tool_call",
+            "selected_tool": selected_tool_definition,
+            "tool_inputs": tool_inputs,
+            "tool_calls": [{"tool": call["tool"]["name"], "arguments": call["arguments"]} for call in tool_calls]
+        }, context.session_id)
+
+        update = {"selected_tool": selected_tool_definition, "tool_inputs": tool_inputs}
+        if len(tool_calls) > 1:
+            update["tool_calls"] = tool_calls
+        return update
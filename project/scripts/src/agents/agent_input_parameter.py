@@ -2,53 +2,70 @@
 
 from loguru import logger
 from ..main.prompts import Prompts, format_prompt
-from ..database.state_store import StateStore
-from src.main.model import LLMInterface
+from .utils import parse_json_from_response, get_tool_validator
+from .schema_validator import failing_fields
+from ..main.history import history_manager
 import json
-import re
+import os
 
 class InputParameterAgent():
 
-    def __init__(self, llm_interface=None, client_session=None, data_store=None):
+    def __init__(self):
         self.prompt = Prompts.get_input_parameter_agent_prompt()
-        self.llm_interface = llm_interface
-        self.client_session = client_session
-        self.data_store = data_store or StateStore()
+        # Yerel doğrulamada hatalı çıkan alanlar için tekrar sorma modu: off | invalid | all
+        # ('invalid' eksik alanları tekrar sormaz; onlar kullanıcıya sorulur)
+        self.reprompt_mode = os.getenv("TOOL_INPUT_REPROMPT", "invalid")
 
     def _parse_json_from_response(self, response: str) -> dict:
         """Extracts and parses a JSON object from a string, handling markdown code blocks and NaN values."""
-        match = re.search(r"```json\s*(\{.*?\})\s*```", response, re.DOTALL)
-        if match:
-            json_str = match.group(1)
-        else:
-            json_str = response
-
-        try:
-            json_str = json_str.replace("NaN", "null")
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from LLM response: {e}")
-            logger.error(f"Original response string: {response}")
-            return {"error": "failed_to_parse_json", "details": str(e)}
-
-    def process(self, state):
+        return parse_json_from_response(response)
+
+    async def process(self, state):
+        context = state["context"]
         conversation_history = state.get('conversation_history', [])
         selected_tool = state.get('selected_tool', {})
 
         # DÜZELTME: Parametre isimleri yerine, aracın tam input şemasını alıyoruz.
         tool_schema = selected_tool.get('input_schema', {})
         
-        conversation_text = "\n".join(conversation_history)
+        conversation_text = await history_manager.render(context, conversation_history, "input_parameter")
+
+        parsed_inputs = await self._extract(context, tool_schema, conversation_text)
+        logger.info(f"Parsed input parameters: {parsed_inputs}")
+
+        validator = await get_tool_validator(context.client_session, selected_tool)
+        if isinstance(parsed_inputs, list):
+            # Aynı araç için birden fazla bağımsız çağrı (ör. iki farklı varış şehri)
+            tool_calls = [{"tool": selected_tool, "arguments": validator(item)[0]}
+                          for item in parsed_inputs if isinstance(item, dict)]
+            if len(tool_calls) > 1:
+                logger.info(f"Planned {len(tool_calls)} calls to '{selected_tool.get('name')}'")
+                return {"tool_inputs": tool_calls[0]["arguments"], "tool_calls": tool_calls}
+            parsed_inputs = tool_calls[0]["arguments"] if tool_calls else {}
 
+        # Argümanları yerelde doğrula/dönüştür; hatalı alanları sadece onlar için tekrar sor
+        tool_inputs, errors = validator(parsed_inputs if isinstance(parsed_inputs, dict) and "error" not in parsed_inputs else {})
+        retry_fields = failing_fields(errors, include_missing=self.reprompt_mode == "all") if self.reprompt_mode != "off" else []
+        if retry_fields:
+            logger.info(f"Re-prompting for failing fields: {retry_fields}")
+            properties = tool_schema.get("properties", {})
+            partial_schema = {"type": "object", "properties": {name: properties.get(name, {}) for name in retry_fields}}
+            repaired = await self._extract(context, partial_schema, conversation_text)
+            if isinstance(repaired, dict) and "error" not in repaired:
+                merged = {**tool_inputs, **{k: v for k, v in repaired.items() if k in retry_fields}}
+                tool_inputs, errors = validator(merged)
+
+        if errors:
+            logger.info(f"Local validation failed for '{selected_tool.get('name')}': {errors}")
+        return {"tool_inputs": tool_inputs}
+
+    async def _extract(self, context, tool_schema: dict, conversation_text: str):
         # DÜZELTME: Prompt'u, parametre isimleri yerine tam şema ile formatlıyoruz.
         prompt = format_prompt(self.prompt, 
                                tool_schema=json.dumps(tool_schema, indent=2), 
                                user_conversation=conversation_text)
         
-        response_str = self.llm_interface.generate(prompt)
+        response_str = await context.llm_interface.agenerate(prompt, agent="input_parameter")
         logger.info(f"Raw input parameters extracted from LLM: {response_str}")
 
-        parsed_inputs = self._parse_json_from_response(response_str)
-        logger.info(f"Parsed input parameters: {parsed_inputs}")
-        
-        return {"tool_inputs": parsed_inputs}
\ No newline at end of file
+        return self._parse_json_from_response(response_str)
\ No newline at end of file
@@ -1,52 +1,186 @@
+import os
 from loguru import logger
 from ..main.prompts import Prompts, format_prompt
-from ..database.state_store import StateStore
+from ..main.history import history_manager
+from .utils import get_tool_catalog
+from .tool_catalog import ToolCatalogCache
+from .tool_index import fold, tool_indexes, words
+from .result_compactor import result_compactor
+
+# Sadece bu kelimelerden oluşan mesajlar sohbet (small talk) kabul edilir.
+# Kelimeler kullanıcı mesajıyla aynı biçimde katlanır (ör. "nasılsın" -> "nasilsin").
+SMALL_TALK_WORDS = {fold(word) for word in {
+    "merhaba", "selam", "selamlar", "günaydın", "iyi", "günler", "akşamlar", "geceler",
+    "nasılsın", "nasılsınız", "naber", "teşekkür", "teşekkürler", "ederim", "sağol", "sağ", "ol",
+    "olun", "eyvallah", "tamam", "görüşürüz", "hoşça", "kal", "çok",
+    "hi", "hello", "hey", "thanks", "thank", "you", "bye", "ok", "okay", "how", "are",
+    "good", "morning", "evening", "night", "great",
+}}
+
+# Önceki sonucun devamını isteyen mesajlar (ör. "daha fazla göster", "show me the rest").
+# Mesaj yalnızca bu kelimelerden ve PAGING_FILLER_WORDS'ten oluşmalıdır; "next flight?"
+# gibi araçla eşleşebilecek bir terim içeren mesajlar yeni istek sayılır.
+MORE_RESULTS_TRIGGERS = {fold(word) for word in {"fazla", "devamı", "devamını", "devam", "diğerleri", "diğerlerini",
+                                                  "sonraki", "kalan", "kalanlar", "kalanları", "more", "next", "rest",
+                                                  "remaining"}}
+MORE_RESULTS_WORDS = MORE_RESULTS_TRIGGERS | {fold(word) for word in {"daha", "diğer", "others"}}
+PAGING_FILLER_WORDS = {fold(word) for word in {"göster", "gösterir", "misin", "bana", "lütfen", "sonuç", "sonuçlar",
+                                               "sonuçları", "seçenek", "seçenekler", "seçenekleri", "show", "me",
+                                               "the", "please", "results", "options", "of", "them", "give", "see",
+                                               "let", "can", "could", "you"}}
+
+ROUTES = {
+    "select_tool": "tool_selecting_agent",
+    "fused_tool_call": "fused_tool_call_agent",
+    "extract_parameters": "input_parameter_agent",
+    "generate_output": "output_generation_agent",
+}
+
+_metrics = {"turns": 0, "small_talk": 0, "follow_up": 0, "new_request": 0, "more_results": 0,
+            "llm_fallbacks": 0, "skipped_parameter_extraction": 0}
+
+
+def is_small_talk(text: str) -> bool:
+    tokens = words(text)
+    return bool(tokens) and all(token in SMALL_TALK_WORDS for token in tokens)
+
+
+def is_more_results_request(text: str) -> bool:
+    tokens = words(text)
+    allowed = MORE_RESULTS_WORDS | PAGING_FILLER_WORDS | SMALL_TALK_WORDS
+    return bool(set(tokens) & MORE_RESULTS_TRIGGERS) and all(token in allowed for token in tokens)
+
+
+def needs_parameter_extraction(tool: dict) -> bool:
+    """Şemada zorunlu alan yoksa parametre çıkarımı atlanır (varsayılanlar doğrulayıcıdan gelir)."""
+    return bool((tool.get("input_schema") or {}).get("required"))
+
+
+def routing_stats() -> dict:
+    return dict(_metrics)
+
 
 class OrchestratorAgent():
+    """Turun giriş noktası: sonraki ajanı önce deterministik kurallarla seçer.
+
+    Kurallar sırasıyla:
+      1. Sadece selamlaşma/teşekkür içeren mesajlar araçsız olarak doğrudan cevaplanır.
+      2. Önceki tur bir `validation_error` ile bittiyse (eksik bilgi sorulduysa) ve
+         yeni mesaj açıkça başka bir araca işaret etmiyorsa araç seçimi atlanır;
+         bekleyen araç için parametreler yeniden çıkarılır.
+      3. "Daha fazla göster" gibi mesajlar, önceki turda kırpılan araç çıktısının
+         (tool_overflow) sıradaki satırlarıyla araç çağırmadan cevaplanır.
+      4. Diğer durumlarda normal araç seçimine (veya fused çağrıya) gidilir.
+    Kurallar karar veremezse (bekleyen bir soru varken mesaj araçlarla sadece
+    zayıf eşleşiyorsa veya kısa bir mesaj hiçbir araçla eşleşmiyorsa) tek bir
+    kısa LLM sınıflandırması yapılır (ORCHESTRATOR_LLM_FALLBACK ile kapatılabilir).
+    """
 
-    def __init__(self, llm_interface=None, client_session=None, data_store=None):
+    def __init__(self):
         self.prompt = Prompts.get_orchestrator_prompt()
-        self.data_store = data_store or StateStore()
-        self.llm_interface = llm_interface
-        self.client_session = client_session
+        self.llm_fallback = os.getenv("ORCHESTRATOR_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+        # Bu kelime sayısından kısa ve hiçbir araçla eşleşmeyen mesajlar belirsiz sayılır
+        self.short_message_words = int(os.getenv("ORCHESTRATOR_SHORT_MESSAGE_WORDS", "4"))
 
     def route(self, state) -> str:
-        # route mantığı aynı kalabilir
-        routed_agent = state.get('routed_agent', '').strip()
+        routed_agent = (state.get('routed_agent') or '').strip()
+        if routed_agent not in ROUTES:
+            logger.warning(f"Orchestrator received an unknown route: {routed_agent}")
+            return "select_tool"
+        return routed_agent
 
-        try:
-            if routed_agent == "tool_selecting_agent":
-                return "route_tool_selecting_agent"
-            elif routed_agent == "tool_executing_agent":
-                return "route_tool_executing_agent"
-            elif routed_agent == "input_parameter_agent":
-                return "route_input_parameter_agent"
-            elif routed_agent == "output_generation_agent":
-                return "route_output_generation_agent"
-            else:
-                logger.warning(f"Orchestrator received an unknown agent to route: {routed_agent}")
-                return "error"
-        except Exception as e:
-            logger.error(f"There has been an error with classification routing. \n {e}")
-            return "error"
-    
-    def process(self, state) -> dict:
+    def after_tool_selection(self, state) -> str:
+        """A tool has been selected, decide if it's valid or not."""
+        selected_tool = state.get("selected_tool", {})
+        tool_name = selected_tool.get("name", "no_tool_found")
+        logger.debug(f"ROUTER: Checking selected tool. Tool name: {tool_name}")
+
+        if tool_name == "no_tool_found":
+            return "generate_output_no_tool"
+        elif state.get("tool_inputs") is not None:
+            # Parametreler seçimle paralel (spekülatif) olarak zaten çıkarıldı
+            return "execute_tool"
+        elif not needs_parameter_extraction(selected_tool):
+            _metrics["skipped_parameter_extraction"] += 1
+            logger.debug(f"ROUTER: '{tool_name}' has no required fields, skipping parameter extraction.")
+            return "execute_tool"
+        else:
+            return "extract_parameters"
+
+    async def process(self, state) -> dict:
         """Process state and determine the next agent."""
-        conversation_history = state.get('conversation_history', [])
-        # GÜNCELLENDİ: listeyi string'e çevir
-        history_str = "\n".join(conversation_history)
+        context = state["context"]
+        user_question = state.get('current_user_query', '')
+        _metrics["turns"] += 1
+        default_route = "fused_tool_call" if context.fused_tool_call else "select_tool"
+
+        if is_small_talk(user_question):
+            _metrics["small_talk"] += 1
+            logger.info("Orchestrator: small talk, answering without tools")
+            return {"routed_agent": "generate_output", "tool_result": {"small_talk": True}}
+
+        if is_more_results_request(user_question):
+            # Önceki turda kırpılan sonucun devamı araç çağrısı yapılmadan gösterilir
+            page = await result_compactor.next_page(context, user_question)
+            if page is not None:
+                _metrics["more_results"] += 1
+                logger.info("Orchestrator: paging the previous tool result")
+                return {"routed_agent": "generate_output", "tool_result": page}
+
+        last_turn = await context.data_store.aget_latest_state(context.session_id, "turn") or {}
+        pending = last_turn.get("pending")
 
-        full_prompt = format_prompt(self.prompt, 
+        catalog = await get_tool_catalog(context.client_session)
+        index = tool_indexes.get(ToolCatalogCache.key_for(context.client_session), catalog.version, catalog.tools)
+        _, fast_path_tool, confidence = await tool_indexes.shortlist(index, user_question)
+
+        decision = self._decide_by_rules(user_question, pending, fast_path_tool, confidence)
+        if decision is None:
+            if self.llm_fallback:
+                decision = await self._classify(context, state, pending)
+            else:
+                decision = "follow_up" if pending else "new_request"
+
+        _metrics[decision] += 1
+        logger.info(f"Orchestrator decision: {decision}")
+        if decision == "small_talk":
+            return {"routed_agent": "generate_output", "tool_result": {"small_talk": True}}
+        if decision == "follow_up" and pending:
+            selected_tool = next((tool for tool in catalog.tools if tool["name"] == pending["tool"]), None)
+            if selected_tool is not None:
+                return {"routed_agent": "extract_parameters", "selected_tool": selected_tool}
+        return {"routed_agent": default_route}
+
+    def _decide_by_rules(self, user_question, pending, fast_path_tool, confidence):
+        """Kurallardan biri kesin sonuç veriyorsa kararı, vermiyorsa None döndür."""
+        if pending:
+            if fast_path_tool is not None:
+                return "follow_up" if fast_path_tool["name"] == pending["tool"] else "new_request"
+            if confidence == 0.0:
+                # Hiçbir araçla eşleşmeyen cevaplar (ör. "yarın, 2 kişi") eksik bilgiyi tamamlar
+                return "follow_up"
+            return None
+        if confidence == 0.0 and len(words(user_question)) <= self.short_message_words:
+            return None
+        return "new_request"
+
+    async def _classify(self, context, state, pending) -> str:
+        """Kurallar yetersiz kaldığında tek kelimelik LLM sınıflandırması."""
+        _metrics["llm_fallbacks"] += 1
+        history_str = await history_manager.render(context, state.get('conversation_history', []), "orchestrator")
+        full_prompt = format_prompt(self.prompt,
                                     user_question=state.get('current_user_query', ''),
                                     conversation_history=history_str,
-                                    selected_tool=str(state.get('selected_tool', '')),
-                                    tool_inputs=str(state.get('tool_inputs', '')),
-                                    tool_result=str(state.get('tool_result', '')),
-                                    available_tools=str(state.get('available_tools', '')),
-                                    input_status=str(state.get('input_status', '')),
-                                    answer_status=str(state.get('answer_status', '')))
-
-        routed_agent = self.llm_interface.generate(full_prompt)
-        
-        # State'e `routed_agent`'ı ekleyerek döndür. `route` metodu bunu kullanacak.
-        return {"routed_agent": routed_agent}
\ No newline at end of file
+                                    pending_tool=pending["tool"] if pending else "(none)",
+                                    missing_fields=", ".join(error["field"] for error in pending.get("errors", [])) if pending else "(none)")
+        try:
+            response = await context.llm_interface.agenerate(full_prompt, agent="orchestrator")
+        except Exception as e:
+            logger.warning(f"Orchestrator classification failed, using default route: {e}")
+            return "new_request"
+        label = response.strip().lower()
+        for decision in ("follow_up", "small_talk", "new_request"):
+            if decision in label:
+                return decision if decision != "follow_up" or pending else "new_request"
+        logger.warning(f"Orchestrator received an unknown classification: {response}")
+        return "new_request"
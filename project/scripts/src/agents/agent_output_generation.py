@@ -1,29 +1,43 @@
 from loguru import logger
 from ..main.prompts import Prompts, format_prompt
-from ..database.state_store import StateStore
+from ..main.history import history_manager
+from .result_compactor import result_compactor
 
 class OutputGenerationAgent():
 
-    def __init__(self, llm_interface=None, client_session=None, data_store=None):
+    def __init__(self):
         # GÜNCELLENDİ: Doğrudan çıktı üretme prompt'u alınıyor
         self.prompt = Prompts.get_generation_agent_prompt()
-        self.data_store = data_store or StateStore()
-        self.llm_interface = llm_interface
-        self.client_session = client_session
     
-    def process(self, state):
+    async def process(self, state):
         """Process state and generate final response."""
+        context = state["context"]
         conversation_history = state.get('conversation_history', [])
         tool_result = state.get('tool_result', {})
+
+        # Büyük araç çıktılarını prompt'a girmeden önce sorguyla ilgili kısma indir
+        query = state.get('current_user_query', '')
+        if isinstance(tool_result, list):
+            tool_result = result_compactor.compact_many(context, tool_result, query)
+        else:
+            tool_result = result_compactor.compact(context, tool_result, query, state.get('selected_tool', {}).get('name'))
         
         # Konuşma geçmişini tek bir metin haline getir
-        conversation_text = "\n".join(conversation_history)
+        conversation_text = await history_manager.render(context, conversation_history, "output_generation")
 
         full_prompt = format_prompt(self.prompt, 
                                      user_conversation=conversation_text, 
                                      tool_result=str(tool_result)) # Tool sonucunu string'e çevir
         
-        final_answer = self.llm_interface.generate(full_prompt)
+        if context.on_token is not None:
+            # Akış modunda token'lar üretildikçe istemciye iletilir
+            parts = []
+            async for token in context.llm_interface.astream(full_prompt, agent="output_generation"):
+                parts.append(token)
+                await context.on_token(token)
+            final_answer = "".join(parts)
+        else:
+            final_answer = await context.llm_interface.agenerate(full_prompt, agent="output_generation")
         logger.info(f"Generated final answer: {final_answer}")
         
         # LangGraph'in state'i güncellemesi için sonucu döndür
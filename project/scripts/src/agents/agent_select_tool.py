@@ -1,44 +1,79 @@
 # src/agents/agent_select_tool.py
 
+import asyncio
+import os
 from loguru import logger
 from ..main.prompts import Prompts, format_prompt
-from .utils import get_structured_tools
-from ..database.state_store import StateStore
-from src.main.model import LLMInterface
+from .utils import get_tool_catalog
+from .tool_catalog import ToolCatalogCache
+from .tool_index import tool_indexes
 
 class ToolSelectingAgent():
 
-    def __init__(self, llm_interface=None, client_session=None, data_store=None, session_id=None):
+    def __init__(self, input_parameter_agent=None):
         self.prompt = Prompts.get_tool_selecting_agent_prompt()
-        self.data_store = data_store or StateStore()
-        self.llm_interface = llm_interface
-        self.client_session = client_session
-        self.session_id = session_id
-        # self.tools'u __init__ içinde bir kez yüklemek yerine, her process'te alacağız
-        # çünkü bu asenkron bir çağrı.
+        # Araç listesi oturuma bağlı olduğu için her process'te (önbellekten) alınır.
+        # Paralel modda, indeksin en güçlü adayı için parametreler LLM seçimiyle
+        # eşzamanlı olarak (spekülatif) çıkarılır; seçim farklı çıkarsa iş iptal edilir.
+        self.input_parameter_agent = input_parameter_agent
+        self.speculative_confidence = float(os.getenv("SPECULATIVE_CONFIDENCE", "0.6"))
 
     async def process(self, state):
         """Process state and determine query type. Bu metod artık asenkron."""
         logger.info("Processing in ToolSelectingAgent")
+        context = state["context"]
 
         # Asenkron olarak araçları al
-        available_tools_list = await get_structured_tools(self.client_session)
-        
-        conversation_history = state.get('conversation_history', [])
-        history_str = "\n".join(conversation_history)
+        catalog = await get_tool_catalog(context.client_session)
+        available_tools_list = catalog.tools
+        user_question = state.get('current_user_query', '')
+
+        # Yerel indeksten aday araçları kısa listeye al; tek ve güçlü bir eşleşme varsa LLM'i atla
+        index = tool_indexes.get(ToolCatalogCache.key_for(context.client_session), catalog.version, available_tools_list)
+        candidates, fast_path_tool, confidence = await tool_indexes.shortlist(index, user_question)
 
-        # Prompt için araç listesini hazırla
-        tools_for_prompt = "\n".join([f"{tool['name']}: {tool['description']}" for tool in available_tools_list])
+        speculation = None
+        if fast_path_tool is not None:
+            selected_tool_name = fast_path_tool['name']
+            logger.info(f"Fast-path selected tool '{selected_tool_name}' (confidence {confidence:.2f}), skipping LLM")
+        else:
+            if (context.parallel and self.input_parameter_agent is not None
+                    and confidence >= self.speculative_confidence):
+                speculation = (candidates[0]['name'], asyncio.create_task(
+                    self.input_parameter_agent.process({**state, "selected_tool": candidates[0]})
+                ))
+                logger.debug(f"Speculatively extracting parameters for '{candidates[0]['name']}' (confidence {confidence:.2f})")
 
-        prompt = format_prompt(self.prompt, user_question=state.get('current_user_query', ''),
-                               available_tools_list=tools_for_prompt)
+            # Prompt için sadece aday araçların listesini hazırla
+            tools_for_prompt = "\n".join([f"{tool['name']}: {tool['description']}" for tool in candidates])
 
-        selected_tool_name = self.llm_interface.generate(prompt).strip()
-        logger.info(f"LLM selected tool name: '{selected_tool_name}'")
+            prompt = format_prompt(self.prompt, user_question=user_question,
+                                   available_tools_list=tools_for_prompt)
+
+            try:
+                selected_tool_name = (await context.llm_interface.agenerate(prompt, agent="tool_selecting")).strip()
+            except BaseException:
+                if speculation:
+                    speculation[1].cancel()
+                raise
+            logger.info(f"LLM selected tool name: '{selected_tool_name}' from {len(candidates)}/{len(available_tools_list)} candidates")
 
         # Seçilen aracı tam tanımıyla bul
         selected_tool_definition = next((tool for tool in available_tools_list if tool['name'] == selected_tool_name), None)
 
+        speculated = None
+        if speculation:
+            speculated_name, task = speculation
+            if selected_tool_definition and speculated_name == selected_tool_name:
+                try:
+                    speculated = await task
+                    logger.info(f"Speculative parameter extraction for '{speculated_name}' was used")
+                except Exception as e:
+                    logger.warning(f"Speculative parameter extraction failed, falling back: {e}")
+            else:
+                task.cancel()
+                logger.info(f"Speculation on '{speculated_name}' discarded, LLM selected '{selected_tool_name}'")
+
         if not selected_tool_definition:
             logger.warning(f"Tool '{selected_tool_name}' not found in available tools. Returning no_tool_found.")
             # State'i güncellemek için boş bir tool tanımı veya hata durumu dönebiliriz.
@@ -47,10 +82,12 @@ class ToolSelectingAgent():
         logger.info(f"Selected tool definition: {selected_tool_definition}")
         
         # State'e seçilen aracın tam tanımını kaydet
-        self.data_store.save_state({
+        context.data_store.save_state({
             "current_agent": "tool_selecting",
             "selected_tool": selected_tool_definition
-        }, self.session_id)
+        }, context.session_id)
 
         # State güncellemesi için tam tanımı döndür
+        if speculated is not None:
+            return {"selected_tool": selected_tool_definition, **speculated}
         return {"selected_tool": selected_tool_definition}
\ No newline at end of file
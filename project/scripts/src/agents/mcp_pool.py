@@ -0,0 +1,185 @@
+import anyio
+import asyncio
+import os
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from loguru import logger
+from src.agents.utils import open_client, catalog_key_for
+
+
+class PooledConnection:
+    """Havuzdaki tek bir MCP bağlantısı (bir `npx mcp-remote` süreci)."""
+
+    def __init__(self, session, max_inflight: int):
+        self.session = session
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.in_flight = 0
+        self.created_at = time.monotonic()
+        self.healthy = True
+
+    async def request(self, method: str, *args, **kwargs):
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                return await getattr(self.session, method)(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+    async def close(self):
+        try:
+            await self.session.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled MCP connection cleanly: {e}")
+
+
+class PooledClient:
+    """Sohbet oturumlarına verilen hafif MCP istemcisi.
+
+    ClientSession ile aynı `list_tools`/`call_tool` arayüzünü sunar; her çağrı
+    havuzdaki en az meşgul bağlantıya yönlendirilir, böylece eşzamanlı istekler
+    paylaşılan bağlantılar üzerinde çoğullanır. `close` alttaki bağlantıyı
+    kapatmaz, yalnızca havuza olan referansı bırakır.
+    """
+
+    def __init__(self, pool: 'MCPConnectionPool', key: Hashable):
+        self._pool = pool
+        self.catalog_key = key
+        self.closed = False
+
+    async def _request(self, method: str, *args, **kwargs):
+        connection = await self._pool.checkout(self.catalog_key)
+        try:
+            return await connection.request(method, *args, **kwargs)
+        except (ConnectionError, EOFError, BrokenPipeError, anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+            await self._pool.discard(self.catalog_key, connection, reason=str(e))
+            raise
+
+    async def list_tools(self):
+        return await self._request("list_tools")
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None):
+        return await self._request("call_tool", name, arguments)
+
+    async def send_ping(self):
+        return await self._request("send_ping")
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self._pool.release(self)
+
+
+class MCPConnectionPool:
+    """Kimlik bilgisine göre anahtarlanmış, paylaşımlı MCP bağlantı havuzu."""
+
+    def __init__(self,
+                 max_size_per_key: Optional[int] = None,
+                 max_inflight_per_connection: Optional[int] = None,
+                 health_check_interval: Optional[float] = None,
+                 connect=open_client):
+        self.max_size_per_key = max_size_per_key or int(os.getenv("MCP_POOL_MAX_SIZE", "4"))
+        self.max_inflight_per_connection = max_inflight_per_connection or int(os.getenv("MCP_POOL_MAX_INFLIGHT", "8"))
+        self.health_check_interval = health_check_interval or float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "30"))
+        self._connect = connect
+        self._connections: Dict[Hashable, List[PooledConnection]] = {}
+        self._credentials: Dict[Hashable, Tuple[str, str]] = {}
+        self._clients: Dict[Hashable, int] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _register(self, username: str, password: str) -> Hashable:
+        if not username or not password:
+            raise ValueError("MCP username and password must be provided.")
+        key = catalog_key_for(username, password)
+        self._credentials[key] = (username, password)
+        return key
+
+    async def _open(self, key: Hashable) -> PooledConnection:
+        username, password = self._credentials[key]
+        session = await self._connect(username, password)
+        connection = PooledConnection(session, self.max_inflight_per_connection)
+        self._connections.setdefault(key, []).append(connection)
+        logger.info(f"Opened pooled MCP connection for {key[1]} ({len(self._connections[key])}/{self.max_size_per_key})")
+        return connection
+
+    async def prewarm(self, username: str, password: str, count: int = 1) -> None:
+        """Verilen hesap için `count` bağlantıyı önceden aç."""
+        key = self._register(username, password)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            missing = min(count, self.max_size_per_key) - len(self._connections.get(key, []))
+            for _ in range(max(missing, 0)):
+                await self._open(key)
+
+    async def acquire(self, username: str, password: str) -> PooledClient:
+        """Bir sohbet oturumu için havuza bağlı istemci döndür; gerekiyorsa ilk bağlantıyı aç."""
+        key = self._register(username, password)
+        await self.checkout(key)
+        self._clients[key] = self._clients.get(key, 0) + 1
+        return PooledClient(self, key)
+
+    async def checkout(self, key: Hashable) -> PooledConnection:
+        """En az meşgul sağlıklı bağlantıyı seç; hepsi doluysa ve limit izin veriyorsa yenisini aç."""
+        connections = [c for c in self._connections.get(key, []) if c.healthy]
+        least_busy = min(connections, key=lambda c: c.in_flight, default=None)
+        if least_busy is not None and (least_busy.in_flight < self.max_inflight_per_connection
+                                       or len(connections) >= self.max_size_per_key):
+            return least_busy
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            connections = [c for c in self._connections.get(key, []) if c.healthy]
+            if len(connections) < self.max_size_per_key:
+                least_busy = min(connections, key=lambda c: c.in_flight, default=None)
+                if least_busy is None or least_busy.in_flight >= self.max_inflight_per_connection:
+                    return await self._open(key)
+            return min(connections, key=lambda c: c.in_flight)
+
+    def release(self, client: PooledClient) -> None:
+        key = client.catalog_key
+        self._clients[key] = max(self._clients.get(key, 0) - 1, 0)
+
+    async def discard(self, key: Hashable, connection: PooledConnection, reason: str = "") -> None:
+        """Bozuk bir bağlantıyı havuzdan çıkar ve kapat."""
+        connection.healthy = False
+        connections = self._connections.get(key, [])
+        if connection in connections:
+            connections.remove(connection)
+            logger.warning(f"Discarding pooled MCP connection for {key[1]}: {reason}")
+            await connection.close()
+
+    async def health_check(self) -> None:
+        """Tüm bağlantılara ping at, yanıt vermeyenleri havuzdan çıkar."""
+        for key, connections in list(self._connections.items()):
+            for connection in list(connections):
+                try:
+                    await asyncio.wait_for(connection.request("send_ping"), timeout=10.0)
+                except Exception as e:
+                    await self.discard(key, connection, reason=f"health check failed: {e}")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"MCP pool health check loop error: {e}")
+
+    def start(self) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for key, connections in list(self._connections.items()):
+            for connection in connections:
+                await connection.close()
+        self._connections.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accounts": len(self._connections),
+            "connections": sum(len(c) for c in self._connections.values()),
+            "in_flight": sum(c.in_flight for conns in self._connections.values() for c in conns),
+            "clients": sum(self._clients.values()),
+        }
@@ -0,0 +1,174 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from src.agents.tool_index import tokenize
+from src.main.history import estimate_tokens
+
+# Sorguda geçmese de yanıt için genellikle gerekli olan alanlar (alan adında geçmesi yeterli)
+DEFAULT_KEEP_FIELDS = ("price,amount,currency,fare,date,time,departure,arrival,origin,destination,"
+                       "flight,airline,carrier,duration,stop,name,code,status,seat,cabin,class")
+
+
+def _parse(payload: Any) -> Any:
+    """Metin olarak gelen JSON çıktısını çözümle; çözümlenemezse olduğu gibi bırak.
+
+    FastMCP'nin `{"result": "<json metni>"}` sarmalı da açılır.
+    """
+    if isinstance(payload, dict) and list(payload) == ["result"] and isinstance(payload["result"], str):
+        payload = payload["result"]
+    if isinstance(payload, str):
+        text = payload.strip()
+        if text[:1] in ("{", "["):
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                pass
+    return payload
+
+
+def _find_rows(payload: Any) -> Tuple[Optional[List[str]], Optional[List[Dict[str, Any]]]]:
+    """Çıktıdaki en büyük nesne listesini (satırları) ve yolunu bul (en fazla iki seviye)."""
+    if isinstance(payload, list):
+        return ([], payload) if payload and all(isinstance(row, dict) for row in payload) else (None, None)
+    best_path, best_rows = None, None
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            path, rows = _find_rows(value) if isinstance(value, (list, dict)) else (None, None)
+            if rows is not None and (best_rows is None or len(rows) > len(best_rows)):
+                best_path, best_rows = [key] + path, rows
+    return best_path, best_rows
+
+
+def _size(value: Any) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+
+
+class ResultCompactor:
+    """Araç çıktısını çıktı prompt'una girmeden önce küçültür.
+
+    Yapılandırılmış (JSON) çıktılarda en büyük satır listesi bulunur, satırlar
+    sorguyla ilgili alanlara indirgenir ve TOOL_RESULT_TOKEN_BUDGET'a sığacak
+    kadar satır (en fazla TOOL_RESULT_MAX_ROWS) tutulur. Düz metin çıktılar
+    bütçeye göre kırpılır. Bir şey çıkarıldıysa tam çıktı StateStore'a
+    `kind="tool_overflow"` olarak yazılır ve prompt'a sadece bir `overflow`
+    tanıtıcısı konur; sonraki turlar ("daha fazla göster") buradan sayfalanır.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, max_rows: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", "1500"))
+        self.max_rows = max_rows or int(os.getenv("TOOL_RESULT_MAX_ROWS", "20"))
+        self.keep_fields = [field for field in os.getenv("TOOL_RESULT_KEEP_FIELDS", DEFAULT_KEEP_FIELDS).split(",") if field]
+        self._metrics = {"compacted": 0, "overflows": 0, "tokens_in": 0, "tokens_out": 0}
+
+    def compact(self, context, result: Any, query: str, tool_name: Optional[str] = None,
+                token_budget: Optional[int] = None) -> Any:
+        """Başarılı araç sonucunu bütçeye sığdır; hata sonuçları olduğu gibi döner.
+
+        `overflow` bilgisi taşıyan sonuçlar (ör. `next_page` sayfaları) zaten
+        kırpılmıştır; yeniden kırpılırsa yeni bir tool_overflow kaydı yazılır ve
+        sayfalama başa döner, bu yüzden olduğu gibi bırakılır.
+        """
+        if not isinstance(result, dict) or not result.get("ok") or "overflow" in result:
+            return result
+        budget = token_budget or self.token_budget
+        payload = _parse(result.get("result"))
+        tokens_in = _size(payload)
+        self._metrics["tokens_in"] += tokens_in
+        if tokens_in <= budget:
+            self._metrics["tokens_out"] += tokens_in
+            return {**result, "result": payload}
+
+        path, rows = _find_rows(payload)
+        if rows is None:
+            compacted, overflow = self._truncate_text(payload, budget)
+        else:
+            compacted, overflow = self._compact_rows(payload, path, rows, query, budget)
+        overflow["handle"] = self._store_overflow(context, tool_name, query, payload, path, overflow)
+
+        self._metrics["compacted"] += 1
+        self._metrics["tokens_out"] += _size(compacted)
+        logger.info(f"Compacted result of '{tool_name}': {tokens_in} -> {_size(compacted)} tokens ({overflow})")
+        return {**result, "result": compacted, "overflow": overflow}
+
+    def compact_many(self, context, results: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        """Çoklu çağrı sonuçlarında bütçe çağrılar arasında eşit bölünür."""
+        budget = max(self.token_budget // max(len(results), 1), 1)
+        return [{**entry, "result": self.compact(context, entry.get("result"), query, entry.get("tool"), budget)}
+                for entry in results]
+
+    def _relevant_fields(self, rows: List[Dict[str, Any]], query: str) -> Optional[List[str]]:
+        """Sorgu terimleriyle veya varsayılan önemli alanlarla eşleşen alanlar; yetersizse None."""
+        query_terms = set(tokenize(query))
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        relevant = [field for field in fields
+                    if query_terms & set(tokenize(field)) or any(keep in field.lower() for keep in self.keep_fields)]
+        return relevant if len(relevant) >= 2 else None
+
+    def _compact_rows(self, payload, path, rows, query, budget):
+        fields = self._relevant_fields(rows, query)
+        projected = [{key: value for key, value in row.items()
+                      if value not in (None, "", [], {}) and (fields is None or key in fields)}
+                     for row in rows]
+
+        # Satırlar dışındaki alanlar (ör. toplam sayı, para birimi) korunur
+        envelope_budget = _size(payload) - _size(rows) if path else 0
+        used, kept = max(envelope_budget, 0), []
+        for row in projected[:self.max_rows]:
+            row_tokens = _size(row)
+            if kept and used + row_tokens > budget:
+                break
+            kept.append(row)
+            used += row_tokens
+
+        compacted = kept
+        if path:
+            compacted = json.loads(json.dumps(payload, default=str))
+            target = compacted
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = kept
+
+        omitted_fields = sorted({key for row in rows for key in row} - set(fields)) if fields else []
+        return compacted, {"total_rows": len(rows), "shown_rows": len(kept), "omitted_fields": omitted_fields}
+
+    @staticmethod
+    def _truncate_text(payload, budget):
+        text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+        limit = budget * 4
+        return text[:limit] + " …", {"total_chars": len(text), "shown_chars": limit}
+
+    def _store_overflow(self, context, tool_name, query, payload, path, overflow) -> Optional[str]:
+        self._metrics["overflows"] += 1
+        return context.data_store.save_state({
+            "tool": tool_name,
+            "query": query,
+            "path": path,
+            "next_row": overflow.get("shown_rows"),
+            "payload": payload
+        }, context.session_id, kind="tool_overflow")
+
+    async def next_page(self, context, query: str) -> Optional[Dict[str, Any]]:
+        """Son taşan sonucun sıradaki satırlarını, yine bütçeye sığdırarak döndür."""
+        overflow = await context.data_store.aget_latest_state(context.session_id, "tool_overflow")
+        if not overflow or overflow.get("next_row") is None:
+            return None
+        _, rows = _find_rows(overflow["payload"])
+        start = overflow["next_row"]
+        if rows is None or start >= len(rows):
+            return None
+
+        remaining = rows[start:]
+        compacted, info = self._compact_rows(remaining, [], remaining, overflow.get("query") or query, self.token_budget)
+        info = {**info, "total_rows": len(rows), "first_row": start + 1}
+        next_row = start + info["shown_rows"]
+        info["handle"] = context.data_store.save_state({
+            **overflow, "next_row": next_row if next_row < len(rows) else None
+        }, context.session_id, kind="tool_overflow")
+        return {"ok": True, "tool": overflow.get("tool"), "result": compacted, "overflow": info}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "tokens_saved": self._metrics["tokens_in"] - self._metrics["tokens_out"]}
+
+
+result_compactor = ResultCompactor()
@@ -0,0 +1,278 @@
+import math
+import re
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from loguru import logger
+
+# Doğrulayıcı: (değer, alan yolu, hata listesi) -> düzeltilmiş değer
+Validator = Callable[[Any, str, List[Dict[str, str]]], Any]
+
+MISSING_REASON = "missing required"
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _join(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+
+def _coerce_scalar(value: Any, expected: str) -> Tuple[bool, Any]:
+    """Değeri beklenen JSON tipine dönüştürmeyi dene: (başarılı mı, yeni değer)."""
+    if expected == "string":
+        if isinstance(value, str):
+            return True, value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return True, str(value)
+    elif expected == "integer":
+        if isinstance(value, int) and not isinstance(value, bool):
+            return True, value
+        if isinstance(value, float) and value.is_integer():
+            return True, int(value)
+        if isinstance(value, str) and re.fullmatch(r"\s*-?\d+\s*", value):
+            return True, int(value)
+    elif expected == "number":
+        # "nan", "inf" gibi sonlu olmayan değerler JSON sayısı değildir
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return math.isfinite(value), value
+        if isinstance(value, str):
+            try:
+                number = float(value)
+            except ValueError:
+                pass
+            else:
+                if math.isfinite(number):
+                    return True, number
+    elif expected == "boolean":
+        if isinstance(value, bool):
+            return True, value
+        if isinstance(value, str) and value.strip().lower() in ("true", "false", "evet", "hayır"):
+            return True, value.strip().lower() in ("true", "evet")
+    elif expected == "null":
+        return value is None, value
+    return False, value
+
+
+class SchemaCompiler:
+    """JSON şemasını bir kez, iç içe doğrulayıcı fonksiyonlara derler.
+
+    Desteklenen alt küme MCP araç şemalarında kullanılan anahtarlardır: type,
+    properties, required, items, enum, const, format=date, minimum/maximum,
+    minLength/maxLength, anyOf/oneOf, default ve yerel $ref (#/$defs, #/definitions).
+    Tipler mümkün olduğunda dönüştürülür (ör. "2" -> 2); null değerler eksik sayılır.
+    """
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root or {}
+        self._refs: Dict[str, Validator] = {}
+
+    def compile(self) -> Callable[[Any], Tuple[Any, List[Dict[str, str]]]]:
+        validate = self._compile(self.root)
+
+        def run(value: Any) -> Tuple[Any, List[Dict[str, str]]]:
+            errors: List[Dict[str, str]] = []
+            result = validate(value if value is not None else {}, "", errors)
+            return result, errors
+
+        return run
+
+    def _resolve(self, ref: str) -> Validator:
+        if ref in self._refs:
+            return self._refs[ref]
+        target: Any = self.root
+        for part in ref.lstrip("#/").split("/"):
+            target = target.get(part, {}) if isinstance(target, dict) else {}
+
+        # Özyinelemeli şemalar için önce yer tutucu kaydet
+        compiled: List[Validator] = []
+        self._refs[ref] = lambda value, path, errors: compiled[0](value, path, errors)
+        compiled.append(self._compile(target))
+        return self._refs[ref]
+
+    def _compile(self, schema: Dict[str, Any]) -> Validator:
+        if not isinstance(schema, dict) or not schema:
+            return lambda value, path, errors: value
+        if "$ref" in schema:
+            return self._resolve(schema["$ref"])
+
+        alternatives = schema.get("anyOf") or schema.get("oneOf")
+        if alternatives:
+            return self._compile_alternatives([self._compile(option) for option in alternatives])
+
+        checks: List[Validator] = []
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        if not types and ("properties" in schema or "required" in schema):
+            types = ["object"]
+        if types:
+            checks.append(self._compile_type(types, schema))
+        if "enum" in schema or "const" in schema:
+            checks.append(self._compile_enum(schema["enum"] if "enum" in schema else [schema["const"]]))
+        if schema.get("format") == "date":
+            checks.append(self._check_date)
+        checks.extend(self._compile_bounds(schema))
+
+        def validate(value, path, errors):
+            for check in checks:
+                before = len(errors)
+                value = check(value, path, errors)
+                if len(errors) > before:
+                    break
+            return value
+
+        return validate
+
+    def _compile_alternatives(self, options: List[Validator]) -> Validator:
+        def validate(value, path, errors):
+            first_errors = None
+            for option in options:
+                option_errors: List[Dict[str, str]] = []
+                result = option(value, path, option_errors)
+                if not option_errors:
+                    return result
+                first_errors = first_errors or option_errors
+            errors.extend(first_errors or [])
+            return value
+        return validate
+
+    def _compile_type(self, types: List[str], schema: Dict[str, Any]) -> Validator:
+        object_validator = self._compile_object(schema) if "object" in types else None
+        array_validator = self._compile_array(schema) if "array" in types else None
+        scalar_types = [t for t in types if t not in ("object", "array")]
+
+        def validate(value, path, errors):
+            if object_validator and isinstance(value, dict):
+                return object_validator(value, path, errors)
+            if array_validator and isinstance(value, list):
+                return array_validator(value, path, errors)
+            for expected in scalar_types:
+                ok, coerced = _coerce_scalar(value, expected)
+                if ok:
+                    return coerced
+            if array_validator and value is not None:
+                # Tek değer verilmişse tek elemanlı listeye çevir
+                return array_validator([value], path, errors)
+            errors.append({"field": path or "$", "reason": f"expected {' or '.join(types)}"})
+            return value
+
+        return validate
+
+    def _compile_object(self, schema: Dict[str, Any]) -> Validator:
+        properties = {name: self._compile(spec) for name, spec in (schema.get("properties") or {}).items()}
+        defaults = {name: spec["default"] for name, spec in (schema.get("properties") or {}).items()
+                    if isinstance(spec, dict) and "default" in spec}
+        required = list(schema.get("required") or [])
+        drop_unknown = schema.get("additionalProperties") is False
+
+        def validate(value, path, errors):
+            result = {}
+            for name, item in value.items():
+                if item is None:
+                    continue
+                if name in properties:
+                    result[name] = properties[name](item, _join(path, name), errors)
+                elif not drop_unknown:
+                    result[name] = item
+            for name, default in defaults.items():
+                result.setdefault(name, default)
+            for name in required:
+                if name not in result:
+                    errors.append({"field": _join(path, name), "reason": MISSING_REASON})
+            return result
+
+        return validate
+
+    def _compile_array(self, schema: Dict[str, Any]) -> Validator:
+        item_validator = self._compile(schema.get("items") or {})
+        min_items = schema.get("minItems")
+
+        def validate(value, path, errors):
+            result = [item_validator(item, f"{path}[{i}]", errors) for i, item in enumerate(value) if item is not None]
+            if min_items is not None and len(result) < min_items:
+                errors.append({"field": path or "$", "reason": f"expected at least {min_items} items"})
+            return result
+
+        return validate
+
+    @staticmethod
+    def _compile_enum(allowed: List[Any]) -> Validator:
+        lowered = {str(option).lower(): option for option in allowed}
+
+        def validate(value, path, errors):
+            if value in allowed:
+                return value
+            # Büyük/küçük harf farkını düzelt (ör. "one_way" -> "ONE_WAY")
+            match = lowered.get(str(value).lower())
+            if match is not None:
+                return match
+            errors.append({"field": path or "$", "reason": f"must be one of {allowed}"})
+            return value
+
+        return validate
+
+    @staticmethod
+    def _check_date(value, path, errors):
+        if isinstance(value, str) and not DATE_PATTERN.match(value):
+            errors.append({"field": path or "$", "reason": "expected date in YYYY-MM-DD format"})
+        return value
+
+    @staticmethod
+    def _compile_bounds(schema: Dict[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+        for key, test, reason in (
+            ("minimum", lambda v, b: v >= b, "must be >= {}"),
+            ("maximum", lambda v, b: v <= b, "must be <= {}"),
+        ):
+            if key in schema:
+                bound = schema[key]
+
+                def check(value, path, errors, bound=bound, test=test, reason=reason):
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) and not test(value, bound):
+                        errors.append({"field": path or "$", "reason": reason.format(bound)})
+                    return value
+                checks.append(check)
+        for key, test, reason in (
+            ("minLength", lambda v, b: len(v) >= b, "must be at least {} characters"),
+            ("maxLength", lambda v, b: len(v) <= b, "must be at most {} characters"),
+        ):
+            if key in schema:
+                bound = schema[key]
+
+                def check(value, path, errors, bound=bound, test=test, reason=reason):
+                    if isinstance(value, str) and not test(value, bound):
+                        errors.append({"field": path or "$", "reason": reason.format(bound)})
+                    return value
+                checks.append(check)
+        return checks
+
+
+class SchemaValidatorRegistry:
+    """Araç şemalarının derlenmiş doğrulayıcılarını katalog versiyonu başına saklar."""
+
+    def __init__(self):
+        self._validators: Dict[Hashable, Tuple[int, Dict[str, Callable]]] = {}
+
+    def get(self, catalog_key: Hashable, version: int, tool: Dict[str, Any]) -> Callable[[Any], Tuple[Any, List[Dict[str, str]]]]:
+        cached_version, validators = self._validators.get(catalog_key, (None, {}))
+        if cached_version != version:
+            validators = {}
+            self._validators[catalog_key] = (version, validators)
+        validator = validators.get(tool["name"])
+        if validator is None:
+            validator = SchemaCompiler(tool.get("input_schema") or {}).compile()
+            validators[tool["name"]] = validator
+            logger.debug(f"Compiled input schema validator for '{tool['name']}' (catalog version {version})")
+        return validator
+
+
+def failing_fields(errors: List[Dict[str, str]], include_missing: bool = True) -> List[str]:
+    """Hata listesinden üst seviye alan adlarını çıkar."""
+    fields = []
+    for error in errors:
+        if not include_missing and error["reason"] == MISSING_REASON:
+            continue
+        name = re.split(r"[.\[]", error["field"], maxsplit=1)[0]
+        if name and name != "$" and name not in fields:
+            fields.append(name)
+    return fields
+
+
+schema_validators = SchemaValidatorRegistry()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+from loguru import logger
+from src.main.telemetry import telemetry
+
+
+@dataclass
+class CatalogEntry:
+    tools: List[Dict[str, Any]]
+    version: int
+    fetched_at: float = field(default_factory=time.monotonic)
+
+
+class ToolCatalogCache:
+    """MCP araç listesini endpoint/kimlik bilgisine göre süreç genelinde önbelleğe alır.
+
+    Aynı MCP hesabını kullanan tüm oturumlar tek bir kopyayı paylaşır. Kayıtlar
+    TTL dolunca veya sunucu `tools/list_changed` bildirimi gönderince yenilenir.
+    Her yenilemede `version` artar; katalog versiyonuna bağlı türetilmiş yapılar
+    (indeksler, şema doğrulayıcıları) bunu anahtar olarak kullanabilir.
+
+    `invalidate` ayrıca anahtarın kuşağını (generation) artırır: list_tools
+    sürerken gelen bir bildirim, o yenilemenin eski listesinin önbelleğe taze
+    TTL ile yazılmasını engeller.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("MCP_TOOL_CATALOG_TTL", "300"))
+        self._entries: Dict[Hashable, CatalogEntry] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._versions: Dict[Hashable, int] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._global_generation = 0
+
+    @staticmethod
+    def key_for(session) -> Hashable:
+        """Oturumun katalog anahtarı; open_client tarafından atanır, yoksa nesne kimliği kullanılır."""
+        return getattr(session, "catalog_key", None) or id(session)
+
+    def _generation(self, key: Hashable) -> tuple:
+        return (self._global_generation, self._generations.get(key, 0))
+
+    def _is_fresh(self, entry: CatalogEntry) -> bool:
+        return (time.monotonic() - entry.fetched_at) < self.ttl_seconds
+
+    async def get(self, session) -> CatalogEntry:
+        """Önbellekteki kataloğu döndür, gerekiyorsa tek bir list_tools çağrısıyla yenile."""
+        key = self.key_for(session)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Kilidi beklerken başka bir istek kataloğu yenilemiş olabilir
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                return entry
+
+            generation = self._generation(key)
+            with telemetry.span("mcp.list_tools", "mcp_request_duration_seconds", method="list_tools", tool=""):
+                tools_resp = await session.list_tools()
+            tools = [{"name": tool.name, "description": tool.description or "", "input_schema": tool.inputSchema or {}}
+                     for tool in tools_resp.tools]
+            version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            entry = CatalogEntry(tools=tools, version=version)
+            if self._generation(key) != generation:
+                # Liste istek sürerken geçersiz kılındı; bu çağrıya dönülür ama önbelleğe yazılmaz
+                logger.info(f"Tool catalog for {key!r} was invalidated during refresh; not caching version {version}")
+                return entry
+            self._entries[key] = entry
+            logger.info(f"Tool catalog refreshed for {key!r}: {len(tools)} tools (version {version})")
+            return entry
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Tek bir anahtarın veya (key=None ise) tüm kataloğun önbelleğini düşür."""
+        if key is None:
+            self._global_generation += 1
+            self._entries.clear()
+        else:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+        logger.info(f"Tool catalog invalidated for {key!r}" if key is not None else "Tool catalog cache cleared")
+
+
+tool_catalog = ToolCatalogCache()
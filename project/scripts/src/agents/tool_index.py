@@ -0,0 +1,140 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from loguru import logger
+
+# Türkçe gibi eklemeli dillerde "uçuşları", "uçuşlar" gibi çekimleri aynı köke
+# indirmek için kelimelerin ilk STEM_LENGTH karakteri kullanılır.
+STEM_LENGTH = 5
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def fold(text: str) -> str:
+    """Harf büyüklüğünü ve Türkçe noktalı/noktasız i farkını yok say (İ, I, ı, i -> i).
+
+    Araç adları/açıklamaları ile kullanıcı sorguları aynı biçimde katlanır; böylece
+    "getFlightInfo", "flight info" ve "Istanbul"/"istanbul" aynı terimlere iner.
+    """
+    return (text or "").replace("İ", "i").casefold().replace("ı", "i")
+
+
+def words(text: str) -> List[str]:
+    """camelCase / snake_case adları da bölerek katlanmış kelimeler üret."""
+    text = re.sub(r"([a-zçğıöşü0-9])([A-ZÇĞİÖŞÜ])", r"\1 \2", text or "")
+    return re.findall(r"\w+", fold(text.replace("_", " ")))
+
+
+def tokenize(text: str) -> List[str]:
+    """Kelimelerin kısaltılmış köklerini üret (tek harfliler atlanır)."""
+    return [word[:STEM_LENGTH] for word in words(text) if len(word) > 1]
+
+
+def _tool_document(tool: Dict[str, Any]) -> List[str]:
+    """Aracın adı (iki kat ağırlıklı), açıklaması ve şema alanlarından terim listesi."""
+    terms = tokenize(tool.get("name", "")) * 2
+    terms += tokenize(tool.get("description", ""))
+    properties = (tool.get("input_schema") or {}).get("properties") or {}
+    for name, spec in properties.items():
+        terms += tokenize(name)
+        if isinstance(spec, dict):
+            terms += tokenize(spec.get("description", ""))
+    return terms
+
+
+class ToolIndex:
+    """Bir katalog versiyonu için BM25 araç indeksi (isteğe bağlı gömme vektörleriyle)."""
+
+    def __init__(self, tools: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.tools = tools
+        self.k1 = k1
+        self.b = b
+        self._docs = [Counter(_tool_document(tool)) for tool in tools]
+        self._doc_lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = (sum(self._doc_lengths) / len(self._docs)) if self._docs else 0.0
+        document_frequency = Counter(term for doc in self._docs for term in doc)
+        total = len(self._docs)
+        self._idf = {term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+        self._vectors: Optional[List[List[float]]] = None
+
+    def _bm25(self, query_terms: List[str]) -> List[float]:
+        scores = []
+        for doc, length in zip(self._docs, self._doc_lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = doc.get(term)
+                if not tf:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    async def ensure_embeddings(self, embedder: Embedder) -> None:
+        """Araç metinlerinin gömme vektörlerini bir kez hesapla ve sakla."""
+        if self._vectors is None and self.tools:
+            texts = [f"{tool['name']}: {tool.get('description', '')}" for tool in self.tools]
+            self._vectors = await embedder(texts)
+
+    def search(self, query: str, top_k: int, query_vector: Optional[List[float]] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Sorguya en uygun `top_k` aracı (araç, skor) olarak döndür; eşleşmeyenler dahil edilmez."""
+        scores = self._bm25(tokenize(query))
+        if query_vector is not None and self._vectors is not None:
+            best = max(scores, default=0.0) or 1.0
+            # BM25 skorları [0, 1] aralığına çekilip kosinüs benzerliğiyle toplanır
+            scores = [score / best + max(_cosine(query_vector, vector), 0.0)
+                      for score, vector in zip(scores, self._vectors)]
+        ranked = sorted(zip(self.tools, scores), key=lambda item: item[1], reverse=True)
+        return [(tool, score) for tool, score in ranked[:top_k] if score > 0]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ToolIndexRegistry:
+    """Katalog anahtarı başına en güncel versiyonun indeksini tutar."""
+
+    def __init__(self, embedder: Optional[Embedder] = None):
+        self.embedder = embedder
+        self.top_k = int(os.getenv("TOOL_SHORTLIST_K", "5"))
+        self.fast_path_confidence = float(os.getenv("TOOL_FASTPATH_CONFIDENCE", "0.85"))
+        self.fast_path_min_score = float(os.getenv("TOOL_FASTPATH_MIN_SCORE", "2.0"))
+        self._indexes: Dict[Hashable, Tuple[int, ToolIndex]] = {}
+
+    def get(self, key: Hashable, version: int, tools: List[Dict[str, Any]]) -> ToolIndex:
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = ToolIndex(tools)
+        self._indexes[key] = (version, index)
+        logger.info(f"Built tool index for {key!r} (version {version}, {len(tools)} tools)")
+        return index
+
+    async def shortlist(self, index: ToolIndex, query: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], float]:
+        """(aday araçlar, yüksek güvenle tek eşleşen araç veya None, güven) döndür.
+
+        Hiçbir araç eşleşmezse kısaltma yapılamaz ve tüm katalog döner.
+        """
+        query_vector = None
+        if self.embedder is not None:
+            await index.ensure_embeddings(self.embedder)
+            query_vector = (await self.embedder([query]))[0]
+
+        ranked = index.search(query, self.top_k, query_vector)
+        if not ranked:
+            return index.tools, None, 0.0
+
+        top_tool, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = top_score / (top_score + runner_up)
+        if confidence >= self.fast_path_confidence and top_score >= self.fast_path_min_score:
+            return [tool for tool, _ in ranked], top_tool, confidence
+        return [tool for tool, _ in ranked], None, confidence
+
+
+tool_indexes = ToolIndexRegistry()
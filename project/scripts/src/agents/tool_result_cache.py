@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from loguru import logger
+
+
+class ToolResultCache:
+    """MCP araç sonuçları için TTL önbelleği ve eşzamanlı istek birleştirme (single-flight).
+
+    Yalnızca TTL'i tanımlı (salt-okunur kabul edilen) araçlar önbelleğe alınır ve
+    birleştirilir; ayar `MCP_TOOL_CACHE_TTLS` env değişkeninden JSON olarak okunur,
+    ör. '{"search_flights": 60}'. Anahtar MCP hesabı, araç adı ve sıralanmış
+    argümanlardan oluşur; böylece farklı kullanıcıların sonuçları karışmaz.
+    Sadece başarılı ("ok") sonuçlar saklanır.
+
+    Birleştirilen çağrı, onu ilk başlatan isteğe değil önbelleğe ait ayrı bir
+    task'ta çalışır; her çağıran sonucu `asyncio.shield` ile bekler. Böylece bir
+    çağıranın zaman aşımı veya iptali yalnızca onu etkiler, aynı sonucu bekleyen
+    diğer oturumlara iptal olarak yansımaz. Bekleyen kimse kalmazsa çağrı iptal edilir.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.ttls = ttls if ttls is not None else json.loads(os.getenv("MCP_TOOL_CACHE_TTLS", "{}"))
+        self.default_ttl = default_ttl if default_ttl is not None else float(os.getenv("MCP_TOOL_CACHE_DEFAULT_TTL", "0"))
+        self.max_entries = max_entries or int(os.getenv("MCP_TOOL_CACHE_MAX_ENTRIES", "1024"))
+        self._entries: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+        self._inflight: Dict[str, "_Flight"] = {}
+        self._metrics = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def ttl_for(self, tool_name: str) -> float:
+        return float(self.ttls.get(tool_name, self.default_ttl))
+
+    @staticmethod
+    def make_key(account_key: Hashable, tool_name: str, tool_args: dict) -> str:
+        canonical_args = json.dumps(tool_args or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return json.dumps([repr(account_key), tool_name, canonical_args])
+
+    async def get_or_call(self, account_key: Hashable, tool_name: str, tool_args: dict,
+                          call: Callable[[], Awaitable[dict]]) -> dict:
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return await call()
+
+        key = self.make_key(account_key, tool_name, tool_args)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                logger.info(f"Tool result cache hit for '{tool_name}'")
+                return entry[0]
+            del self._entries[key]
+
+        # Aynı çağrı zaten sürüyorsa onun sonucunu bekle
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self._metrics["coalesced"] += 1
+            logger.info(f"Coalescing concurrent call to '{tool_name}'")
+        else:
+            self._metrics["misses"] += 1
+            flight = self._start(key, ttl, call)
+        return await self._wait(key, flight)
+
+    def _start(self, key: str, ttl: float, call: Callable[[], Awaitable[dict]]) -> "_Flight":
+        flight = _Flight(asyncio.get_running_loop().create_task(call()))
+        self._inflight[key] = flight
+
+        def _done(task: asyncio.Task):
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            # exception() hatayı "alınmış" işaretler; bekleyen kalmadıysa uyarı basılmaz
+            if task.cancelled() or task.exception() is not None:
+                return
+            result = task.result()
+            if isinstance(result, dict) and result.get("ok"):
+                self._entries[key] = (result, time.monotonic() + ttl)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        flight.task.add_done_callback(_done)
+        return flight
+
+    async def _wait(self, key: str, flight: "_Flight") -> dict:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Son bekleyen de vazgeçti (iptal/zaman aşımı); sonucu isteyen kalmadı.
+                # Yeni gelenler iptal edilen çağrıya eklenmesin diye kayıt hemen silinir.
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                flight.task.cancel()
+
+    def invalidate(self, tool_name: Optional[str] = None) -> None:
+        if tool_name is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if json.loads(k)[1] == tool_name]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "entries": len(self._entries), "in_flight": len(self._inflight)}
+
+
+class _Flight:
+    """Süren tek bir birleştirilmiş çağrı ve onu bekleyenlerin sayısı."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+tool_result_cache = ToolResultCache()
@@ -1,13 +1,35 @@
 ﻿import asyncio
-from mcp import ClientSession, StdioServerParameters
+import hashlib
+import json
+import os
+import re
+import shlex
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from loguru import logger
-from typing import TYPE_CHECKING, List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+from src.agents.tool_catalog import tool_catalog, CatalogEntry
+from src.agents.tool_result_cache import tool_result_cache
+from src.agents.schema_validator import schema_validators
+from src.main.telemetry import telemetry
+
+MCP_ENDPOINT = "https://mcp.turkishtechlab.com/mcp"
+# Ayarlanırsa npx mcp-remote yerine bu stdio komutu başlatılır (ör. yerel benchmark sunucusu)
+MCP_SERVER_COMMAND_ENV = "MCP_SERVER_COMMAND"
+# Bağlanma + oturum başlatma için toplam süre sınırı (saniye)
+MCP_CONNECT_TIMEOUT_ENV = "MCP_CONNECT_TIMEOUT"
 
 if TYPE_CHECKING:
     from mcp import ClientSession
 
 
+def catalog_key_for(username: str, password: str, endpoint: Optional[str] = None) -> Tuple[str, str, str]:
+    """Builds the cache key for an MCP account without keeping the raw password around."""
+    endpoint = endpoint or os.getenv(MCP_SERVER_COMMAND_ENV) or MCP_ENDPOINT
+    password_digest = hashlib.sha256(password.encode("utf-8")).hexdigest()[:16]
+    return (endpoint, username, password_digest)
+
+
 async def open_client(username: str, password: str) -> 'ClientSession':
     """
     Starts an in-container MCP client using `npx mcp-remote` via the stdio client
@@ -19,60 +41,168 @@ async def open_client(username: str, password: str) -> 'ClientSession':
     if not username or not password:
         raise ValueError("MCP username and password must be provided.")
 
-    server_params = StdioServerParameters(
-        command="npx",
-        args=[
-            "-y", "mcp-remote", "https://mcp.turkishtechlab.com/mcp",
-            "--username", username,
-            "--password", password
-        ],
-    )
+    server_command = os.getenv(MCP_SERVER_COMMAND_ENV)
+    if server_command:
+        command, *args = shlex.split(server_command)
+        server_params = StdioServerParameters(command=command, args=args)
+    else:
+        server_params = StdioServerParameters(
+            command="npx",
+            args=[
+                "-y", "mcp-remote", MCP_ENDPOINT,
+                "--username", username,
+                "--password", password
+            ],
+        )
+
+    catalog_key = catalog_key_for(username, password)
+    timeout = float(os.getenv(MCP_CONNECT_TIMEOUT_ENV, "120"))
+    ready = asyncio.get_running_loop().create_future()
+    shutdown = asyncio.Event()
+    # anyio iptal kapsamları (stdio_client, ClientSession) açıldıkları task'ta
+    # kapatılmalıdır; bağlantı bu yüzden kendi uzun ömürlü task'ında yaşar.
+    owner = asyncio.create_task(_own_connection(server_params, catalog_key, ready, shutdown),
+                                name=f"mcp-connection-{username}")
 
-    err_log = open("mcp_errors.log", "w", encoding="utf-8")
-    stdio_cm = stdio_client(server_params, errlog=err_log)
-    
     try:
-        # Increase timeout to allow for slower container startups
-        logger.info("Attempting to connect to MCP server... (max 60 seconds)")
-        reader, writer = await asyncio.wait_for(stdio_cm.__aenter__(), timeout=60.0)
-        logger.info("Connection established with stdio server.")
-
-        client_cm = ClientSession(reader, writer)
-        client_session = await client_cm.__aenter__()
-
-        # Allow extra time for session initialization
-        logger.info("Attempting to initialize client session... (max 60 seconds)")
-        await asyncio.wait_for(client_session.initialize(), timeout=60.0)
-        logger.success("✅ MCP Session Initialized Successfully! Ready to chat.")
-        
-        async def _close_wrapper():
-            await client_cm.__aexit__(None, None, None)
-            await stdio_cm.__aexit__(None, None, None)
-            err_log.close()
-
-        client_session.close = _close_wrapper
-        return client_session
+        logger.info(f"Attempting to connect to MCP server... (max {timeout:g} seconds)")
+        client_session = await asyncio.wait_for(asyncio.shield(ready), timeout=timeout)
     except asyncio.TimeoutError:
+        # Takılan sunucu süreci (ör. npx) owner task iptal edilince kapatılır
+        await _cancel_owner(owner, ready)
         logger.error("MCP connection timed out. The container might have network issues or the credentials might be invalid.")
-        err_log.close()
         raise ConnectionError("MCP sunucusuna bağlanırken zaman aşımı oluştu.")
+    except asyncio.CancelledError:
+        owner.cancel()
+        raise
     except Exception as e:
         logger.error(f"An unexpected error occurred during client connection: {e}")
-        err_log.close()
         raise
 
+    async def _close_wrapper():
+        # Kapatma, bağlantıyı açan task'a bildirilir; çağıran task fark etmez
+        shutdown.set()
+        try:
+            await asyncio.wait_for(owner, timeout=10.0)
+        except asyncio.TimeoutError:
+            logger.warning("MCP connection did not shut down within 10 seconds; it was cancelled.")
+
+    client_session.close = _close_wrapper
+    client_session.catalog_key = catalog_key
+    return client_session
+
+
+async def _cancel_owner(owner: asyncio.Task, ready: asyncio.Future) -> None:
+    ready.cancel()
+    owner.cancel()
+    try:
+        await asyncio.wait_for(owner, timeout=10.0)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        pass
+    except Exception as e:
+        logger.warning(f"MCP connection failed while being cancelled: {e}")
+
+
+async def _own_connection(server_params: StdioServerParameters, catalog_key: Tuple[str, str, str],
+                          ready: asyncio.Future, shutdown: asyncio.Event) -> None:
+    """Bağlantıyı açar, hazır olunca `ready`'yi tamamlar ve `shutdown` gelene kadar açık tutar."""
+
+    async def _message_handler(message):
+        # Sunucu araç listesinin değiştiğini bildirirse önbelleği düşür
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            tool_catalog.invalidate(catalog_key)
+
+    with open("mcp_errors.log", "w", encoding="utf-8") as err_log:
+        try:
+            async with stdio_client(server_params, errlog=err_log) as (reader, writer):
+                logger.info("Connection established with stdio server.")
+                async with ClientSession(reader, writer, message_handler=_message_handler) as client_session:
+                    # Süre sınırı open_client'ta bağlanma ile birlikte uygulanır
+                    logger.info("Attempting to initialize client session...")
+                    await client_session.initialize()
+                    logger.success("✅ MCP Session Initialized Successfully! Ready to chat.")
+                    if ready.cancelled():
+                        return
+                    ready.set_result(client_session)
+                    await shutdown.wait()
+        except BaseException as e:
+            if not ready.done():
+                if isinstance(e, asyncio.CancelledError):
+                    ready.cancel()
+                    raise
+                ready.set_exception(e)
+                return
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            logger.warning(f"MCP connection closed with an error: {e}")
+
+
+def parse_json_from_response(response: str) -> Any:
+    """Extracts and parses JSON from an LLM response, handling markdown code blocks and NaN values."""
+    match = re.search(r"```(?:json)?\s*([\[{].*?[\]}])\s*```", response, re.DOTALL)
+    json_str = match.group(1) if match else response
+    try:
+        json_str = json_str.replace("NaN", "null")
+        return json.loads(json_str)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON from LLM response: {e}")
+        logger.error(f"Original response string: {response}")
+        return {"error": "failed_to_parse_json", "details": str(e)}
+
+
+async def get_tool_catalog(session: 'ClientSession') -> CatalogEntry:
+    """Returns the cached catalog entry (tools plus catalog version) for the session's MCP account."""
+    return await tool_catalog.get(session)
+
 
 async def get_structured_tools(session: 'ClientSession') -> List[Dict[str, Any]]:
-    tools_resp = await session.list_tools()
-    return [{"name": tool.name, "description": tool.description or "", "input_schema": tool.inputSchema or {}} for tool in tools_resp.tools]
+    entry = await tool_catalog.get(session)
+    return entry.tools
+
+
+async def get_tool_validator(session: 'ClientSession', tool: Dict[str, Any]):
+    """Returns the input validator of a tool, compiled once per catalog version."""
+    entry = await tool_catalog.get(session)
+    return schema_validators.get(tool_catalog.key_for(session), entry.version, tool)
 
 
 async def execute_tool_with_params(tool_name: str, tool_args: dict, session: 'ClientSession') -> dict:
+    """Calls an MCP tool, serving read-only tools from the result cache and coalescing identical in-flight calls."""
+    return await tool_result_cache.get_or_call(
+        tool_catalog.key_for(session), tool_name, tool_args,
+        lambda: _call_tool(tool_name, tool_args, session)
+    )
+
+
+async def _call_tool(tool_name: str, tool_args: dict, session: 'ClientSession') -> dict:
+    with telemetry.span("mcp.call_tool", "mcp_request_duration_seconds", method="call_tool", tool=tool_name) as span:
+        result = await _call_tool_unobserved(tool_name, tool_args, session)
+        if "error" in result:
+            span.set_status("error")
+        return result
+
+
+def _unwrap_structured(structured: Any) -> Any:
+    """FastMCP, nesne olmayan dönüş değerlerini `{"result": değer}` ile sarar; sarmalı aç.
+
+    Metin dönen araçlarda sarmalın içi content'teki metnin aynısıdır; bu durumda
+    None dönülür ve çağıran metni kullanır (JSON ise sonraki adımlar çözümler).
+    """
+    if isinstance(structured, dict) and list(structured) == ["result"]:
+        value = structured["result"]
+        return None if isinstance(value, str) else value
+    return structured
+
+
+async def _call_tool_unobserved(tool_name: str, tool_args: dict, session: 'ClientSession') -> dict:
     try:
         tool_resp = await session.call_tool(tool_name, tool_args)
-        if hasattr(tool_resp, "error") and tool_resp.error: return {"error": "execution_error", "message": str(tool_resp.error)}
-        if hasattr(tool_resp, 'parts'): return {"ok": True, "result": "".join(part.text for part in tool_resp.parts if hasattr(part, 'text'))}
-        return {"ok": True, "result": str(tool_resp)}
+        # CallToolResult: content (TextContent vb. listesi), structuredContent (dict), isError
+        text = "".join(part.text for part in getattr(tool_resp, "content", None) or [] if getattr(part, "text", None))
+        if getattr(tool_resp, "isError", False): return {"error": "execution_error", "message": text or str(tool_resp)}
+        structured = _unwrap_structured(getattr(tool_resp, "structuredContent", None))
+        if structured is not None: return {"ok": True, "result": structured}
+        return {"ok": True, "result": text}
     except Exception as e:
         logger.error(f"Exception during tool execution: {e}")
         error_str = str(e)
@@ -1,20 +1,429 @@
+import asyncio
 import sqlite3
+import atexit
 import json
+import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Hashable
 from pathlib import Path
 from loguru import logger
+from src.main.telemetry import telemetry
+
+# Sık kullanılan sorgular sabit metin olarak tutulur; sqlite3 aynı metin için
+# derlenmiş (prepared) statement'ı bağlantı önbelleğinden yeniden kullanır.
+INSERT_STATE_SQL = """
+    INSERT INTO workflow_states 
+    (id, session_id, state_data, created_at, updated_at, kind)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_MESSAGE_SQL = """
+    INSERT INTO conversation_messages 
+    (session_id, seq, role, content, created_at)
+    VALUES (?, COALESCE((SELECT MAX(seq) FROM conversation_messages WHERE session_id = ?), 0) + 1, ?, ?, ?)
+"""
+
+SELECT_MESSAGES_SQL = """
+    SELECT role, content FROM conversation_messages 
+    WHERE session_id = ?
+    ORDER BY seq
+"""
+
+SELECT_STATE_SQL = """
+    SELECT state_data FROM workflow_states 
+    WHERE id = ? AND status = 'active'
+"""
+
+UPDATE_STATE_SQL = """
+    UPDATE workflow_states 
+    SET state_data = ?, updated_at = ?
+    WHERE id = ? AND status = 'active'
+"""
+
+SELECT_SESSION_STATES_SQL = """
+    SELECT id, state_data, created_at, updated_at 
+    FROM workflow_states 
+    WHERE session_id = ? AND status = 'active'
+    ORDER BY created_at DESC
+"""
+
+DELETE_STATE_SQL = """
+    UPDATE workflow_states 
+    SET status = 'deleted', updated_at = ?
+    WHERE id = ?
+"""
+
+CLEANUP_STATES_SQL = """
+    UPDATE workflow_states 
+    SET status = 'expired', updated_at = ?
+    WHERE created_at < datetime('now', ?)
+    AND status = 'active'
+"""
+
+SELECT_LATEST_BY_KIND_SQL = """
+    SELECT id, state_data FROM workflow_states 
+    WHERE session_id = ? AND kind = ? AND status = 'active'
+    ORDER BY created_at DESC, rowid DESC
+    LIMIT 1
+"""
+
+# Çok süreçli kullanımda önbellek doğrulaması için yalnızca indeksten okunan sürüm sorguları
+SELECT_LATEST_ID_BY_KIND_SQL = """
+    SELECT id FROM workflow_states 
+    WHERE session_id = ? AND kind = ? AND status = 'active'
+    ORDER BY created_at DESC, rowid DESC
+    LIMIT 1
+"""
+
+SELECT_MAX_SEQ_SQL = """
+    SELECT COALESCE(MAX(seq), 0) FROM conversation_messages WHERE session_id = ?
+"""
+
+SELECT_STATE_HISTORY_SQL = """
+    SELECT id, state_data, created_at, status
+    FROM workflow_states 
+    WHERE session_id = ?
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+
+class _ByteBoundedLRU:
+    """Toplam boyutu bayt cinsinden sınırlı, thread-safe LRU önbellek."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key: Hashable) -> Any:
+        """Sayaçları ve LRU sırasını etkilemeden oku."""
+        with self._lock:
+            item = self._items.get(key)
+            return item[0] if item is not None else None
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                self.current_bytes -= self._items.pop(key)[1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
 
 class StateStore:
-    def __init__(self, db_path: str = "workflow_state.db"):
+    """SQLite tabanlı state deposu.
+
+    Tek bir uzun ömürlü bağlantı WAL modunda açılır ve tüm metotlar tarafından
+    paylaşılır. Bağlantı thread'ler arasında kullanılabilir; erişim bir kilit
+    ile sıralanır. Aynı veritabanı dosyası için süreç genelinde tek örnek
+    almak için `StateStore.shared()` kullanılmalıdır.
+
+    `durability` yazma davranışını belirler:
+      - "batched" (varsayılan): `save_state` kaydı kuyruğa alır ve hemen döner;
+        arka plandaki yazıcı thread kuyruğu her `flush_interval_ms` içinde tek
+        bir transaction ile yazar. Okumalar önce kuyruğu boşaltır, kapanışta
+        bekleyen kayıtlar yazılır.
+      - "sync": her kayıt çağıran thread'de, synchronous=FULL ile yazılır.
+
+    Aktif oturumların konuşma geçmişi ve her türün son state'i, boyutu
+    `cache_max_bytes` ile sınırlı bir LRU önbellekte tutulur. Yazmalar
+    önbelleğe de işlenir (write-through), böylece sıcak oturumların okuma
+    yolu diske inmez. Event loop'tan `aget_latest_state` ve
+    `aget_latest_conversation` kullanılmalıdır: önbellek isabetleri doğrudan
+    döner, ıskalamalar (kuyruğun yazılması ve SQLite okuması) bir thread'de
+    çalışır; böylece okuyan istek yazıcı thread'in commit'ini beklemez.
+
+    `coherence` aynı dosyayı paylaşan birden fazla süreç (uvicorn worker'ları)
+    varken önbelleğin nasıl kullanılacağını belirler:
+      - "local": önbellek tek yazarın bu süreç olduğunu varsayar.
+      - "validate": önce `PRAGMA data_version` ile başka bir bağlantının
+        commit yapıp yapmadığına bakılır; yapmadıysa kayıt doğrudan kullanılır.
+        Yaptıysa kayıt indeksten okunan sürümüyle (son state'in id'si, son
+        mesajın sıra numarası) karşılaştırılır ve gerekirse diskten yeniden
+        yüklenir. Bu kontroller async okumalarda thread'de yapılır.
+        `aflush_turn()` tur sonunda bekleyen kayıtları (yine thread'de) hemen
+        yazar ki oturumun sonraki isteği başka bir worker'a düşse de güncel
+        geçmişi görsün.
+    Varsayılan STATE_CACHE_COHERENCE, yoksa WEB_CONCURRENCY > 1 ise "validate".
+    Süreçler aynı makinedeki aynı dosyayı paylaşmalıdır; SQLite ağ dosya
+    sistemleri üzerinden düğümler arasında paylaşılamaz.
+    """
+
+    _shared_instances: Dict[str, "StateStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str = "workflow_state.db", durability: Optional[str] = None,
+                 flush_interval_ms: Optional[int] = None, cache_max_bytes: Optional[int] = None,
+                 coherence: Optional[str] = None):
         self.db_path = Path(db_path)
+        self.durability = durability or os.getenv("STATE_STORE_DURABILITY", "batched")
+        if self.durability not in ("batched", "sync"):
+            raise ValueError(f"Unknown durability mode: {self.durability}")
+        self.coherence = coherence or os.getenv("STATE_CACHE_COHERENCE") or \
+            ("validate" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "local")
+        if self.coherence not in ("local", "validate"):
+            raise ValueError(f"Unknown cache coherence mode: {self.coherence}")
+        self.stale_reads = 0
+        # Kalıcı hata verdiği için yazılamayıp kuyruktan atılan kayıtlar
+        self.dropped_rows = 0
+        # Son gözlenen data_version ve o sürümden beri geçerli olduğu bilinen önbellek anahtarları
+        self._fresh_version: Optional[int] = None
+        self._fresh_keys: set = set()
+        self.flush_interval = (flush_interval_ms or int(os.getenv("STATE_STORE_FLUSH_MS", "50"))) / 1000
+        self._lock = threading.RLock()
+        self._cache = _ByteBoundedLRU(cache_max_bytes or int(os.getenv("STATE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+        self._conn = self._connect()
         self.init_database()
+
+        self._pending: list[tuple[str, tuple]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        if self.durability == "batched":
+            self._writer = threading.Thread(target=self._writer_loop, name="state-store-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    @classmethod
+    def shared(cls, db_path: Optional[str] = None) -> "StateStore":
+        """Verilen veritabanı için süreç genelinde paylaşılan örneği döndür."""
+        db_path = db_path or os.getenv("STATE_DB_PATH", "workflow_state.db")
+        key = str(Path(db_path).resolve())
+        with cls._shared_lock:
+            instance = cls._shared_instances.get(key)
+            if instance is None:
+                instance = cls(db_path)
+                cls._shared_instances[key] = instance
+            return instance
+
+    @classmethod
+    def close_shared(cls):
+        """Paylaşılan tüm örneklerin bekleyen kayıtlarını yaz ve bağlantılarını kapat."""
+        with cls._shared_lock:
+            instances = list(cls._shared_instances.values())
+            cls._shared_instances.clear()
+        for instance in instances:
+            instance.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        # Diğer worker'lar dosyayı kilitliyken hata vermek yerine bekle (WAL geçişi dahil)
+        conn.execute("PRAGMA busy_timeout=5000")
+        # WAL: okuyucular yazıcıyı beklemez; NORMAL senkronizasyon WAL ile güvenli
+        # ve her commit'te fsync maliyetini ortadan kaldırır.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL" if self.durability == "sync" else "PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-16000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _migrate_conversations(self, conn: sqlite3.Connection):
+        """workflow_states içindeki son konuşma kayıtlarını mesaj tablosuna taşı"""
+        rows = conn.execute("""
+            SELECT session_id, state_data FROM workflow_states AS w
+            WHERE kind = 'conversation' AND status = 'active'
+            AND created_at = (
+                SELECT MAX(created_at) FROM workflow_states
+                WHERE session_id = w.session_id AND kind = 'conversation' AND status = 'active'
+            )
+            AND NOT EXISTS (SELECT 1 FROM conversation_messages WHERE session_id = w.session_id)
+        """).fetchall()
+        migrated = 0
+        for session_id, state_data in rows:
+            history = json.loads(state_data).get("conversation_history", [])
+            conn.executemany(
+                "INSERT OR IGNORE INTO conversation_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, seq, *self._split_message(message)) for seq, message in enumerate(history, start=1)]
+            )
+            migrated += 1
+        if migrated:
+            logger.info(f"Migrated conversation history of {migrated} sessions to conversation_messages")
+
+    @staticmethod
+    def _split_message(message: str) -> tuple[str, str]:
+        """'Human: merhaba' -> ('Human', 'merhaba')"""
+        role, sep, content = message.partition(": ")
+        return (role, content) if sep else ("", message)
+
+    @staticmethod
+    def _join_message(role: str, content: str) -> str:
+        return f"{role}: {content}" if role else content
+
+    @staticmethod
+    def _conversation_size(history: tuple) -> int:
+        return sum(len(message.encode("utf-8")) for message in history)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Sıcak önbelleğin isabet/ıskalama sayaçları ve boyutu"""
+        return {**self._cache.stats(), "coherence": self.coherence, "stale_reads": self.stale_reads,
+                "dropped_rows": self.dropped_rows}
+
+    async def aflush_turn(self):
+        """Tur sonunda çağrılır; başka süreçler de okuyorsa bekleyen kayıtları hemen yaz."""
+        if self.coherence == "validate" and self._pending:
+            await asyncio.to_thread(self.flush)
+
+    def _is_current(self, key: Hashable, sql: str, params: tuple, version: Any) -> bool:
+        """Önbellekteki sürüm veritabanındakiyle aynı mı? ("local" modda sorgu yapılmaz)"""
+        if self.coherence == "local":
+            return True
+        with self._lock:
+            # data_version yalnızca başka bağlantıların commit'leriyle değişir
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._fresh_version:
+                self._fresh_version, self._fresh_keys = data_version, set()
+            elif key in self._fresh_keys:
+                return True
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        if row is not None and row[0] == version:
+            self._fresh_keys.add(key)
+            return True
+        self.stale_reads += 1
+        return False
+
+    def _mark_fresh(self, key: Hashable) -> None:
+        """Bu sürecin yazdığı kayıt, başka bir bağlantı commit yapana kadar en günceldir."""
+        if self.coherence == "validate":
+            self._fresh_keys.add(key)
+
+    def _cached_without_io(self, key: Hashable) -> Any:
+        """Diske inmeden kullanılabilecek önbellek kaydı; doğrulama gerekiyorsa None."""
+        if self.coherence != "local" or self._cache.peek(key) is None:
+            return None
+        return self._cache.get(key)
+
+    def _invalidate_state_cache(self):
+        self._cache.discard_where(lambda key: key[0] == "state")
+
+    def _writer_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background state flush failed: {e}")
+
+    def _enqueue(self, sql: str, params: tuple):
+        with self._pending_lock:
+            self._pending.append((sql, params))
+
+    def flush(self) -> int:
+        """Kuyrukta bekleyen kayıtları tek bir transaction ile yaz."""
+        with self._flush_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                with telemetry.span("state_store.flush", "state_store_query_duration_seconds", operation="flush") as span, \
+                        self._lock, self._conn as conn:
+                    span.set_attribute("rows", len(rows))
+                    for sql, params in rows:
+                        conn.execute(sql, params)
+            except Exception as e:
+                if self._is_transient(e):
+                    self._requeue(rows)
+                    raise
+                # Tek bir bozuk kayıt tüm kuyruğu kilitlemesin: kayıtları tek tek yaz
+                logger.warning(f"Batched state flush failed ({e}); retrying {len(rows)} rows one by one")
+                return self._flush_one_by_one(rows)
+            logger.debug(f"Flushed {len(rows)} state rows")
+            return len(rows)
+
+    def _flush_one_by_one(self, rows: list[tuple[str, tuple]]) -> int:
+        """Kayıtları ayrı transaction'larla yaz; kalıcı hata veren kayıtlar loglanıp atılır."""
+        written = 0
+        for index, (sql, params) in enumerate(rows):
+            try:
+                with self._lock, self._conn as conn:
+                    conn.execute(sql, params)
+                written += 1
+            except Exception as e:
+                if self._is_transient(e):
+                    self._requeue(rows[index:])
+                    raise
+                self.dropped_rows += 1
+                telemetry.increment("state_store_dropped_rows_total")
+                logger.error(f"Dropped state row that cannot be written: {e} (params: {str(params)[:200]})")
+        return written
+
+    def _requeue(self, rows: list[tuple[str, tuple]]):
+        # Geçici hatada (kilit) kayıtları kaybetmemek için kuyruğun başına geri koy
+        with self._pending_lock:
+            self._pending[:0] = rows
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Yeniden denendiğinde geçebilecek hata mı? (ör. 'database is locked')"""
+        message = str(error).lower()
+        return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+    def close(self):
+        """Bekleyen kayıtları yaz ve bağlantıyı kapat."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._wakeup.set()
+            self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush pending states on close: {e}")
+        with self._lock:
+            self._conn.close()
     
     def init_database(self):
         """Database tablosunu oluştur"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
+                # Aynı dosyayı açan worker'lar şema kontrolü ve göçleri sırayla yapar;
+                # kolon/versiyon kontrolleri yazma kilidi alındıktan sonra okunur.
+                conn.execute("BEGIN IMMEDIATE")
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS workflow_states (
                         id TEXT PRIMARY KEY,
@@ -22,7 +431,8 @@ class StateStore:
                         state_data TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'active'
+                        status TEXT DEFAULT 'active',
+                        kind TEXT DEFAULT 'state'
                     )
                 """)
                 
@@ -35,31 +445,71 @@ class StateStore:
                     CREATE INDEX IF NOT EXISTS idx_created_at 
                     ON workflow_states(created_at)
                 """)
+
+                # Eski veritabanlarında kayıt türü (kind) kolonu yok; ekle ve
+                # konuşma geçmişi içeren kayıtları işaretle.
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(workflow_states)")}
+                if "kind" not in columns:
+                    conn.execute("ALTER TABLE workflow_states ADD COLUMN kind TEXT DEFAULT 'state'")
+                    conn.execute("""
+                        UPDATE workflow_states SET kind = 'conversation'
+                        WHERE state_data LIKE '%"conversation_history"%'
+                    """)
+                    logger.info("Migrated workflow_states: added 'kind' column")
+
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_session_kind_created 
+                    ON workflow_states(session_id, kind, status, created_at)
+                """)
+
+                # Konuşma mesajları tek satır/mesaj olarak, sıra numarasıyla tutulur
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS conversation_messages (
+                        session_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (session_id, seq)
+                    ) WITHOUT ROWID
+                """)
+
+                if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                    self._migrate_conversations(conn)
+                    conn.execute("PRAGMA user_version = 1")
                 
                 logger.info(f"Database initialized at {self.db_path}")
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
             raise
     
-    def save_state(self, state: Dict[str, Any], session_id: Optional[str] = None) -> str:
-        """State'i veritabanına kaydet"""
+    @telemetry.traced("state_store.save_state", "state_store_query_duration_seconds", operation="save_state")
+    def save_state(self, state: Dict[str, Any], session_id: Optional[str] = None, kind: str = "state") -> str:
+        """State'i veritabanına kaydet. `kind` kaydın türünü belirtir (ör. 'conversation')."""
         state_id = str(uuid.uuid4())
         if session_id is None:
             session_id = str(uuid.uuid4())
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO workflow_states 
-                    (id, session_id, state_data, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    state_id,
-                    session_id,
-                    json.dumps(state, ensure_ascii=False, indent=2),
-                    datetime.now(),
-                    datetime.now()
-                ))
+            # State sonradan değişebileceği için JSON'a hemen çevrilir
+            state_json = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+            row = (
+                state_id,
+                session_id,
+                state_json,
+                datetime.now(),
+                datetime.now(),
+                kind
+            )
+            self._cache.put(("state", session_id, kind), (state_id, state_json), len(state_json))
+            self._mark_fresh(("state", session_id, kind))
+            if self.durability == "batched":
+                self._enqueue(INSERT_STATE_SQL, row)
+                logger.info(f"State queued: {state_id} for session: {session_id}")
+                return state_id
+
+            with self._lock, self._conn as conn:
+                conn.execute(INSERT_STATE_SQL, row)
                 
                 logger.info(f"State saved: {state_id} for session: {session_id}")
                 return state_id
@@ -68,14 +518,13 @@ class StateStore:
             logger.error(f"Failed to save state: {e}")
             raise
     
+    @telemetry.traced("state_store.load_state", "state_store_query_duration_seconds", operation="load_state")
     def load_state(self, state_id: str) -> Optional[Dict[str, Any]]:
         """State'i ID ile yükle"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT state_data FROM workflow_states 
-                    WHERE id = ? AND status = 'active'
-                """, (state_id,))
+            self.flush()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(SELECT_STATE_SQL, (state_id,))
                 
                 row = cursor.fetchone()
                 if row:
@@ -90,16 +539,15 @@ class StateStore:
             logger.error(f"Failed to load state {state_id}: {e}")
             return None
     
+    @telemetry.traced("state_store.update_state", "state_store_query_duration_seconds", operation="update_state")
     def update_state(self, state_id: str, state: Dict[str, Any]) -> bool:
         """Mevcut state'i güncelle"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    UPDATE workflow_states 
-                    SET state_data = ?, updated_at = ?
-                    WHERE id = ? AND status = 'active'
-                """, (
-                    json.dumps(state, ensure_ascii=False, indent=2),
+            self.flush()
+            self._invalidate_state_cache()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(UPDATE_STATE_SQL, (
+                    json.dumps(state, ensure_ascii=False, separators=(",", ":")),
                     datetime.now(),
                     state_id
                 ))
@@ -115,16 +563,13 @@ class StateStore:
             logger.error(f"Failed to update state {state_id}: {e}")
             return False
     
+    @telemetry.traced("state_store.get_session_states", "state_store_query_duration_seconds", operation="get_session_states")
     def get_session_states(self, session_id: str) -> list[Dict[str, Any]]:
         """Session'a ait tüm state'leri getir"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT id, state_data, created_at, updated_at 
-                    FROM workflow_states 
-                    WHERE session_id = ? AND status = 'active'
-                    ORDER BY created_at DESC
-                """, (session_id,))
+            self.flush()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(SELECT_SESSION_STATES_SQL, (session_id,))
                 
                 states = []
                 for row in cursor.fetchall():
@@ -142,15 +587,98 @@ class StateStore:
             logger.error(f"Failed to get session states {session_id}: {e}")
             return []
     
+    @telemetry.traced("state_store.get_latest_state", "state_store_query_duration_seconds", operation="get_latest_state")
+    def get_latest_state(self, session_id: str, kind: str) -> Optional[Dict[str, Any]]:
+        """Session'ın verilen türdeki en son state'ini indeks üzerinden tek satırla getir"""
+        try:
+            cached = self._cache.get(("state", session_id, kind))
+            if cached is not None and self._is_current(("state", session_id, kind), SELECT_LATEST_ID_BY_KIND_SQL,
+                                                       (session_id, kind), cached[0]):
+                return json.loads(cached[1])
+
+            self.flush()
+            with self._lock, self._conn as conn:
+                row = conn.execute(SELECT_LATEST_BY_KIND_SQL, (session_id, kind)).fetchone()
+            if row is None:
+                return None
+            self._cache.put(("state", session_id, kind), (row[0], row[1]), len(row[1]))
+            self._mark_fresh(("state", session_id, kind))
+            return json.loads(row[1])
+
+        except Exception as e:
+            logger.error(f"Failed to get latest {kind} state {session_id}: {e}")
+            return None
+
+    async def aget_latest_state(self, session_id: str, kind: str) -> Optional[Dict[str, Any]]:
+        """`get_latest_state`'in event loop'u bloklamayan sürümü."""
+        cached = self._cached_without_io(("state", session_id, kind))
+        if cached is not None:
+            return json.loads(cached[1])
+        return await asyncio.to_thread(self.get_latest_state, session_id, kind)
+
+    @telemetry.traced("state_store.append_messages", "state_store_query_duration_seconds", operation="append_messages")
+    def append_messages(self, session_id: str, messages: list[str]) -> None:
+        """Konuşmaya yeni mesajları ekle ('Human: ...', 'AI: ...'); sıra numarası otomatik verilir"""
+        try:
+            now = datetime.now()
+            for message in messages:
+                role, content = self._split_message(message)
+                params = (session_id, session_id, role, content, now)
+                if self.durability == "batched":
+                    self._enqueue(INSERT_MESSAGE_SQL, params)
+                else:
+                    with self._lock, self._conn as conn:
+                        conn.execute(INSERT_MESSAGE_SQL, params)
+
+            # Geçmiş önbellekteyse yeni mesajları ekle; değilse ilk okumada yüklenecek
+            cached = self._cache.peek(("conversation", session_id))
+            if cached is not None:
+                # Tazelik işareti değişmez: önbellek güncel değilse eklemeden sonra da değildir
+                updated = cached + tuple(messages)
+                self._cache.put(("conversation", session_id), updated, self._conversation_size(updated))
+            logger.info(f"Appended {len(messages)} messages for session: {session_id}")
+
+        except Exception as e:
+            logger.error(f"Failed to append messages for session {session_id}: {e}")
+            raise
+
+    @telemetry.traced("state_store.get_latest_conversation", "state_store_query_duration_seconds", operation="get_latest_conversation")
+    def get_latest_conversation(self, session_id: str) -> list[str]:
+        """Session'ın en güncel konuşma geçmişini getir; yoksa boş liste döner"""
+        try:
+            # Sıra numaraları 1'den başlayıp boşluksuz arttığından mesaj sayısı sürüm olarak kullanılır
+            cached = self._cache.get(("conversation", session_id))
+            if cached is not None and self._is_current(("conversation", session_id), SELECT_MAX_SEQ_SQL,
+                                                       (session_id,), len(cached)):
+                return list(cached)
+
+            self.flush()
+            with self._lock, self._conn as conn:
+                rows = conn.execute(SELECT_MESSAGES_SQL, (session_id,)).fetchall()
+            history = tuple(self._join_message(role, content) for role, content in rows)
+            self._cache.put(("conversation", session_id), history, self._conversation_size(history))
+            self._mark_fresh(("conversation", session_id))
+            return list(history)
+
+        except Exception as e:
+            logger.error(f"Failed to get conversation {session_id}: {e}")
+            return []
+    
+    async def aget_latest_conversation(self, session_id: str) -> list[str]:
+        """`get_latest_conversation`'ın event loop'u bloklamayan sürümü."""
+        cached = self._cached_without_io(("conversation", session_id))
+        if cached is not None:
+            return list(cached)
+        return await asyncio.to_thread(self.get_latest_conversation, session_id)
+
+    @telemetry.traced("state_store.delete_state", "state_store_query_duration_seconds", operation="delete_state")
     def delete_state(self, state_id: str) -> bool:
         """State'i soft delete yap"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    UPDATE workflow_states 
-                    SET status = 'deleted', updated_at = ?
-                    WHERE id = ?
-                """, (datetime.now(), state_id))
+            self.flush()
+            self._invalidate_state_cache()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(DELETE_STATE_SQL, (datetime.now(), state_id))
                 
                 if cursor.rowcount > 0:
                     logger.info(f"State deleted: {state_id}")
@@ -163,16 +691,14 @@ class StateStore:
             logger.error(f"Failed to delete state {state_id}: {e}")
             return False
     
+    @telemetry.traced("state_store.cleanup_old_states", "state_store_query_duration_seconds", operation="cleanup_old_states")
     def cleanup_old_states(self, days: int = 7) -> int:
         """Eski state'leri temizle"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    UPDATE workflow_states 
-                    SET status = 'expired', updated_at = ?
-                    WHERE created_at < datetime('now', '-{} days')
-                    AND status = 'active'
-                """.format(days), (datetime.now(),))
+            self.flush()
+            self._invalidate_state_cache()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(CLEANUP_STATES_SQL, (datetime.now(), f"-{int(days)} days"))
                 
                 deleted_count = cursor.rowcount
                 logger.info(f"Cleaned up {deleted_count} old states")
@@ -182,17 +708,13 @@ class StateStore:
             logger.error(f"Failed to cleanup old states: {e}")
             return 0
     
+    @telemetry.traced("state_store.get_state_history", "state_store_query_duration_seconds", operation="get_state_history")
     def get_state_history(self, session_id: str, limit: int = 10) -> list[Dict[str, Any]]:
         """Session'ın state geçmişini getir"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT id, state_data, created_at, status
-                    FROM workflow_states 
-                    WHERE session_id = ?
-                    ORDER BY created_at DESC
-                    LIMIT ?
-                """, (session_id, limit))
+            self.flush()
+            with self._lock, self._conn as conn:
+                cursor = conn.execute(SELECT_STATE_HISTORY_SQL, (session_id, limit))
                 
                 history = []
                 for row in cursor.fetchall():
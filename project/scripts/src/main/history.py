@@ -0,0 +1,90 @@
+import os
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from src.main.prompts import Prompts, format_prompt
+
+# Gemini için kaba token tahmini: ortalama ~4 karakter / token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class HistoryManager:
+    """Konuşma geçmişini ajan başına token bütçesine sığdırır.
+
+    Son `keep_last_turns` tam tur ve bu turun sorusu her zaman aynen korunur. Daha eski mesajlar
+    artımlı olarak özetlenir; özet StateStore'a `kind="summary"` kaydı olarak
+    yazılır ve hangi mesaja kadar özetlendiği (`upto`) ile birlikte saklanır.
+    Böylece her turda özet yeniden hesaplanmaz: yeni eski mesajlar yalnızca
+    bütçe aşıldığında mevcut özete eklenir.
+    """
+
+    def __init__(self, default_budget: Optional[int] = None, keep_last_turns: Optional[int] = None,
+                 budgets: Optional[Dict[str, int]] = None):
+        self.default_budget = default_budget or int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+        self.keep_last_turns = keep_last_turns or int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+        self.budgets = budgets or {}
+        self.prompt = Prompts.get_history_summary_prompt()
+        self._metrics = {"renders": 0, "summarized_renders": 0, "summaries_computed": 0,
+                         "tokens_in": 0, "tokens_out": 0}
+
+    def budget_for(self, agent: str) -> int:
+        """Ajan bütçesi: açık ayar > HISTORY_TOKEN_BUDGET_<AGENT> env > varsayılan."""
+        if agent in self.budgets:
+            return self.budgets[agent]
+        return int(os.getenv(f"HISTORY_TOKEN_BUDGET_{agent.upper()}", self.default_budget))
+
+    async def render(self, context, history: List[str], agent: str) -> str:
+        """Geçmişi prompt'a konacak metne çevir; bütçe aşılırsa eski turları özetle."""
+        full_text = "\n".join(history)
+        full_tokens = estimate_tokens(full_text)
+        budget = self.budget_for(agent)
+        self._metrics["renders"] += 1
+        self._metrics["tokens_in"] += full_tokens
+
+        # Geçmiş, bu turun kullanıcı mesajıyla biter; o mesaj korunan turlara sayılmaz
+        current = 1 if history and history[-1].startswith("Human: ") else 0
+        keep = self.keep_last_turns * 2 + current
+        if full_tokens <= budget or len(history) <= keep:
+            self._metrics["tokens_out"] += full_tokens
+            return full_text
+
+        older, recent = history[:-keep], history[-keep:]
+        cached = await context.data_store.aget_latest_state(context.session_id, "summary") or {}
+        summary, upto = cached.get("summary", ""), min(cached.get("upto", 0), len(older))
+        pending = older[upto:]
+
+        text = self._compose(summary, pending, recent)
+        if pending and (not summary or estimate_tokens(text) > budget):
+            summary = await self._summarize(context, summary, pending)
+            upto = len(older)
+            context.data_store.save_state({"summary": summary, "upto": upto}, context.session_id, kind="summary")
+            text = self._compose(summary, [], recent)
+
+        rendered_tokens = estimate_tokens(text)
+        self._metrics["summarized_renders"] += 1
+        self._metrics["tokens_out"] += rendered_tokens
+        logger.info(f"History for {agent}: {full_tokens} -> {rendered_tokens} tokens "
+                    f"(saved {full_tokens - rendered_tokens}, summary covers {upto} messages)")
+        return text
+
+    @staticmethod
+    def _compose(summary: str, pending: List[str], recent: List[str]) -> str:
+        parts = [f"Summary of earlier conversation: {summary}"] if summary else []
+        return "\n".join(parts + pending + recent)
+
+    async def _summarize(self, context, previous_summary: str, new_messages: List[str]) -> str:
+        prompt = format_prompt(self.prompt,
+                               previous_summary=previous_summary or "(none)",
+                               new_messages="\n".join(new_messages))
+        summary = (await context.llm_interface.agenerate(prompt, agent="history_summary")).strip()
+        self._metrics["summaries_computed"] += 1
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "tokens_saved": self._metrics["tokens_in"] - self._metrics["tokens_out"]}
+
+
+history_manager = HistoryManager()
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from loguru import logger
+
+SELECT_RESPONSE_SQL = """
+    SELECT response, expires_at FROM llm_response_cache WHERE key = ?
+"""
+
+UPSERT_RESPONSE_SQL = """
+    INSERT OR REPLACE INTO llm_response_cache (key, response, expires_at, created_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+@dataclass
+class CachePolicy:
+    """Bir ajanın LLM yanıt önbelleği ayarı. mode: 'exact' veya 'normalized'."""
+    mode: str = "exact"
+    ttl: float = 3600.0
+
+
+def parse_policies(spec: str) -> Dict[str, CachePolicy]:
+    """'tool_selecting:normalized:3600,output_generation:exact:600' biçimini çözümle."""
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        agent, *rest = item.split(":")
+        mode = rest[0] if rest else "exact"
+        if mode not in ("exact", "normalized"):
+            raise ValueError(f"Unknown LLM cache mode for {agent}: {mode}")
+        ttl = float(rest[1]) if len(rest) > 1 else 3600.0
+        policies[agent] = CachePolicy(mode=mode, ttl=ttl)
+    return policies
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Büyük/küçük harf, noktalama ve boşluk farklarını yok say."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", prompt.casefold())).strip()
+
+
+class LLMResponseCache:
+    """İki katmanlı (bellek LRU + SQLite) LLM yanıt önbelleği.
+
+    Anahtar model adı, üretim ayarı ve prompt'un özetidir. 'exact' modda
+    prompt olduğu gibi, 'normalized' modda `normalize_prompt` sonrası özetlenir.
+    Bellek katmanı en fazla `max_entries` kayıt tutar; SQLite katmanı süreç
+    yeniden başlasa da kayıtları korur. Süresi dolan kayıtlar okumada atlanır.
+
+    Event loop'tan `aget`/`put_behind` kullanılır: bellek isabetleri hemen döner,
+    SQLite okuması bir thread'de yapılır, yazma ise beklenmeden arka planda işlenir.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.db_path = db_path or os.getenv("LLM_CACHE_DB_PATH", "llm_cache.db")
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+        self._memory: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bellek katmanı SQLite işlemlerini beklemesin diye bağlantının ayrı kilidi var
+        self._db_lock = threading.Lock()
+        self._metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, generation_config: Optional[dict], mode: str) -> str:
+        text = normalize_prompt(prompt) if mode == "normalized" else prompt
+        payload = json.dumps([mode, model_name, generation_config or {}, text], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        cached = self._memory_get(key)
+        return cached if cached is not None else self._disk_get(key)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """`get`'in event loop'u bloklamayan sürümü."""
+        cached = self._memory_get(key)
+        return cached if cached is not None else await asyncio.to_thread(self._disk_get, key)
+
+    def put(self, key: str, response: str, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._metrics["stores"] += 1
+        self._persist(key, response, expires_at)
+
+    def put_behind(self, key: str, response: str, ttl: float) -> None:
+        """Bellek katmanına hemen yaz; SQLite'a yazma varsayılan executor'da, beklenmeden yapılır."""
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._metrics["stores"] += 1
+        asyncio.get_running_loop().run_in_executor(None, self._persist, key, response, expires_at)
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and item[1] > time.time():
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                return item[0]
+            return None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._conn.execute(SELECT_RESPONSE_SQL, (key,)).fetchone()
+        with self._lock:
+            if row is not None and row[1] > time.time():
+                self._remember(key, row[0], row[1])
+                self._metrics["disk_hits"] += 1
+                return row[0]
+            self._metrics["misses"] += 1
+            return None
+
+    def _persist(self, key: str, response: str, expires_at: float) -> None:
+        try:
+            with self._db_lock, self._conn:
+                self._conn.execute(UPSERT_RESPONSE_SQL, (key, response, expires_at, time.time()))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist LLM cache entry: {e}")
+
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        with self._db_lock, self._conn:
+            return self._conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._metrics, "memory_entries": len(self._memory)}
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+
+
+def get_shared_cache() -> LLMResponseCache:
+    """Süreç genelinde paylaşılan önbellek örneği."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMResponseCache()
+    return _shared_cache
+
+
+def shared_cache_stats() -> Optional[Dict[str, Any]]:
+    """Paylaşılan önbellek hiç kullanılmadıysa None döner."""
+    return _shared_cache.stats() if _shared_cache is not None else None
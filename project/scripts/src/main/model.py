@@ -1,15 +1,205 @@
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core.client_options import ClientOptions
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+from loguru import logger
+from src.main.llm_cache import CachePolicy, LLMResponseCache, get_shared_cache, parse_policies
+from src.main.history import estimate_tokens
+from src.main.telemetry import telemetry
 
 class LLMInterface:
-    def __init__(self, api_key: str):
+    # Süreç genelinde eşzamanlı Gemini çağrılarını sınırlayan ortak semafor
+    max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    _semaphore: Optional[asyncio.Semaphore] = None
+    # API anahtarı başına paylaşılan örnekler (anahtarın kendisi değil özeti saklanır)
+    pool_max_keys: int = int(os.getenv("LLM_POOL_MAX_KEYS", "64"))
+    _shared_instances: "OrderedDict[str, LLMInterface]" = OrderedDict()
+    _shared_lock = threading.Lock()
+
+    def __init__(self, api_key: str, model_name: str = 'gemini-1.5-flash', timeout: Optional[float] = None,
+                 cache_policies: Optional[Dict[str, CachePolicy]] = None,
+                 response_cache: Optional[LLMResponseCache] = None):
+        if not api_key:
+            raise ValueError("A Gemini API key must be provided.")
+        # Gemini 1.5 Flash modelini başlat. `genai.configure` süreç geneli olduğundan
+        # kullanılmaz: anahtar modelin kendi istemcilerine verilir, böylece aynı
+        # süreçteki farklı kullanıcıların istekleri kendi anahtarlarıyla gider.
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self._client_options = ClientOptions(api_key=api_key)
+        self.model._client = glm.GenerativeServiceClient(client_options=self._client_options)
+        # Çağrı başına zaman aşımı (saniye); None ise LLM_TIMEOUT env değeri kullanılır
+        self.timeout = timeout if timeout is not None else float(os.getenv("LLM_TIMEOUT", "60"))
+        # Yanıt önbelleği ajan bazında açılır (ör. LLM_CACHE_AGENTS="tool_selecting:normalized:3600")
+        self.cache_policies = cache_policies if cache_policies is not None else parse_policies(os.getenv("LLM_CACHE_AGENTS", ""))
+        self.response_cache = response_cache or (get_shared_cache() if self.cache_policies else None)
+
+    @classmethod
+    def shared(cls, api_key: str) -> "LLMInterface":
+        """Aynı API anahtarı için süreç genelinde tek örnek döndür.
+
+        Oturumlar engine'leri hangi worker'da yeniden kurulursa kurulsun aynı
+        model nesnesini ve gRPC bağlantılarını kullanır. Her örneğin istemcileri
+        kendi anahtarıyla kurulduğundan havuzdaki örnekler birbirinin anahtarını
+        kullanmaz.
+        """
         if not api_key:
             raise ValueError("A Gemini API key must be provided.")
-        # Kimlik doğrulama için API anahtarını yapılandır
-        genai.configure(api_key=api_key)
-        # Gemini 1.5 Flash modelini başlat
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with cls._shared_lock:
+            instance = cls._shared_instances.get(digest)
+            if instance is None:
+                instance = cls(api_key=api_key)
+                cls._shared_instances[digest] = instance
+                while len(cls._shared_instances) > cls.pool_max_keys:
+                    cls._shared_instances.popitem(last=False)
+            else:
+                cls._shared_instances.move_to_end(digest)
+            return instance
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, int]:
+        return {"api_keys": len(cls._shared_instances), "max_keys": cls.pool_max_keys}
+
+    @classmethod
+    def configure_concurrency(cls, max_concurrency: int) -> None:
+        """Süreç genelindeki eşzamanlı LLM çağrısı limitini değiştir."""
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        cls.max_concurrency = max_concurrency
+        cls._semaphore = None
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls.max_concurrency)
+        return cls._semaphore
+
+    def _async_model(self) -> genai.GenerativeModel:
+        """Modelin async istemcisini bu örneğin anahtarıyla kur.
+
+        grpc.aio kanalı çalışan event loop'a bağlandığından istemci ilk async
+        çağrıda oluşturulur; aksi halde model varsayılan (global) istemciyi alırdı.
+        """
+        if self.model._async_client is None:
+            self.model._async_client = glm.GenerativeServiceAsyncClient(client_options=self._client_options)
+        return self.model
+
+    def _cache_keys(self, question: str, generation_config: Optional[dict], agent: Optional[str]) -> List[str]:
+        """Ajan önbelleğe dahilse bakılacak anahtarlar: önce tam eşleşme, sonra normalize edilmiş."""
+        policy = self.cache_policies.get(agent) if agent else None
+        if policy is None or self.response_cache is None:
+            return []
+        keys = [LLMResponseCache.make_key(self.model_name, question, generation_config, "exact")]
+        if policy.mode == "normalized":
+            keys.append(LLMResponseCache.make_key(self.model_name, question, generation_config, "normalized"))
+        return keys
+
+    async def _cached_response(self, keys: List[str]) -> Optional[str]:
+        for key in keys:
+            cached = await self.response_cache.aget(key)
+            if cached is not None:
+                return cached
+        return None
+
+    def _store_response(self, keys: List[str], agent: str, response: str) -> None:
+        ttl = self.cache_policies[agent].ttl
+        for key in keys:
+            self.response_cache.put_behind(key, response, ttl)
+
+    @staticmethod
+    def _record_usage(span, agent: Optional[str], question: str, answer: str, usage=None, queued: float = 0.0) -> None:
+        """Token sayılarını span'e ve sayaçlara yaz; Gemini usage_metadata yoksa tahmin et."""
+        if not telemetry.enabled:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(question)
+        response_tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(answer)
+        span.set_attribute("prompt_tokens", prompt_tokens)
+        span.set_attribute("response_tokens", response_tokens)
+        span.set_attribute("queue_ms", round(queued * 1000, 2))
+        telemetry.increment("llm_tokens_total", prompt_tokens, agent=agent or "unknown", type="prompt")
+        telemetry.increment("llm_tokens_total", response_tokens, agent=agent or "unknown", type="response")
 
     def generate(self, question: str) -> str:
         response = self.model.generate_content(question)
-        return response.text
\ No newline at end of file
+        return response.text
+
+    async def agenerate(self, question: str, timeout: Optional[float] = None,
+                        generation_config: Optional[dict] = None, agent: Optional[str] = None) -> str:
+        """Event loop'u bloklamadan yanıt üret; semafor ve zaman aşımı ile sınırlandırılır.
+
+        `generation_config` ile ör. {"response_mime_type": "application/json"} verilerek
+        yapılandırılmış (JSON) çıktı istenebilir. `agent` önbelleğe dahil bir ajansa
+        yanıt önce önbellekte aranır.
+        """
+        cache_keys = self._cache_keys(question, generation_config, agent)
+        if cache_keys:
+            cached = await self._cached_response(cache_keys)
+            if cached is not None:
+                logger.debug(f"LLM cache hit for {agent}")
+                return cached
+
+        timeout = self.timeout if timeout is None else timeout
+        with telemetry.span("llm.generate", "llm_request_duration_seconds", agent=agent or "unknown") as span:
+            waiting = time.perf_counter()
+            async with self._get_semaphore():
+                queued = time.perf_counter() - waiting
+                try:
+                    response = await asyncio.wait_for(
+                        self._async_model().generate_content_async(question, generation_config=generation_config),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"LLM call timed out after {timeout} seconds.")
+                    raise
+            self._record_usage(span, agent, question, response.text, getattr(response, "usage_metadata", None), queued)
+        if cache_keys:
+            self._store_response(cache_keys, agent, response.text)
+        return response.text
+
+    async def astream(self, question: str, timeout: Optional[float] = None,
+                      agent: Optional[str] = None) -> AsyncIterator[str]:
+        """Yanıtı Gemini ürettikçe parça parça döndür. Zaman aşımı tüm akış için geçerlidir."""
+        cache_keys = self._cache_keys(question, None, agent)
+        if cache_keys:
+            cached = await self._cached_response(cache_keys)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        with telemetry.span("llm.stream", "llm_request_duration_seconds", agent=agent or "unknown") as span:
+            waiting = time.perf_counter()
+            async with self._get_semaphore():
+                queued = time.perf_counter() - waiting
+                try:
+                    response = await asyncio.wait_for(self._async_model().generate_content_async(question, stream=True),
+                                                      timeout=timeout)
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                        except StopAsyncIteration:
+                            break
+                        # Güvenlik filtresi vb. nedeniyle metin içermeyen parçaları atla
+                        text = chunk.text if chunk.parts else ""
+                        if text:
+                            if not parts:
+                                span.set_attribute("first_token_ms", round((time.perf_counter() - waiting) * 1000, 2))
+                            parts.append(text)
+                            yield text
+                except asyncio.TimeoutError:
+                    logger.error(f"LLM stream timed out after {timeout} seconds.")
+                    raise
+            self._record_usage(span, agent, question, "".join(parts), getattr(response, "usage_metadata", None), queued)
+        if cache_keys:
+            self._store_response(cache_keys, agent, "".join(parts))
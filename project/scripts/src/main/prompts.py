@@ -26,9 +26,10 @@ class Prompts:
                 4.  **Handle Missing Information**: If a value for a parameter cannot be found in the conversation, use `NaN` as its value.
                 5.  **Date Conversion**: Convert any relative dates (e.g., "yarın", "bugün", "önümüzdeki hafta") to the `YYYY-MM-DD` format.
                 6.  **Airport Codes**: If airport codes like IST, ESB are needed, infer them from city names.
+                7.  **Several Calls**: If the user asks for the same action with several independent values (e.g., "compare flights to Ankara and Izmir"), return a JSON array with one populated object per call.
 
                 ## Output Format
-                Return ONLY the populated JSON object. Do not include any explanations, markdown formatting, or other text.
+                Return ONLY the populated JSON object (or a JSON array of objects for several calls). Do not include any explanations, markdown formatting, or other text.
                 """
 
     @staticmethod
@@ -53,6 +54,86 @@ class Prompts:
                 - If no suitable match: return "no_tool_found"
                 """
 
+    @staticmethod
+    def get_fused_tool_call_agent_prompt():
+        return """You are a **Tool Calling Agent**.
+
+                ## Objective:
+                In a single step, select the most suitable tool for the user's request AND fill in its arguments from the conversation.
+
+                ## Inputs:
+                - User request: {user_question}
+                - User conversation:
+                ```
+                {user_conversation}
+                ```
+                - Available tools (name, description and JSON input schema):
+                ```json
+                {available_tools}
+                ```
+
+                ## Guidelines:
+                1. Analyze the intent behind the user request and pick the single most suitable tool.
+                2. Fill the arguments so that they validate against the selected tool's `input_schema` (types, required fields, nested objects, arrays).
+                3. If a value cannot be found in the conversation, use `null` for it. Do not invent values.
+                4. Convert relative dates (e.g., "yarın", "bugün", "önümüzdeki hafta") to the `YYYY-MM-DD` format.
+                5. If airport codes like IST, ESB are needed, infer them from city names.
+                6. If no tool is appropriate, use "no_tool_found" as the tool name and an empty arguments object.
+                7. If the request needs several independent tool calls (e.g., "compare flights to Ankara and Izmir"), return all of them in a "calls" list.
+
+                ## Output Format:
+                Return ONLY a JSON object of the form:
+                {{"tool": "<tool name>", "arguments": {{...}}}}
+                or, for several independent calls:
+                {{"calls": [{{"tool": "<tool name>", "arguments": {{...}}}}, ...]}}
+                """
+
+    @staticmethod
+    def get_orchestrator_prompt():
+        return """You are an **Orchestrator Agent** that classifies the latest user message.
+
+                ## Inputs:
+                - Latest user message: {user_question}
+                - Conversation history:
+                ```
+                {conversation_history}
+                ```
+                - Tool waiting for missing details from the user: {pending_tool}
+                - Missing or invalid fields: {missing_fields}
+
+                ## Labels:
+                - follow_up: The message supplies the missing details for the waiting tool.
+                - small_talk: The message is a greeting, thanks or chit-chat that needs no tool.
+                - new_request: Anything else, including a new or different request.
+
+                ## Output Format:
+                Return ONLY one label: follow_up, small_talk or new_request.
+                """
+
+    @staticmethod
+    def get_history_summary_prompt():
+        return """You are a **Conversation Summarization Agent**.
+
+                ## Objective:
+                Maintain a compact running summary of a conversation between a user and an assistant.
+
+                ## Inputs:
+                - Previous summary: {previous_summary}
+                - New messages to fold into the summary:
+                ```
+                {new_messages}
+                ```
+
+                ## Guidelines:
+                1. Merge the new messages into the previous summary.
+                2. Keep every concrete detail the user gave (cities, airports, dates, passenger counts, names, booking references) and any open questions.
+                3. Drop greetings, repetition and small talk.
+                4. Keep it short: a few sentences at most.
+
+                ## Output Format:
+                Return only the updated summary as plain text.
+                """
+
     @staticmethod
     def get_generation_agent_prompt():
         return """You are a **Response Generation Agent**.
@@ -70,6 +151,9 @@ class Prompts:
                 3. If the `tool_result` is empty or indicates that no suitable tool was found, politely inform the user that you cannot fulfill their request with your current capabilities.
                 4. Summarize and explain successful tool output in simple, helpful language.
                 5. If an error is returned (other than validation), explain the issue in a friendly and transparent way.
+                6. If the `tool_result` is {{'small_talk': True}}, the user is greeting or thanking you; reply briefly and naturally and offer your help.
+                7. If the `tool_result` has an `overflow` entry, only part of the results is shown; mention how many were shown out of the total and that the user can ask for more.
+                8. If the `tool_result` is a list, it holds one entry per tool call (`tool`, `arguments`, `result`). Combine them into a single answer (e.g., a comparison) and mention any call that failed.
 
                 ## Response Style:
                 - Conversational and user-friendly.
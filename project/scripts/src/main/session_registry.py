@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from loguru import logger
+
+
+class SessionRegistry:
+    """Sohbet oturumlarına ait WorkflowEngine'leri sınırlı bir LRU yapısında tutar.
+
+    Kayıt sayısı `max_size`'ı aşınca en uzun süredir kullanılmayan oturum,
+    `idle_ttl` saniyeden uzun süre boşta kalan oturumlar ise periyodik taramada
+    çıkarılır. Çıkarılan her engine'in `close()` metodu beklenir; böylece MCP
+    istemcisi gibi kaynaklar serbest bırakılır.
+
+    Kayıt yalnızca bir önbellektir: oturum durumu StateStore'da tutulduğundan
+    çıkarılan ya da başka bir worker'da hiç oluşturulmamış bir oturumun
+    engine'i ilk istekte yeniden kurulur (`WorkflowEngine.rehydrate`).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 sweep_interval: Optional[float] = None):
+        self.max_size = max_size or int(os.getenv("SESSION_MAX_SIZE", "500"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "1800"))
+        self.sweep_interval = sweep_interval or float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+        self._engines: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._metrics = {"created": 0, "hits": 0, "evicted_lru": 0, "expired_idle": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._engines
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def _touch(self, session_id: str) -> None:
+        self._engines.move_to_end(session_id)
+        self._last_used[session_id] = time.monotonic()
+
+    async def get_or_create(self, session_id: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Oturumun engine'ini döndür; yoksa `factory` ile oluştur ve kaydet."""
+        engine = self._engines.get(session_id)
+        if engine is not None:
+            self._metrics["hits"] += 1
+            self._touch(session_id)
+            return engine
+
+        # Aynı oturum için eşzamanlı istekler tek bir engine oluşturmalı
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with lock:
+                engine = self._engines.get(session_id)
+                if engine is None:
+                    engine = await factory()
+                    self._engines[session_id] = engine
+                    self._metrics["created"] += 1
+                    logger.info(f"Registered engine for session {session_id} ({len(self._engines)}/{self.max_size})")
+                self._touch(session_id)
+        finally:
+            # factory hata verse de kilit bırakılır; aksi halde her başarısız oturum kimliği bir kilit sızdırır
+            self._locks.pop(session_id, None)
+
+        while len(self._engines) > self.max_size:
+            oldest_id = next(iter(self._engines))
+            self._metrics["evicted_lru"] += 1
+            await self.evict(oldest_id, reason="lru")
+        return engine
+
+    async def evict(self, session_id: str, reason: str = "manual") -> bool:
+        engine = self._engines.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        if engine is None:
+            return False
+        logger.info(f"Evicting engine for session {session_id} ({reason})")
+        try:
+            await engine.close()
+        except Exception as e:
+            logger.warning(f"Failed to close engine for session {session_id}: {e}")
+        return True
+
+    async def sweep(self) -> int:
+        """Boşta kalma süresi `idle_ttl`'ı aşan oturumları çıkar."""
+        now = time.monotonic()
+        expired = [sid for sid, last in self._last_used.items() if now - last > self.idle_ttl]
+        for session_id in expired:
+            self._metrics["expired_idle"] += 1
+            await self.evict(session_id, reason="idle")
+        return len(expired)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session registry sweep error: {e}")
+
+    def start(self) -> None:
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        for session_id in list(self._engines):
+            await self.evict(session_id, reason="shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest_idle = max((now - last for last in self._last_used.values()), default=0.0)
+        return {
+            "live_sessions": len(self._engines),
+            "max_size": self.max_size,
+            "idle_ttl": self.idle_ttl,
+            "oldest_idle_seconds": round(oldest_idle, 1),
+            **self._metrics,
+        }
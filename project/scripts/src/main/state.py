@@ -1,7 +1,28 @@
 """
 State definitions for workflow engine
 """
-from typing import TypedDict, Optional, Any
+from dataclasses import dataclass, field
+from typing import TypedDict, Optional, Any, Awaitable, Callable
+
+@dataclass
+class AgentContext:
+  """Per-session handles passed to the process-wide compiled graph.
+
+  The graph and its agents are built once per process; everything that
+  differs between sessions (LLM, MCP client, data store, session id) travels
+  with the state under the 'context' key instead of living on the agents.
+  """
+  llm_interface: Any
+  client_session: Any
+  data_store: Any
+  session_id: Optional[str] = None
+  fused_tool_call: bool = False
+  # Overlap independent stages and extract parameters speculatively.
+  parallel: bool = False
+  # Per-turn wall time of each graph node in milliseconds.
+  node_timings: dict[str, float] = field(default_factory=dict)
+  # Set only for streaming runs; receives answer tokens as they are generated.
+  on_token: Optional[Callable[[str], Awaitable[None]]] = None
 
 class GraphState(TypedDict, total=False):
   """State representation for the workflow graph.
@@ -16,12 +37,16 @@ class GraphState(TypedDict, total=False):
   current_user_query: str
   selected_tool: Optional[str]
   tool_inputs: Optional[dict[str, Any]]
+  # Multi-tool plans: [{"tool": <tool definition>, "arguments": {...}}, ...]
+  tool_calls: Optional[list[dict[str, Any]]]
   tool_result: Optional[str | dict | list | Any]
   available_tools: list[dict[str, Any]]
   input_status: Optional[str]
   answer_status: Optional[str]
   routed_agent: Optional[str]
   client_session: Optional[Any]
+  context: Optional[AgentContext]
+  fused_failed: Optional[bool]
+  node_timings: Optional[dict[str, float]]
   answer: Optional[str]
 
-  
\ No newline at end of file
@@ -0,0 +1,218 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry isteğe bağlıdır
+    otel_trace = None
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "workflow_turn_duration_seconds": "Duration of a full chat turn.",
+    "graph_node_duration_seconds": "Duration of a LangGraph node.",
+    "llm_request_duration_seconds": "Duration of an LLM request.",
+    "mcp_request_duration_seconds": "Duration of an MCP request.",
+    "state_store_query_duration_seconds": "Duration of a StateStore operation.",
+    "llm_tokens_total": "LLM tokens by agent and direction (prompt/response).",
+}
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Telemetri kapalıyken dönen, hiçbir şey yapmayan span."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """OpenTelemetry benzeri span kaydı (trace/span/parent kimlikleri, süre, öznitelikler)."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"], otel_span=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self._otel_span = otel_span
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start_time": self.start_time, "duration_ms": self.duration_ms, "status": self.status,
+                "attributes": self.attributes}
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # etiketler -> [bucket sayıları..., toplam, adet]
+        self.series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+class Telemetry:
+    """Graph düğümleri, LLM, MCP ve StateStore için span ve histogramlar.
+
+    TELEMETRY_ENABLED=true değilse `span` paylaşılan bir no-op nesne döndürür ve
+    `traced` fonksiyonları sarmalamaz; kapalıyken maliyet tek bir bool kontrolüdür.
+    Açıkken süreler Prometheus histogramlarına yazılır (`render_prometheus`) ve son
+    TELEMETRY_SPAN_BUFFER span bellekte tutulur. OpenTelemetry kuruluysa ve
+    TELEMETRY_OTEL=true ise span'ler ayrıca OTel tracer'ına aktarılır.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else \
+            os.getenv("TELEMETRY_ENABLED", "false").lower() in ("1", "true", "yes")
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._spans: deque = deque(maxlen=int(os.getenv("TELEMETRY_SPAN_BUFFER", "1000")))
+        use_otel = os.getenv("TELEMETRY_OTEL", "false").lower() in ("1", "true", "yes")
+        self._tracer = otel_trace.get_tracer("inzva_project_mcp") if (use_otel and otel_trace) else None
+        if use_otel and otel_trace is None:
+            logger.warning("TELEMETRY_OTEL is set but opentelemetry is not installed; using in-memory spans only.")
+
+    def span(self, name: str, metric: Optional[str] = None, **labels: str):
+        """`with telemetry.span("llm.generate", "llm_request_duration_seconds", agent=...)` şeklinde kullanılır."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return self._span(name, metric, labels)
+
+    @contextmanager
+    def _span(self, name: str, metric: Optional[str], labels: Dict[str, str]) -> Iterator[Span]:
+        otel_cm = self._tracer.start_as_current_span(name, attributes=labels) if self._tracer else None
+        otel_span = otel_cm.__enter__() if otel_cm else None
+        span = Span(name, labels, _current_span.get(), otel_span)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            span.status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            span.duration_ms = round(elapsed * 1000, 3)
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Async generator başka bir context'te kapatıldıysa
+                pass
+            if metric:
+                self.observe(metric, elapsed, **labels, status=span.status)
+            with self._lock:
+                self._spans.append(span)
+            if otel_cm:
+                otel_cm.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+    def traced(self, name: str, metric: Optional[str] = None, **labels: str):
+        """Senkron fonksiyonlar için dekoratör; telemetri kapalıysa fonksiyonu olduğu gibi döndürür."""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self._span(name, metric, labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, metric: str, value: float, **labels: str) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            histogram = self._histograms.get(metric)
+            if histogram is None:
+                histogram = self._histograms[metric] = Histogram()
+            histogram.observe(key, value)
+
+    def increment(self, metric: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+
+    def recent_spans(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._spans)[-limit:]
+        return [span.to_dict() for span in spans]
+
+    def render_prometheus(self) -> str:
+        """Prometheus metin formatında (0.0.4) tüm histogram ve sayaçlar."""
+        if not self.enabled:
+            return "# telemetry disabled (set TELEMETRY_ENABLED=true)\n"
+        lines = []
+        with self._lock:
+            for metric, histogram in sorted(self._histograms.items()):
+                lines += [f"# HELP {metric} {HELP.get(metric, metric)}", f"# TYPE {metric} histogram"]
+                for labels, series in sorted(histogram.series.items()):
+                    for bound, count in zip(histogram.buckets, series):
+                        lines.append(f"{metric}_bucket{_labels(labels, le=repr(bound))} {count}")
+                    lines.append(f"{metric}_bucket{_labels(labels, le='+Inf')} {series[-1]}")
+                    lines.append(f"{metric}_sum{_labels(labels)} {series[-2]}")
+                    lines.append(f"{metric}_count{_labels(labels)} {series[-1]}")
+            for metric, series in sorted(self._counters.items()):
+                lines += [f"# HELP {metric} {HELP.get(metric, metric)}", f"# TYPE {metric} counter"]
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], **extra: str) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+telemetry = Telemetry()
@@ -1,68 +1,155 @@
+import asyncio
+import os
+import time
+from dataclasses import replace
+from typing import AsyncIterator
 from langgraph.graph import StateGraph, END
-from src.main.state import GraphState
+from src.main.state import GraphState, AgentContext
 from src.agents.agent_select_tool import ToolSelectingAgent
 from src.agents.agent_input_parameter import InputParameterAgent
 from src.agents.agent_output_generation import OutputGenerationAgent
 from src.agents.agent_executing_tool import ToolExecutingAgent
+from src.agents.agent_fused_tool_call import FusedToolCallAgent
+from src.agents.agent_orchestrator import OrchestratorAgent, ROUTES
+from src.agents.utils import get_tool_catalog
+from src.database.state_store import StateStore
+from src.main.telemetry import telemetry
 from loguru import logger
 
-def after_tool_selection(state: GraphState) -> str:
-    """A tool has been selected, decide if it's valid or not."""
-    selected_tool = state.get("selected_tool", {})
-    tool_name = selected_tool.get("name", "no_tool_found")
-    logger.debug(f"ROUTER: Checking selected tool. Tool name: {tool_name}")
-
+def after_fused_tool_call(state: GraphState) -> str:
+    """Fused çağrı başarısızsa iki adımlı yola dön, başarılıysa doğrudan çalıştır."""
+    if state.get("fused_failed"):
+        logger.debug("ROUTER: Fused tool call failed, falling back to two-step selection.")
+        return "fallback_two_step"
+    tool_name = state.get("selected_tool", {}).get("name", "no_tool_found")
     if tool_name == "no_tool_found":
         return "generate_output_no_tool"
-    else:
-        return "extract_parameters"
+    return "execute_tool"
+
+def timed(name: str, node):
+    """Düğümün süresini turun context'ine (milisaniye) kaydeden sarmalayıcı."""
+    async def run(state):
+        started = time.perf_counter()
+        try:
+            with telemetry.span(f"graph.{name}", "graph_node_duration_seconds", node=name):
+                return await node(state)
+        finally:
+            state["context"].node_timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    return run
+
+def build_graph() -> StateGraph:
+    """Ajanları ve kenarları içeren graph'ı kur. Ajanlar oturumdan bağımsızdır."""
+    input_parameter_agent = InputParameterAgent()
+    tool_selecting_agent = ToolSelectingAgent(input_parameter_agent)
+    tool_executing_agent = ToolExecutingAgent()
+    output_generation_agent = OutputGenerationAgent()
+    fused_tool_call_agent = FusedToolCallAgent()
+    orchestrator_agent = OrchestratorAgent()
+
+    workflow = StateGraph(GraphState)
+    
+    workflow.add_node("tool_selecting_agent", timed("tool_selecting_agent", tool_selecting_agent.process))
+    workflow.add_node("tool_executing_agent", timed("tool_executing_agent", tool_executing_agent.process))
+    workflow.add_node("input_parameter_agent", timed("input_parameter_agent", input_parameter_agent.process))
+    workflow.add_node("output_generation_agent", timed("output_generation_agent", output_generation_agent.process))
+    workflow.add_node("fused_tool_call_agent", timed("fused_tool_call_agent", fused_tool_call_agent.process))
+    workflow.add_node("orchestrator_agent", timed("orchestrator_agent", orchestrator_agent.process))
+    
+    # Orkestratör kurallarla (gerekirse tek bir kısa LLM çağrısıyla) turun ilk ajanını seçer
+    workflow.set_entry_point("orchestrator_agent")
+    workflow.add_conditional_edges("orchestrator_agent", orchestrator_agent.route, ROUTES)
+    
+    workflow.add_edge("input_parameter_agent", "tool_executing_agent")
+    workflow.add_edge("tool_executing_agent", "output_generation_agent")
+    
+    workflow.add_conditional_edges(
+        "tool_selecting_agent",
+        orchestrator_agent.after_tool_selection,
+        {
+            "extract_parameters": "input_parameter_agent",
+            "execute_tool": "tool_executing_agent",
+            "generate_output_no_tool": "output_generation_agent"
+        }
+    )
+    
+    workflow.add_conditional_edges(
+        "fused_tool_call_agent",
+        after_fused_tool_call,
+        {
+            "execute_tool": "tool_executing_agent",
+            "fallback_two_step": "tool_selecting_agent",
+            "generate_output_no_tool": "output_generation_agent"
+        }
+    )
+    
+    workflow.add_edge("output_generation_agent", END)
+    
+    return workflow
+
+_compiled_graph = None
+# İstemcisi bağlantıyı kesen akış turları arka planda tamamlanır; referans tutulmazsa task toplanabilir
+_detached_turns: set = set()
+
+def get_compiled_graph():
+    """Derlenmiş graph süreç başına bir kez oluşturulur ve tüm oturumlarca paylaşılır."""
+    global _compiled_graph
+    if _compiled_graph is None:
+        _compiled_graph = build_graph().compile()
+        logger.info("Workflow graph compiled.")
+    return _compiled_graph
 
 class WorkflowEngine():
-    def __init__(self, llm_interface=None, client_session=None, data_store=None, session_id=None):
+    def __init__(self, llm_interface=None, client_session=None, data_store=None, session_id=None,
+                 fused_tool_call=None, parallel=None):
         self.llm_interface = llm_interface
         self.session = client_session
         self.session_id = session_id
-        self.data_store = data_store
-        
-        self.tool_selecting_agent = ToolSelectingAgent(self.llm_interface, self.session, self.data_store, self.session_id)
-        self.tool_executing_agent = ToolExecutingAgent(self.llm_interface, self.session, self.data_store)
-        self.input_parameter_agent = InputParameterAgent(self.llm_interface, self.session, self.data_store)
-        self.output_generation_agent = OutputGenerationAgent(self.llm_interface, self.session, self.data_store)
-
-        self.graph = self._build_graph()
-        self.runnable = self.graph.compile()
+        self.data_store = data_store or StateStore.shared()
 
-    def _build_graph(self):
-        workflow = StateGraph(GraphState)
-        
-        workflow.add_node("tool_selecting_agent", self.tool_selecting_agent.process)
-        workflow.add_node("tool_executing_agent", self.tool_executing_agent.process)
-        workflow.add_node("input_parameter_agent", self.input_parameter_agent.process)
-        workflow.add_node("output_generation_agent", self.output_generation_agent.process)
-        
-        workflow.set_entry_point("tool_selecting_agent")
-        
-        workflow.add_edge("input_parameter_agent", "tool_executing_agent")
-        workflow.add_edge("tool_executing_agent", "output_generation_agent")
-        
-        workflow.add_conditional_edges(
-            "tool_selecting_agent",
-            after_tool_selection,
-            {
-                "extract_parameters": "input_parameter_agent",
-                "generate_output_no_tool": "output_generation_agent"
-            }
+        # Oturuma özel nesneler state üzerinden ortak graph'a aktarılır
+        self.context = AgentContext(
+            llm_interface=self.llm_interface,
+            client_session=self.session,
+            data_store=self.data_store,
+            session_id=self.session_id,
+            # Araç seçimi + parametre çıkarımını tek LLM çağrısında yap (WORKFLOW_FUSED_TOOL_CALL)
+            fused_tool_call=fused_tool_call if fused_tool_call is not None
+            else os.getenv("WORKFLOW_FUSED_TOOL_CALL", "false").lower() in ("1", "true", "yes"),
+            # Bağımsız aşamaları paralel, parametre çıkarımını spekülatif çalıştır (WORKFLOW_PARALLEL)
+            parallel=parallel if parallel is not None
+            else os.getenv("WORKFLOW_PARALLEL", "false").lower() in ("1", "true", "yes")
         )
-        
-        workflow.add_edge("output_generation_agent", END)
-        
-        return workflow
-    
-    async def process(self, question: str):
-        previous_states = self.data_store.get_session_states(self.session_id)
-        conversation_history = [s['state_data'].get('conversation_history', []) for s in previous_states]
-        conversation_history = conversation_history[0] if conversation_history else []
+        self.runnable = get_compiled_graph()
+
+    async def rehydrate(self) -> dict:
+        """Oturumun kalıcı durumunu (geçmiş, son araç, bekleyen doğrulama) önbelleğe yükle.
 
+        Engine bellekte oturuma ait bir şey tutmaz; her tur bu bilgileri
+        StateStore'dan okur. Bu yüzden herhangi bir worker'da oluşturulan engine
+        kaldığı yerden devam eder. Dönen özet loglama ve izleme içindir.
+        """
+        history = await self.data_store.aget_latest_conversation(self.session_id)
+        last_turn = await self.data_store.aget_latest_state(self.session_id, "turn") or {}
+        return {
+            "messages": len(history),
+            "last_tool": last_turn.get("last_tool"),
+            "pending_tool": (last_turn.get("pending") or {}).get("tool"),
+        }
+
+    async def _start_turn(self, question: str, **context_overrides):
+        # Her tur kendi context kopyasını alır (düğüm süreleri, akış callback'i vb.)
+        context = replace(self.context, node_timings={}, **context_overrides)
+        started = time.perf_counter()
+
+        if context.parallel:
+            # Geçmişi yüklerken araç kataloğunu da önceden ısıt
+            conversation_history, _ = await asyncio.gather(
+                self.data_store.aget_latest_conversation(self.session_id),
+                self._prefetch_tool_catalog()
+            )
+        else:
+            conversation_history = await self.data_store.aget_latest_conversation(self.session_id)
+        context.node_timings["load_context"] = round((time.perf_counter() - started) * 1000, 2)
 
         conversation_history.append(f"Human: {question}")
 
@@ -70,19 +157,111 @@ class WorkflowEngine():
             current_user_query=question,
             conversation_history=conversation_history,
             session_id=self.session_id,
-            client_session=self.session
+            client_session=self.session,
+            context=context
         )
-        
-        final_state = await self.runnable.ainvoke(initial_state)
+        return conversation_history, initial_state
 
+    async def _prefetch_tool_catalog(self):
+        try:
+            await get_tool_catalog(self.session)
+        except Exception as e:
+            logger.warning(f"Tool catalog prefetch failed: {e}")
+
+    async def _finish_turn(self, conversation_history: list[str], final_state: dict) -> str:
         final_answer = final_state.get("answer", "[Cevap üretilemedi]")
         final_state["answer"] = final_answer
 
         conversation_history.append(f"AI: {final_answer}")
 
+        # Sadece bu turun mesajları eklenir; tüm geçmiş yeniden yazılmaz
+        self.data_store.append_messages(self.session_id, conversation_history[-2:])
+        node_timings = final_state["context"].node_timings
+        final_state["node_timings"] = node_timings
         self.data_store.save_state({
             "final_answer": final_answer,
-            "conversation_history": conversation_history
-        }, self.session_id)
+            "node_timings": node_timings,
+            "last_tool": (final_state.get("selected_tool") or {}).get("name"),
+            # Eksik/hatalı bilgi sorulduysa sonraki tur araç seçimini atlayabilir
+            "pending": self._pending_validation(final_state)
+        }, self.session_id, kind="turn")
+        # Oturumun sonraki isteği başka bir worker'a düşebilir; turu hemen kalıcı yap
+        await self.data_store.aflush_turn()
+        logger.info(f"Turn timings for session {self.session_id} (ms): {node_timings}")
+        return final_answer
+
+    @staticmethod
+    def _pending_validation(final_state):
+        tool_result = final_state.get("tool_result")
+        if isinstance(tool_result, dict) and tool_result.get("error") == "validation_error":
+            return {
+                "tool": final_state.get("selected_tool", {}).get("name"),
+                "tool_inputs": final_state.get("tool_inputs") or {},
+                "errors": tool_result.get("errors", [])
+            }
+        return None
+
+    async def process(self, question: str):
+        conversation_history, initial_state = await self._start_turn(question)
+        
+        with telemetry.span("workflow.turn", "workflow_turn_duration_seconds", mode="invoke") as span:
+            span.set_attribute("session_id", self.session_id)
+            final_state = await self.runnable.ainvoke(initial_state)
+
+        await self._finish_turn(conversation_history, final_state)
+
+        return dict(final_state)
+
+    async def astream(self, question: str) -> AsyncIterator[dict]:
+        """Turu akış olarak çalıştır.
+
+        Sırasıyla her tamamlanan düğüm için {"event": "node"}, cevap üretilirken
+        her parça için {"event": "token"} ve en sonda {"event": "done"} olayı üretir.
+
+        Tur, tüketiciden bağımsız bir task'ta çalışır ve kendini kaydeder:
+        istemci akışı yarıda bırakırsa tur arka planda tamamlanır, böylece
+        geçmiş `process` ile aynı kalır.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_token(text: str):
+            await queue.put({"event": "token", "text": text})
+
+        conversation_history, initial_state = await self._start_turn(question, on_token=on_token)
+        final_state = dict(initial_state)
+
+        async def run_turn():
+            try:
+                with telemetry.span("workflow.turn", "workflow_turn_duration_seconds", mode="stream") as span:
+                    span.set_attribute("session_id", self.session_id)
+                    async for update in self.runnable.astream(initial_state, stream_mode="updates"):
+                        for node, values in update.items():
+                            final_state.update(values or {})
+                            await queue.put({"event": "node", "node": node})
+                final_answer = await self._finish_turn(conversation_history, final_state)
+                await queue.put({"event": "done", "answer": final_answer, "node_timings": final_state["node_timings"]})
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(run_turn())
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+            # Graph hatası varsa burada yeniden fırlatılır
+            await task
+        finally:
+            if not task.done():
+                logger.info(f"Stream consumer for session {self.session_id} left; finishing the turn in the background")
+                _detached_turns.add(task)
+                task.add_done_callback(self._detached_turn_done)
+
+    def _detached_turn_done(self, task: asyncio.Task):
+        _detached_turns.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background turn for session {self.session_id} failed: {task.exception()}")
 
-        return dict(final_state)
\ No newline at end of file
+    async def close(self):
+        """Oturuma ait MCP istemcisini serbest bırak."""
+        close = getattr(self.session, "close", None)
+        if close is not None:
+            await close()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Testler scripts dizinindeki `src` ve `benchmarks` paketlerini import eder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,54 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+BACKEND = Path(__file__).resolve().parent.parent / "chatbot-backend" / "main.py"
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    from src.database.state_store import StateStore
+
+    monkeypatch.setenv("STATE_DB_PATH", str(tmp_path / "state.db"))
+    spec = importlib.util.spec_from_file_location("chatbot_backend_main", BACKEND)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    StateStore.shared().append_messages("s1", ["Human: merhaba", "AI: selam"])
+    yield module
+    StateStore.close_shared()
+
+
+def _get(app, path, headers=None):
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers or {})
+    return asyncio.run(request())
+
+
+def test_history_endpoint_is_disabled_without_admin_token(backend, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert _get(backend.app, "/sessions/s1/history").status_code == 404
+
+
+def test_history_endpoint_requires_the_admin_token(backend, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert _get(backend.app, "/sessions/s1/history").status_code == 401
+    assert _get(backend.app, "/sessions/s1/history", {"X-Admin-Token": "guess"}).status_code == 401
+
+    response = _get(backend.app, "/sessions/s1/history", {"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json()["messages"] == ["Human: merhaba", "AI: selam"]
+
+
+def test_traces_endpoint_requires_the_admin_token(backend, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert _get(backend.app, "/traces").status_code == 404
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert _get(backend.app, "/traces").status_code == 401
+    response = _get(backend.app, "/traces", {"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200 and "spans" in response.json()
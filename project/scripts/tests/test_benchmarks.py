@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from benchmarks.run import parse_args, percentiles
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_scenarios_run_in_a_fixed_order_with_api_last():
+    assert parse_args(["--scenarios", "api,short,concurrent"]).scenarios == ["short", "concurrent", "api"]
+    with pytest.raises(SystemExit):
+        parse_args(["--scenarios", "short,bogus"])
+
+
+def test_percentiles_summary():
+    summary = percentiles([float(value) for value in range(1, 101)])
+    assert summary["count"] == 100 and summary["p50"] == 50.0 and summary["max"] == 100.0
+    assert percentiles([]) == {"count": 0}
+
+
+def test_concurrent_scenario_exercises_tools_and_state_writes(tmp_path):
+    workdir = tmp_path / "new" / "workdir"
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--scenarios", "concurrent", "--concurrent-sessions", "6",
+         "--concurrent-turns", "2", "--llm-latency-ms", "1", "--workdir", str(workdir)],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    result = json.loads(completed.stdout)["scenarios"]["concurrent"]
+    assert result["completed_turns"] == 12 and result["errors"] == 0
+    # Oturumlar farklı sorulardan başlar: yük selamlaşma kuralında kalmaz
+    assert result["llm_calls"].get("tool_selecting", 0) > 0
+    assert result["state_store_io"]["state_rows_written"].get("turn") == 12
+    assert (workdir / "workflow_state.db").exists()
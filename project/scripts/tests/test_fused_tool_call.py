@@ -0,0 +1,86 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.agent_fused_tool_call import FusedToolCallAgent
+from src.main.state import AgentContext
+from src.main.workflow import after_fused_tool_call
+
+TOOLS = [("searchFlights", {"type": "object", "properties": {"origin": {"type": "string"}}}),
+         ("getFlightStatus", {"type": "object", "properties": {"flightNumber": {"type": "string"}}})]
+
+
+class _Session:
+    def __init__(self, key):
+        self.catalog_key = ("test", f"fused-{key}", "digest")
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[SimpleNamespace(name=name, description="", inputSchema=schema)
+                                      for name, schema in TOOLS])
+
+
+class _LLM:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    async def agenerate(self, prompt, generation_config=None, agent=None):
+        self.calls.append((agent, generation_config))
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class _Store:
+    def __init__(self):
+        self.saved = []
+
+    def save_state(self, state, session_id=None, kind="state"):
+        self.saved.append(state)
+
+
+def _run(response, key):
+    llm, store = _LLM(response), _Store()
+    context = AgentContext(llm_interface=llm, client_session=_Session(key), data_store=store,
+                           session_id="s1", fused_tool_call=True)
+    state = {"context": context, "current_user_query": "İstanbul uçuşları",
+             "conversation_history": ["Human: İstanbul uçuşları"]}
+    return asyncio.run(FusedToolCallAgent().process(state)), llm, store
+
+
+def test_single_call_selects_the_tool_and_arguments_in_one_json_request():
+    update, llm, store = _run(json.dumps({"tool": "searchFlights", "arguments": {"origin": "IST"}}), "single")
+    assert update["selected_tool"]["name"] == "searchFlights"
+    assert update["tool_inputs"] == {"origin": "IST"} and "tool_calls" not in update
+    assert llm.calls == [("fused_tool_call", {"response_mime_type": "application/json"})]
+    assert store.saved[0]["tool_calls"] == [{"tool": "searchFlights", "arguments": {"origin": "IST"}}]
+    assert after_fused_tool_call(update) == "execute_tool"
+
+
+def test_multiple_calls_are_planned_together():
+    response = json.dumps({"calls": [{"tool": "searchFlights", "arguments": {"origin": "IST"}},
+                                     {"tool": "getFlightStatus", "arguments": {"flightNumber": "TK1"}}]})
+    update, _, _ = _run(response, "multi")
+    assert [call["tool"]["name"] for call in update["tool_calls"]] == ["searchFlights", "getFlightStatus"]
+    assert update["tool_inputs"] == {"origin": "IST"}
+
+
+def test_no_tool_found_goes_straight_to_output():
+    update, _, store = _run(json.dumps({"tool": "no_tool_found", "arguments": {}}), "none")
+    assert update["selected_tool"]["name"] == "no_tool_found" and store.saved == []
+    assert after_fused_tool_call(update) == "generate_output_no_tool"
+
+
+@pytest.mark.parametrize("response", [
+    "bu bir JSON değil",
+    json.dumps({"tool": "bookHotel", "arguments": {}}),
+    json.dumps({"tool": "searchFlights", "arguments": ["IST"]}),
+    json.dumps({"calls": []}),
+    TimeoutError("LLM timed out"),
+])
+def test_bad_fused_responses_fall_back_to_two_step_selection(response):
+    update, _, store = _run(response, f"bad-{id(response)}")
+    assert update == {"fused_failed": True} and store.saved == []
+    assert after_fused_tool_call(update) == "fallback_two_step"
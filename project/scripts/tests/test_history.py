@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.database.state_store import StateStore
+from src.main.history import HistoryManager
+
+
+class _SummaryLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def agenerate(self, prompt, agent=None):
+        self.prompts.append(prompt)
+        return f"özet-{len(self.prompts)}"
+
+
+def _history(turns):
+    history = []
+    for turn in range(1, turns + 1):
+        history += [f"Human: soru {turn} " + "x" * 40, f"AI: cevap {turn} " + "y" * 40]
+    return history
+
+
+def _context(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    return SimpleNamespace(data_store=store, session_id="s1", llm_interface=_SummaryLLM()), store
+
+
+def test_history_within_budget_is_returned_verbatim(tmp_path):
+    context, store = _context(tmp_path)
+    try:
+        history = _history(5) + ["Human: şimdiki soru"]
+        manager = HistoryManager(default_budget=10_000, keep_last_turns=2)
+        assert asyncio.run(manager.render(context, history, "output_generation")) == "\n".join(history)
+        assert context.llm_interface.prompts == []
+    finally:
+        store.close()
+
+
+def test_last_full_turns_and_current_message_are_kept_verbatim(tmp_path):
+    context, store = _context(tmp_path)
+    try:
+        history = _history(5) + ["Human: şimdiki soru"]
+        manager = HistoryManager(default_budget=50, keep_last_turns=2)
+        text = asyncio.run(manager.render(context, history, "output_generation"))
+
+        lines = text.split("\n")
+        assert lines[0] == "Summary of earlier conversation: özet-1"
+        # İki tam önceki tur (4. ve 5.) ve bu turun sorusu aynen kalır
+        assert lines[1:] == history[-5:]
+        summarized = context.llm_interface.prompts[0]
+        assert "soru 3" in summarized and "cevap 3" in summarized and "soru 4" not in summarized
+        assert store.get_latest_state("s1", "summary") == {"summary": "özet-1", "upto": 6}
+    finally:
+        store.close()
+
+
+def test_summary_is_reused_until_new_older_messages_overflow_the_budget(tmp_path):
+    context, store = _context(tmp_path)
+    try:
+        manager = HistoryManager(default_budget=80, keep_last_turns=2)
+        asyncio.run(manager.render(context, _history(5) + ["Human: şimdiki soru"], "output_generation"))
+        assert len(context.llm_interface.prompts) == 1
+
+        # Aynı tur başka bir ajan için yeniden işlenir: özet yeniden hesaplanmaz
+        asyncio.run(manager.render(context, _history(5) + ["Human: şimdiki soru"], "input_parameter"))
+        assert len(context.llm_interface.prompts) == 1
+
+        # Birkaç tur sonra özetlenmemiş eski mesajlar bütçeyi aşar: yalnızca onlar özete eklenir
+        text = asyncio.run(manager.render(context, _history(8) + ["Human: yeni soru"], "output_generation"))
+        assert len(context.llm_interface.prompts) == 2
+        assert "özet-1" in context.llm_interface.prompts[1] and "soru 3" not in context.llm_interface.prompts[1]
+        assert text.startswith("Summary of earlier conversation: özet-2")
+    finally:
+        store.close()
@@ -0,0 +1,27 @@
+import asyncio
+
+from src.main.llm_cache import LLMResponseCache
+
+
+def test_put_behind_serves_from_memory_and_persists_in_background(tmp_path):
+    db_path = str(tmp_path / "llm_cache.db")
+
+    async def scenario():
+        cache = LLMResponseCache(db_path)
+        cache.put_behind("key", "response", ttl=60)
+        assert await cache.aget("key") == "response"
+        # Yazma beklenmeden executor'a bırakıldı; tamamlanmasını bekle
+        await asyncio.sleep(0.2)
+        restarted = LLMResponseCache(db_path)
+        return cache.stats(), await restarted.aget("key"), await restarted.aget("missing"), restarted.stats()
+
+    stats, persisted, missing, restarted_stats = asyncio.run(scenario())
+    assert stats["memory_hits"] == 1 and stats["stores"] == 1
+    assert persisted == "response" and missing is None
+    assert restarted_stats["disk_hits"] == 1 and restarted_stats["misses"] == 1
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"))
+    cache.put("key", "response", ttl=-1)
+    assert asyncio.run(cache.aget("key")) is None
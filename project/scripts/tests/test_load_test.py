@@ -0,0 +1,74 @@
+import asyncio
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+LOAD_TEST = Path(__file__).resolve().parent.parent / "chatbot-backend" / "load_test.py"
+spec = importlib.util.spec_from_file_location("load_test", LOAD_TEST)
+load_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_test)
+
+
+def _fake_backend(history):
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/chat")
+    async def chat(payload: dict):
+        history.setdefault(payload["session_id"], []).append(payload["message"])
+        return {"answer": "tamam", "session_id": payload["session_id"]}
+
+    @app.post("/chat/stream")
+    async def chat_stream(payload: dict):
+        history.setdefault(payload["session_id"], []).append(payload["message"])
+
+        async def events():
+            for event in ({"event": "node", "node": "orchestrator_agent"}, {"event": "token", "text": "ta"},
+                          {"event": "token", "text": "mam"}, {"event": "done", "answer": "tamam"}):
+                yield f"data: {json.dumps(event)}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/sessions/{session_id}/history")
+    async def session_history(session_id: str):
+        return {"count": len(history[session_id])}
+
+    return app
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_closed_loop_plays_whole_scripts_and_reports_latencies(stream):
+    history = {}
+    argv = ["--sessions", "3", "--iterations", "1", "--think-time", "0", "--duration", "30",
+            "--scripts", "flight_status", "--check-history"] + (["--stream"] if stream else [])
+    generator = load_test.LoadGenerator(load_test.parse_args(argv))
+
+    async def scenario():
+        await generator.client.aclose()
+        generator.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=_fake_backend(history)),
+                                             base_url="http://test")
+        return await generator.run()
+
+    report = asyncio.run(scenario())
+    turns = len(load_test.SCRIPTS["flight_status"])
+    endpoint = "/chat/stream" if stream else "/chat"
+    assert report["sessions_completed"] == 3 and report["failed"] == 0
+    assert report["latency"][endpoint]["count"] == 3 * turns
+    assert report["history_check"]["ok"] and report["history_check"]["messages"] == turns
+    assert (report["time_to_first_token"]["count"] == 3 * turns) if stream else report["time_to_first_token"] is None
+    assert "gemini_api_key" not in report["config"] and "admin_token" not in report["config"]
+
+
+def test_percentile_uses_nearest_rank():
+    ordered = [float(value) for value in range(1, 101)]
+    assert load_test.percentile(ordered, 50) == 50.0
+    assert load_test.percentile(ordered, 99) == 99.0
+    assert load_test.percentile([], 50) is None
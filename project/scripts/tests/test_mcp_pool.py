@@ -0,0 +1,67 @@
+import asyncio
+import os
+import shlex
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from src.agents.mcp_pool import MCPConnectionPool
+
+FAKE_SERVER = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_mcp_server.py"
+
+
+def _child_pids():
+    """Bu sürecin canlı alt süreçleri (Linux /proc üzerinden)."""
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # pid (comm) state ppid ...
+        state, ppid = stat.rsplit(")", 1)[1].split()[:2]
+        if int(ppid) == os.getpid() and state != "Z":
+            children.append(int(entry.name))
+    return children
+
+
+@pytest.mark.skipif(not Path("/proc").exists(), reason="requires /proc")
+def test_connection_opened_in_request_task_is_closed_from_another_task(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MCP_SERVER_COMMAND", f"{shlex.quote(sys.executable)} {shlex.quote(str(FAKE_SERVER))}")
+    monkeypatch.setenv("FAKE_MCP_LATENCY_MS", "0")
+
+    async def scenario():
+        pool = MCPConnectionPool(max_size_per_key=1)
+        # Bağlantı bir istek task'ında açılır, havuz ise lifespan task'ından kapatılır
+        client = await asyncio.create_task(pool.acquire("user", "secret"))
+        result = await client.call_tool("listAirports", {})
+        assert not result.isError
+        assert _child_pids()
+        await pool.close()
+        return _child_pids()
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=60)) == []
+
+
+@pytest.mark.skipif(not Path("/proc").exists(), reason="requires /proc")
+def test_hanging_server_times_out_and_is_shut_down(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    # MCP el sıkışmasına hiç cevap vermeyen sunucu (ör. takılan npx)
+    monkeypatch.setenv("MCP_SERVER_COMMAND", f"{shlex.quote(sys.executable)} -c 'import time; time.sleep(600)'")
+    monkeypatch.setenv("MCP_CONNECT_TIMEOUT", "0.5")
+
+    async def scenario():
+        pool = MCPConnectionPool(max_size_per_key=1)
+        with pytest.raises(ConnectionError):
+            await pool.acquire("user", "secret")
+        await pool.close()
+        return _child_pids(), [task for task in asyncio.all_tasks() if task.get_name().startswith("mcp-connection-")]
+
+    children, tasks = asyncio.run(asyncio.wait_for(scenario(), timeout=30))
+    assert children == [] and tasks == []
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from src.main.model import LLMInterface
+
+
+def _api_key(client):
+    return client.transport._credentials.token
+
+
+def test_each_instance_uses_its_own_api_key():
+    async def scenario():
+        first, second = LLMInterface(api_key="key-a"), LLMInterface(api_key="key-b")
+        return [(_api_key(llm.model._client), _api_key(llm._async_model()._async_client)) for llm in (first, second)]
+
+    assert asyncio.run(scenario()) == [("key-a", "key-a"), ("key-b", "key-b")]
+
+
+def test_shared_pool_returns_one_instance_per_key():
+    LLMInterface._shared_instances.clear()
+    first = LLMInterface.shared("key-a")
+    assert LLMInterface.shared("key-a") is first
+    assert LLMInterface.shared("key-b") is not first
+    assert _api_key(LLMInterface.shared("key-b").model._client) == "key-b"
+    assert LLMInterface.pool_stats()["api_keys"] == 2
+    LLMInterface._shared_instances.clear()
+
+
+class _SlowModel:
+    """generate_content_async yerine: eşzamanlı çağrı sayısını ölçer."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = self.peak = 0
+        self._async_client = object()
+
+    async def generate_content_async(self, question, generation_config=None, stream=False):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return type("Response", (), {"text": f"cevap: {question}", "usage_metadata": None})()
+
+
+def test_agenerate_limits_concurrent_calls(monkeypatch):
+    monkeypatch.setattr(LLMInterface, "_semaphore", None)
+    monkeypatch.setattr(LLMInterface, "max_concurrency", 2)
+    llm = LLMInterface(api_key="key-a", cache_policies={})
+    llm.model = _SlowModel(delay=0.02)
+
+    async def scenario():
+        return await asyncio.gather(*(llm.agenerate(f"soru {i}") for i in range(6)))
+
+    answers = asyncio.run(scenario())
+    assert answers == [f"cevap: soru {i}" for i in range(6)]
+    assert llm.model.peak == 2
+
+
+def test_agenerate_times_out_and_releases_its_slot(monkeypatch):
+    monkeypatch.setattr(LLMInterface, "_semaphore", None)
+    monkeypatch.setattr(LLMInterface, "max_concurrency", 1)
+    llm = LLMInterface(api_key="key-a", timeout=0.05, cache_policies={})
+    llm.model = _SlowModel(delay=1)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await llm.agenerate("yavaş soru")
+        llm.model.delay = 0
+        return await asyncio.wait_for(llm.agenerate("hızlı soru"), timeout=1)
+
+    assert asyncio.run(scenario()) == "cevap: hızlı soru"
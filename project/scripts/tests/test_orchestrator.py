@@ -0,0 +1,41 @@
+import pytest
+
+from src.agents.agent_orchestrator import is_more_results_request, is_small_talk
+
+
+@pytest.mark.parametrize("text", ["Iyi günler", "İYİ GÜNLER", "iyi günler", "Nasılsın?", "NASILSIN", "Teşekkürler!",
+                                  "Hoşça kal", "Thank you", "Hi"])
+def test_small_talk_is_detected_regardless_of_case(text):
+    assert is_small_talk(text)
+
+
+@pytest.mark.parametrize("text", ["İstanbul'dan Ankara'ya uçuş", "TK2124 durumu", "", "   "])
+def test_requests_are_not_small_talk(text):
+    assert not is_small_talk(text)
+
+
+@pytest.mark.parametrize("text", ["daha fazla göster", "DEVAMI", "Devamı?", "kalanlar"])
+def test_more_results_requests_are_detected_regardless_of_case(text):
+    assert is_more_results_request(text)
+
+
+def test_rules_defer_short_unmatched_messages_and_route_longer_ones():
+    from src.agents.agent_orchestrator import OrchestratorAgent
+
+    agent = OrchestratorAgent()
+    assert agent._decide_by_rules("Peki ya yarın?", None, None, 0.0) is None
+    assert agent._decide_by_rules("Bana bu hafta sonu için güzel bir öneri yapar mısın lütfen", None, None, 0.0) \
+        == "new_request"
+    assert agent._decide_by_rules("yarın, 2 kişi", {"tool": "searchFlights"}, None, 0.0) == "follow_up"
+
+
+@pytest.mark.parametrize("text", ["show me more", "Show me the rest", "more please", "kalanları göster",
+                                  "sonraki sonuçlar", "daha fazla seçenek gösterir misin"])
+def test_paging_phrases_are_detected(text):
+    assert is_more_results_request(text)
+
+
+@pytest.mark.parametrize("text", ["next flight?", "sonraki uçuş ne zaman", "more flights to Izmir",
+                                  "daha fazla bilgi ver TK2124", "teşekkürler"])
+def test_requests_with_other_terms_are_not_paging(text):
+    assert not is_more_results_request(text)
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import agent_select_tool
+from src.agents.agent_select_tool import ToolSelectingAgent
+from src.main.state import AgentContext
+from src.main.workflow import WorkflowEngine
+
+SEARCH = {"name": "searchFlights", "description": "Search flights", "input_schema": {}}
+STATUS = {"name": "getFlightStatus", "description": "Flight status", "input_schema": {}}
+
+
+class _Session:
+    def __init__(self, key, on_list_tools=None):
+        self.catalog_key = ("test", key, "digest")
+        self.on_list_tools = on_list_tools
+
+    async def list_tools(self):
+        if self.on_list_tools is not None:
+            await self.on_list_tools()
+        return SimpleNamespace(tools=[SimpleNamespace(name=tool["name"], description=tool["description"],
+                                                      inputSchema={}) for tool in (SEARCH, STATUS)])
+
+
+class _Store:
+    def __init__(self, before_load=None):
+        self.before_load = before_load
+        self.saved = []
+
+    async def aget_latest_conversation(self, session_id):
+        if self.before_load is not None:
+            await self.before_load()
+        return ["Human: merhaba", "AI: selam"]
+
+    def save_state(self, state, session_id=None, kind="state"):
+        self.saved.append((kind, state))
+
+
+def test_parallel_turn_start_loads_history_and_prefetches_the_catalog_together():
+    catalog_started = None
+
+    async def list_tools_started():
+        catalog_started.set()
+
+    async def wait_for_catalog():
+        # Sıralı çalışsaydı geçmiş yüklemesi katalog isteğini hiç görmeden zaman aşımına uğrardı
+        await asyncio.wait_for(catalog_started.wait(), timeout=1)
+
+    async def scenario(parallel):
+        nonlocal catalog_started
+        catalog_started = asyncio.Event()
+        engine = WorkflowEngine(client_session=_Session(f"prefetch-{parallel}", list_tools_started),
+                                data_store=_Store(wait_for_catalog), session_id="s1", parallel=parallel)
+        history, state = await engine._start_turn("uçuş ara")
+        return history, state
+
+    history, state = asyncio.run(scenario(parallel=True))
+    assert history == ["Human: merhaba", "AI: selam", "Human: uçuş ara"]
+    assert "load_context" in state["context"].node_timings
+
+    # Paralel mod kapalıyken katalog ön yüklemesi yapılmaz
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario(parallel=False))
+
+
+def test_catalog_prefetch_failure_does_not_fail_the_turn():
+    async def broken():
+        raise ConnectionError("MCP down")
+
+    async def scenario():
+        engine = WorkflowEngine(client_session=_Session("prefetch-broken", broken), data_store=_Store(),
+                                session_id="s1", parallel=True)
+        return await engine._start_turn("uçuş ara")
+
+    history, _ = asyncio.run(scenario())
+    assert history[-1] == "Human: uçuş ara"
+
+
+class _SpeculativeParameters:
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def process(self, state):
+        self.started.set()
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"tool_inputs": {"origin": "IST"}, "speculated_for": state["selected_tool"]["name"]}
+
+
+class _SelectingLLM:
+    def __init__(self, answer, parameters):
+        self.answer, self.parameters = answer, parameters
+
+    async def agenerate(self, prompt, agent=None, **kwargs):
+        # Spekülatif çıkarım, seçim LLM'i beklenirken başlamış olmalı
+        await asyncio.wait_for(self.parameters.started.wait(), timeout=1)
+        return self.answer
+
+
+def _select(monkeypatch, llm_answer, parallel=True, confidence=0.8):
+    async def shortlist(index, question):
+        return [SEARCH, STATUS], None, confidence
+
+    monkeypatch.setattr(agent_select_tool.tool_indexes, "shortlist", shortlist)
+    parameters = _SpeculativeParameters()
+    agent = ToolSelectingAgent(parameters)
+    context = AgentContext(llm_interface=_SelectingLLM(llm_answer, parameters),
+                           client_session=_Session(f"speculation-{llm_answer}-{parallel}"),
+                           data_store=_Store(), session_id="s1", parallel=parallel)
+
+    async def scenario():
+        return await agent.process({"context": context, "current_user_query": "İstanbul'dan uçuş"})
+
+    return asyncio.run(scenario()), parameters
+
+
+def test_speculative_parameters_are_used_when_the_llm_agrees(monkeypatch):
+    update, parameters = _select(monkeypatch, "searchFlights")
+    assert update["selected_tool"]["name"] == "searchFlights"
+    assert update["tool_inputs"] == {"origin": "IST"} and update["speculated_for"] == "searchFlights"
+    assert not parameters.cancelled
+
+
+def test_speculation_is_cancelled_when_the_llm_picks_another_tool(monkeypatch):
+    update, parameters = _select(monkeypatch, "getFlightStatus")
+    assert update == {"selected_tool": STATUS}
+    assert parameters.cancelled
+
+
+def test_no_speculation_below_the_confidence_threshold(monkeypatch):
+    with pytest.raises(asyncio.TimeoutError):
+        _select(monkeypatch, "searchFlights", confidence=0.1)
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from mcp import types
+
+from src.agents.result_compactor import ResultCompactor
+from src.agents.utils import _call_tool_unobserved
+from src.database.state_store import StateStore
+
+
+def _flights(count):
+    return {"count": count, "flights": [
+        {"flightNumber": f"TK{2100 + i}", "departureTime": "08:00", "price": 1000 + i,
+         "fareRules": "Change allowed with fee. Refund not allowed. " * 4} for i in range(count)]}
+
+
+def test_pages_are_not_compacted_again(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    context = SimpleNamespace(data_store=store, session_id="s1")
+    compactor = ResultCompactor()
+    compactor.token_budget, compactor.max_rows = 300, 5
+    try:
+        first = compactor.compact(context, {"ok": True, "result": json.dumps(_flights(30))}, "ucuz uçuş", "searchFlights")
+        assert first["overflow"]["shown_rows"] < 30
+
+        page = asyncio.run(compactor.next_page(context, "daha fazla göster"))
+        overflow_rows = len(store.get_state_history("s1", limit=100))
+        assert compactor.compact(context, page, "daha fazla göster", "searchFlights") is page
+        assert len(store.get_state_history("s1", limit=100)) == overflow_rows
+
+        # Sayfalama kaldığı yerden devam eder
+        second_page = asyncio.run(compactor.next_page(context, "daha fazla göster"))
+        assert second_page["overflow"]["first_row"] == page["overflow"]["first_row"] + page["overflow"]["shown_rows"]
+    finally:
+        store.close()
+
+
+class _FastMCPSession:
+    """FastMCP'nin `-> str` araçları gibi metni structuredContent'te {"result": ...} ile sarar."""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def call_tool(self, name, args):
+        return types.CallToolResult(content=[types.TextContent(type="text", text=self.text)],
+                                    structuredContent={"result": self.text}, isError=False)
+
+
+def test_wrapped_fastmcp_text_result_is_compacted_by_rows_and_pages(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    context = SimpleNamespace(data_store=store, session_id="s1")
+    compactor = ResultCompactor()
+    compactor.token_budget, compactor.max_rows = 300, 5
+    try:
+        result = asyncio.run(_call_tool_unobserved("searchFlights", {}, _FastMCPSession(json.dumps(_flights(30)))))
+        compacted = compactor.compact(context, result, "ucuz uçuş", "searchFlights")
+        assert compacted["result"]["count"] == 30
+        assert len(compacted["result"]["flights"]) == compacted["overflow"]["shown_rows"] < 30
+
+        page = asyncio.run(compactor.next_page(context, "daha fazla göster"))
+        assert page["overflow"]["first_row"] == compacted["overflow"]["shown_rows"] + 1
+        assert page["result"][0]["flightNumber"] == f"TK{2100 + compacted['overflow']['shown_rows']}"
+    finally:
+        store.close()
+
+
+def test_structured_object_results_are_kept_as_is():
+    class _Session:
+        async def call_tool(self, name, args):
+            return types.CallToolResult(content=[types.TextContent(type="text", text="{}")],
+                                        structuredContent={"flights": [], "count": 0}, isError=False)
+
+    assert asyncio.run(_call_tool_unobserved("searchFlights", {}, _Session())) == \
+        {"ok": True, "result": {"flights": [], "count": 0}}
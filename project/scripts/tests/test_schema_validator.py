@@ -0,0 +1,20 @@
+import math
+
+import pytest
+
+from src.agents.schema_validator import SchemaCompiler
+
+PRICE_SCHEMA = {"type": "object", "properties": {"maxPrice": {"type": "number"}}, "required": ["maxPrice"]}
+
+
+@pytest.mark.parametrize("value, expected", [("1500", 1500.0), (" 99.5 ", 99.5), (1200, 1200), (12.5, 12.5)])
+def test_numbers_are_coerced(value, expected):
+    result, errors = SchemaCompiler(PRICE_SCHEMA).compile()({"maxPrice": value})
+    assert errors == []
+    assert result["maxPrice"] == expected
+
+
+@pytest.mark.parametrize("value", ["nan", "NaN", "inf", "-Infinity", math.nan, math.inf, "ucuz"])
+def test_non_finite_and_non_numeric_values_are_rejected(value):
+    _, errors = SchemaCompiler(PRICE_SCHEMA).compile()({"maxPrice": value})
+    assert [error["field"] for error in errors] == ["maxPrice"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.main.session_registry import SessionRegistry
+
+
+class _Engine:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def _factory(name, created=None):
+    async def create():
+        await asyncio.sleep(0)
+        engine = _Engine(name)
+        if created is not None:
+            created.append(engine)
+        return engine
+    return create
+
+
+def test_concurrent_requests_for_a_session_create_one_engine():
+    registry = SessionRegistry(max_size=10, idle_ttl=60, sweep_interval=60)
+    created = []
+
+    async def scenario():
+        return await asyncio.gather(*(registry.get_or_create("s1", _factory("s1", created)) for _ in range(5)))
+
+    engines = asyncio.run(scenario())
+    assert len(created) == 1 and all(engine is created[0] for engine in engines)
+    assert registry.stats()["created"] == 1 and registry._locks == {}
+
+
+def test_least_recently_used_engine_is_evicted_and_closed():
+    registry = SessionRegistry(max_size=2, idle_ttl=60, sweep_interval=60)
+
+    async def scenario():
+        first = await registry.get_or_create("s1", _factory("s1"))
+        await registry.get_or_create("s2", _factory("s2"))
+        await registry.get_or_create("s1", _factory("s1"))  # s1 yeniden kullanıldı; en eski s2
+        await registry.get_or_create("s3", _factory("s3"))
+        return first
+
+    first = asyncio.run(scenario())
+    assert "s2" not in registry and "s1" in registry and "s3" in registry
+    assert not first.closed
+    assert registry.stats()["evicted_lru"] == 1
+
+
+def test_idle_sessions_are_swept_and_closed(monkeypatch):
+    registry = SessionRegistry(max_size=10, idle_ttl=30, sweep_interval=60)
+    clock = [1000.0]
+    monkeypatch.setattr("src.main.session_registry.time.monotonic", lambda: clock[0])
+
+    async def scenario():
+        idle = await registry.get_or_create("idle", _factory("idle"))
+        clock[0] += 20
+        active = await registry.get_or_create("active", _factory("active"))
+        clock[0] += 15
+        return idle, active, await registry.sweep()
+
+    idle, active, swept = asyncio.run(scenario())
+    assert swept == 1 and idle.closed and not active.closed
+    assert "idle" not in registry and "active" in registry
+
+
+def test_failed_factory_does_not_leak_the_session_lock():
+    registry = SessionRegistry(max_size=10, idle_ttl=60, sweep_interval=60)
+
+    async def failing():
+        raise ConnectionError("bad MCP credentials")
+
+    async def scenario():
+        for index in range(50):
+            with pytest.raises(ConnectionError):
+                await registry.get_or_create(f"attacker-{index}", failing)
+
+    asyncio.run(scenario())
+    assert registry._locks == {} and len(registry) == 0
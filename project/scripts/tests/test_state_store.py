@@ -0,0 +1,266 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from src.database.state_store import INSERT_MESSAGE_SQL, StateStore
+
+
+def test_async_reads_serve_cache_hits_without_touching_sqlite(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    try:
+        store.save_state({"final_answer": "ok"}, "s1", kind="turn")
+        store.append_messages("s1", ["Human: merhaba", "AI: selam"])
+        store.get_latest_conversation("s1")
+
+        # Yazıcı bağlantının kilidi başka bir thread'deyken de isabetler hemen dönmeli
+        with store._lock:
+            async def read():
+                return await asyncio.wait_for(asyncio.gather(
+                    store.aget_latest_state("s1", "turn"),
+                    store.aget_latest_conversation("s1"),
+                ), timeout=1)
+            state, history = asyncio.run(read())
+        assert state == {"final_answer": "ok"}
+        assert history == ["Human: merhaba", "AI: selam"]
+    finally:
+        store.close()
+
+
+def test_async_read_miss_sees_rows_still_in_the_write_queue(tmp_path):
+    # Önbellek tek kaydı bile tutamayacak kadar küçük: okuma kuyruğu yazıp diskten okumalı
+    store = StateStore(str(tmp_path / "state.db"), durability="batched", flush_interval_ms=60_000,
+                       cache_max_bytes=1, coherence="local")
+    try:
+        store.save_state({"final_answer": "queued"}, "s1", kind="turn")
+        store.append_messages("s1", ["Human: merhaba"])
+
+        async def read():
+            assert store._pending
+            return await store.aget_latest_state("s1", "turn"), await store.aget_latest_conversation("s1")
+
+        state, history = asyncio.run(read())
+        assert state == {"final_answer": "queued"}
+        assert history == ["Human: merhaba"]
+    finally:
+        store.close()
+
+
+def _workers(tmp_path):
+    """Aynı dosyayı paylaşan iki worker'ın StateStore'ları."""
+    path = str(tmp_path / "state.db")
+    return StateStore(path, coherence="validate"), StateStore(path, coherence="validate")
+
+
+def test_validate_mode_sees_writes_from_another_worker(tmp_path):
+    first, second = _workers(tmp_path)
+    try:
+        async def scenario():
+            first.append_messages("s1", ["Human: merhaba", "AI: selam"])
+            first.save_state({"last_tool": "searchFlights"}, "s1", kind="turn")
+            await first.aflush_turn()
+            assert await second.aget_latest_conversation("s1") == ["Human: merhaba", "AI: selam"]
+            assert await second.aget_latest_state("s1", "turn") == {"last_tool": "searchFlights"}
+
+            # İkinci worker turu sürdürür; birincinin önbelleği artık eski
+            second.append_messages("s1", ["Human: yarın", "AI: tamam"])
+            second.save_state({"last_tool": "getFlightStatus"}, "s1", kind="turn")
+            await second.aflush_turn()
+            # Birinci worker eski önbelleğin üzerine kendi mesajlarını ekler
+            first.append_messages("s1", ["Human: teşekkürler", "AI: rica ederim"])
+            await first.aflush_turn()
+            return await first.aget_latest_conversation("s1"), await first.aget_latest_state("s1", "turn")
+
+        history, turn = asyncio.run(scenario())
+        assert history == ["Human: merhaba", "AI: selam", "Human: yarın", "AI: tamam",
+                           "Human: teşekkürler", "AI: rica ederim"]
+        assert turn == {"last_tool": "getFlightStatus"}
+        assert first.cache_stats()["stale_reads"] >= 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_validate_mode_skips_the_version_query_when_nobody_else_wrote(tmp_path):
+    first, second = _workers(tmp_path)
+    try:
+        first.save_state({"n": 1}, "s1", kind="turn")
+        first.flush()
+        assert first.get_latest_state("s1", "turn") == {"n": 1}
+        queries = []
+        first._conn.set_trace_callback(queries.append)
+        assert first.get_latest_state("s1", "turn") == {"n": 1}
+        assert not any("FROM workflow_states" in query for query in queries)
+
+        second.save_state({"n": 2}, "s1", kind="turn")
+        second.flush()
+        assert first.get_latest_state("s1", "turn") == {"n": 2}
+    finally:
+        first._conn.set_trace_callback(None)
+        first.close()
+        second.close()
+
+
+def _open_store(path, barrier, results):
+    barrier.wait()
+    try:
+        StateStore(path, durability="sync").close()
+        results.put("ok")
+    except Exception as e:
+        results.put(f"{type(e).__name__}: {e}")
+
+
+def test_concurrent_workers_migrate_a_legacy_database_once(tmp_path):
+    import multiprocessing
+    import sqlite3
+
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE workflow_states (id TEXT PRIMARY KEY, session_id TEXT, state_data TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        status TEXT DEFAULT 'active')""")
+        conn.execute("INSERT INTO workflow_states (id, session_id, state_data) VALUES ('1', 's1', ?)",
+                     ('{"conversation_history": ["Human: merhaba", "AI: selam"]}',))
+
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(4), context.Queue()
+    workers = [context.Process(target=_open_store, args=(path, barrier, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert outcomes == ["ok"] * 4
+    store = StateStore(path, durability="sync")
+    try:
+        assert store.get_latest_conversation("s1") == ["Human: merhaba", "AI: selam"]
+    finally:
+        store.close()
+
+
+def test_one_bad_row_is_dropped_instead_of_blocking_the_write_queue(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), durability="batched", flush_interval_ms=60_000, coherence="local")
+    try:
+        store.append_messages("s1", ["Human: merhaba"])
+        # content NOT NULL kısıtını ihlal eden kayıt
+        store._enqueue(INSERT_MESSAGE_SQL, ("s1", "s1", "AI", None, datetime.now()))
+        store.append_messages("s1", ["AI: selam"])
+        store.save_state({"final_answer": "selam"}, "s1", kind="turn")
+
+        assert store.flush() == 3
+        assert store._pending == [] and store.dropped_rows == 1
+
+        store.append_messages("s2", ["Human: yeni oturum"])
+        assert store.flush() == 1
+        store._cache.discard_where(lambda key: True)
+        assert store.get_latest_conversation("s1") == ["Human: merhaba", "AI: selam"]
+        assert store.get_latest_state("s1", "turn") == {"final_answer": "selam"}
+    finally:
+        store.close()
+
+
+def test_rows_stay_queued_while_the_database_is_locked(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path, durability="batched", flush_interval_ms=60_000, coherence="local")
+    store._conn.execute("PRAGMA busy_timeout=0")
+    other = sqlite3.connect(path, isolation_level=None)
+    try:
+        store.append_messages("s1", ["Human: merhaba", "AI: selam"])
+        other.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            store.flush()
+        assert len(store._pending) == 2 and store.dropped_rows == 0
+
+        other.execute("ROLLBACK")
+        assert store.flush() == 2
+    finally:
+        other.close()
+        store.close()
+
+
+def test_latest_state_is_the_newest_row_of_its_kind(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path, durability="sync", coherence="local")
+    try:
+        store.save_state({"final_answer": "ilk"}, "s1", kind="turn")
+        store.save_state({"summary": "özet", "upto": 4}, "s1", kind="summary")
+        store.save_state({"final_answer": "son"}, "s1", kind="turn")
+        store.save_state({"final_answer": "başka oturum"}, "s2", kind="turn")
+    finally:
+        store.close()
+
+    reopened = StateStore(path, coherence="local")
+    try:
+        assert reopened.get_latest_state("s1", "turn") == {"final_answer": "son"}
+        assert reopened.get_latest_state("s1", "summary") == {"summary": "özet", "upto": 4}
+        assert reopened.get_latest_state("s1", "tool_overflow") is None
+    finally:
+        reopened.close()
+
+
+def test_conversation_is_stored_one_row_per_message_in_order(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path, durability="batched", flush_interval_ms=60_000, coherence="local")
+    try:
+        store.append_messages("s1", ["Human: merhaba", "AI: selam: nasıl yardımcı olabilirim?"])
+        store.append_messages("s1", ["Human: uçuş ara", "AI: Hangi tarih?"])
+        store.append_messages("s2", ["Human: başka oturum"])
+    finally:
+        store.close()
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT seq, role FROM conversation_messages WHERE session_id = 's1' ORDER BY seq").fetchall()
+    assert rows == [(1, "Human"), (2, "AI"), (3, "Human"), (4, "AI")]
+
+    reopened = StateStore(path, coherence="local")
+    try:
+        # Yeniden açılan depo sıra numaralarına kaldığı yerden devam eder
+        reopened.append_messages("s1", ["Human: teşekkürler"])
+        assert reopened.get_latest_conversation("s1") == [
+            "Human: merhaba", "AI: selam: nasıl yardımcı olabilirim?",
+            "Human: uçuş ara", "AI: Hangi tarih?", "Human: teşekkürler"]
+        assert reopened.get_latest_conversation("s2") == ["Human: başka oturum"]
+        assert reopened.get_latest_conversation("yok") == []
+    finally:
+        reopened.close()
+
+
+def test_active_history_is_served_from_the_byte_bounded_cache(tmp_path):
+    message = "Human: " + "x" * 100
+    store = StateStore(str(tmp_path / "state.db"), durability="sync", coherence="local",
+                       cache_max_bytes=3 * len(message.encode("utf-8")))
+    try:
+        for session_id in ("s1", "s2", "s3"):
+            store.append_messages(session_id, [message])
+            store.get_latest_conversation(session_id)
+        hits = store.cache_stats()["hits"]
+        assert store.get_latest_conversation("s3") == [message]
+        assert store.cache_stats()["hits"] == hits + 1
+
+        # Eklenen mesajlar önbellekteki geçmişe de eklenir; bütçe aşılınca en eski oturum düşer
+        store.append_messages("s3", ["AI: selam"])
+        stats = store.cache_stats()
+        assert stats["evictions"] >= 1 and stats["bytes"] <= stats["max_bytes"]
+        assert store._cache.peek(("conversation", "s1")) is None
+        assert store.get_latest_conversation("s3") == [message, "AI: selam"]
+        assert store.get_latest_conversation("s1") == [message]
+    finally:
+        store.close()
+
+
+def test_shared_store_keeps_one_wal_connection_per_database(tmp_path, monkeypatch):
+    path = tmp_path / "state.db"
+    monkeypatch.chdir(tmp_path)
+    try:
+        store = StateStore.shared(str(path))
+        assert StateStore.shared("state.db") is store
+        assert StateStore.shared(str(tmp_path / "other.db")) is not store
+        connection = store._conn
+        store.save_state({"final_answer": "ok"}, "s1", kind="turn")
+        store.get_latest_state("s1", "turn")
+        assert store._conn is connection
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        StateStore.close_shared()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from src.main.telemetry import NOOP_SPAN, Telemetry
+
+
+def test_disabled_telemetry_is_a_no_op():
+    telemetry = Telemetry(enabled=False)
+
+    def work():
+        return 42
+
+    assert telemetry.span("graph.node", "graph_node_duration_seconds", node="x") is NOOP_SPAN
+    assert telemetry.traced("state_store.flush")(work) is work
+    telemetry.increment("llm_tokens_total", 10, agent="x", type="prompt")
+    assert telemetry.recent_spans() == []
+    assert telemetry.render_prometheus().startswith("# telemetry disabled")
+
+
+def test_nested_spans_share_the_trace_and_record_errors():
+    telemetry = Telemetry(enabled=True)
+
+    async def turn():
+        with telemetry.span("workflow.turn", "workflow_turn_duration_seconds", mode="invoke") as root:
+            root.set_attribute("session_id", "s1")
+            with telemetry.span("graph.orchestrator_agent", "graph_node_duration_seconds", node="orchestrator_agent"):
+                await asyncio.sleep(0)
+            with pytest.raises(RuntimeError):
+                with telemetry.span("mcp.call_tool", "mcp_request_duration_seconds", tool="searchFlights"):
+                    raise RuntimeError("boom")
+
+    asyncio.run(turn())
+    node, tool, root = telemetry.recent_spans()
+    assert root["parent_id"] is None and root["attributes"] == {"mode": "invoke", "session_id": "s1"}
+    assert node["trace_id"] == tool["trace_id"] == root["trace_id"]
+    assert node["parent_id"] == tool["parent_id"] == root["span_id"]
+    assert tool["status"] == "error" and node["status"] == "ok"
+    assert all(span["duration_ms"] >= 0 for span in (node, tool, root))
+
+
+def test_prometheus_rendering_of_histograms_and_counters():
+    telemetry = Telemetry(enabled=True)
+    telemetry.observe("llm_request_duration_seconds", 0.02, agent="output_generation", status="ok")
+    telemetry.observe("llm_request_duration_seconds", 3.0, agent="output_generation", status="ok")
+    telemetry.increment("llm_tokens_total", 120, agent='say "hi"', type="prompt")
+
+    lines = telemetry.render_prometheus().splitlines()
+    labels = 'agent="output_generation",status="ok"'
+    assert "# TYPE llm_request_duration_seconds histogram" in lines
+    # Kovalar kümülatiftir
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="0.01"}} 0' in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="0.025"}} 1' in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="5.0"}} 2' in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"llm_request_duration_seconds_sum{{{labels}}} 3.02" in lines
+    assert f"llm_request_duration_seconds_count{{{labels}}} 2" in lines
+    assert "# TYPE llm_tokens_total counter" in lines
+    assert 'llm_tokens_total{agent="say \\"hi\\"",type="prompt"} 120' in lines
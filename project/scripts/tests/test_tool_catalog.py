@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.agents.tool_catalog import ToolCatalogCache
+
+
+class _Session:
+    """list_tools çağrılarını sayan, istenirse bir olaya kadar bekleyen sahte MCP oturumu."""
+
+    catalog_key = ("endpoint", "user", "digest")
+
+    def __init__(self):
+        self.calls = 0
+        self.tool_names = ["searchFlights"]
+        self.release = None
+
+    async def list_tools(self):
+        self.calls += 1
+        names = list(self.tool_names)
+        if self.release is not None:
+            await self.release.wait()
+        return SimpleNamespace(tools=[SimpleNamespace(name=name, description="", inputSchema={}) for name in names])
+
+
+def test_concurrent_gets_share_one_list_tools_call():
+    catalog, session = ToolCatalogCache(ttl_seconds=60), _Session()
+
+    async def scenario():
+        return await asyncio.gather(*(catalog.get(session) for _ in range(5)))
+
+    entries = asyncio.run(scenario())
+    assert session.calls == 1 and all(entry is entries[0] for entry in entries)
+
+
+def test_invalidate_refreshes_with_a_new_version():
+    catalog, session = ToolCatalogCache(ttl_seconds=60), _Session()
+
+    async def scenario():
+        first = await catalog.get(session)
+        session.tool_names = ["searchFlights", "getFlightStatus"]
+        catalog.invalidate(session.catalog_key)
+        return first, await catalog.get(session)
+
+    first, second = asyncio.run(scenario())
+    assert session.calls == 2 and second.version == first.version + 1
+    assert [tool["name"] for tool in second.tools] == ["searchFlights", "getFlightStatus"]
+
+
+def test_invalidation_during_refresh_does_not_cache_the_stale_list():
+    catalog, session = ToolCatalogCache(ttl_seconds=60), _Session()
+
+    async def scenario():
+        session.release = asyncio.Event()
+        refresh = asyncio.create_task(catalog.get(session))
+        await asyncio.sleep(0)
+        # list_changed bildirimi, eski liste yoldayken gelir
+        session.tool_names = ["searchFlights", "getFlightStatus"]
+        catalog.invalidate(session.catalog_key)
+        session.release.set()
+        stale = await refresh
+
+        session.release = None
+        return stale, await catalog.get(session)
+
+    stale, fresh = asyncio.run(scenario())
+    assert [tool["name"] for tool in stale.tools] == ["searchFlights"]
+    assert session.calls == 2
+    assert [tool["name"] for tool in fresh.tools] == ["searchFlights", "getFlightStatus"]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from src.agents.tool_index import ToolIndex, ToolIndexRegistry, tokenize
+
+TOOLS = [
+    {"name": "getFlightInfo", "description": "Get information about a flight by flight number.",
+     "input_schema": {"properties": {"flightNumber": {"description": "Flight number, e.g. TK2124"}}}},
+    {"name": "searchFlights", "description": "Search flights from Istanbul or other airports on a date.",
+     "input_schema": {"properties": {"origin": {}, "destination": {}, "date": {}}}},
+    {"name": "listAirports", "description": "List the airports that are served.", "input_schema": {}},
+]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("getFlightInfo", ["get", "fligh", "info"]),
+    ("flight info", ["fligh", "info"]),
+    ("GET_FLIGHT_INFO", ["get", "fligh", "info"]),
+    ("Istanbul", ["istan"]),
+    ("İSTANBUL", ["istan"]),
+    ("ıstanbul", ["istan"]),
+    ("IST", ["ist"]),
+    ("Uçuşları göster", ["uçuşl", "göste"]),
+    ("a b", []),
+])
+def test_tokenize_folds_case_and_turkish_i_identically(text, expected):
+    assert tokenize(text) == expected
+
+
+def test_tool_names_and_queries_share_terms_regardless_of_case():
+    assert tokenize("getFlightInfo") == tokenize("GET flight INFO")
+    assert tokenize("Istanbul") == tokenize("istanbul") == tokenize("ISTANBUL")
+
+
+def _shortlist(query, **settings):
+    registry = ToolIndexRegistry()
+    for name, value in settings.items():
+        setattr(registry, name, value)
+    return asyncio.run(registry.shortlist(ToolIndex(TOOLS), query))
+
+
+@pytest.mark.parametrize("query", ["FLIGHT INFO for TK2124", "Flight Info For Tk2124", "flıght ınfo for tk2124"])
+def test_shortlist_ranks_independently_of_letter_case(query):
+    candidates, _, confidence = _shortlist(query)
+    expected_candidates, _, expected_confidence = _shortlist("flight info for tk2124")
+    assert candidates[0]["name"] == "getFlightInfo"
+    assert [tool["name"] for tool in candidates] == [tool["name"] for tool in expected_candidates]
+    assert confidence == expected_confidence
+
+
+def test_shortlist_fast_path_fires_for_a_clear_match():
+    candidates, fast_path, confidence = _shortlist("list airports", fast_path_confidence=0.8, fast_path_min_score=1.0)
+    assert fast_path is not None and fast_path["name"] == "listAirports"
+    assert candidates[0] is fast_path
+    assert confidence >= 0.8
+
+
+def test_shortlist_returns_whole_catalog_when_nothing_matches():
+    candidates, fast_path, confidence = _shortlist("merhaba nasılsın")
+    assert candidates == TOOLS
+    assert fast_path is None and confidence == 0.0
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from src.agents.tool_result_cache import ToolResultCache
+
+ACCOUNT = ("endpoint", "user", "digest")
+
+
+def _cache():
+    return ToolResultCache(ttls={"searchFlights": 60}, default_ttl=0)
+
+
+def _slow_call(calls, delay=0.3, result=None):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result or {"ok": True, "content": "flights"}
+    return call
+
+
+def test_leader_timeout_does_not_cancel_coalesced_waiters():
+    cache = _cache()
+    calls = []
+
+    async def scenario():
+        call = _slow_call(calls)
+        leader = asyncio.create_task(asyncio.wait_for(
+            cache.get_or_call(ACCOUNT, "searchFlights", {"origin": "IST"}, call), timeout=0.1))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(asyncio.wait_for(
+            cache.get_or_call(ACCOUNT, "searchFlights", {"origin": "IST"}, call), timeout=5))
+        leader_outcome, waiter_outcome = await asyncio.gather(leader, waiter, return_exceptions=True)
+        # Sonuç, lider zaman aşımına uğrasa da önbelleğe yazılır
+        cached = await cache.get_or_call(ACCOUNT, "searchFlights", {"origin": "IST"}, call)
+        return leader_outcome, waiter_outcome, cached
+
+    leader_outcome, waiter_outcome, cached = asyncio.run(scenario())
+    assert isinstance(leader_outcome, asyncio.TimeoutError)
+    assert waiter_outcome == {"ok": True, "content": "flights"}
+    assert cached == waiter_outcome
+    assert len(calls) == 1
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_call_is_cancelled_once_every_waiter_gave_up():
+    cache = _cache()
+    calls = []
+
+    async def scenario():
+        call = _slow_call(calls, delay=5)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.get_or_call(ACCOUNT, "searchFlights", {}, call), timeout=0.05)
+        assert cache.stats()["in_flight"] == 0
+        # Sonraki istek iptal edilmiş çağrıya eklenmez, yeni bir çağrı başlatır
+        return await cache.get_or_call(ACCOUNT, "searchFlights", {}, _slow_call(calls, delay=0))
+
+    assert asyncio.run(scenario()) == {"ok": True, "content": "flights"}
+    assert len(calls) == 2
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = _cache()
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ConnectionError("boom")
+
+    async def scenario():
+        outcomes = await asyncio.gather(*(cache.get_or_call(ACCOUNT, "searchFlights", {}, failing) for _ in range(3)),
+                                        return_exceptions=True)
+        return outcomes, cache.stats()
+
+    outcomes, stats = asyncio.run(scenario())
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+    assert stats["coalesced"] == 2 and stats["entries"] == 0 and stats["in_flight"] == 0
+
+
+def test_read_only_results_are_cached_per_account_until_they_expire(monkeypatch):
+    cache, calls = _cache(), []
+    clock = [100.0]
+    monkeypatch.setattr("src.agents.tool_result_cache.time.monotonic", lambda: clock[0])
+
+    async def scenario():
+        call = _slow_call(calls, delay=0)
+        args = {"origin": "IST", "destination": "ESB"}
+        await cache.get_or_call(ACCOUNT, "searchFlights", args, call)
+        # Argüman sırası anahtarı değiştirmez
+        await cache.get_or_call(ACCOUNT, "searchFlights", {"destination": "ESB", "origin": "IST"}, call)
+        assert len(calls) == 1
+        # Başka bir MCP hesabının sonucu paylaşılmaz
+        await cache.get_or_call(("endpoint", "other", "digest"), "searchFlights", args, call)
+        assert len(calls) == 2
+        clock[0] += 61
+        await cache.get_or_call(ACCOUNT, "searchFlights", args, call)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_tools_without_a_ttl_are_never_cached_or_coalesced():
+    cache, calls = _cache(), []
+
+    async def scenario():
+        call = _slow_call(calls, delay=0.01)
+        await asyncio.gather(*(cache.get_or_call(ACCOUNT, "bookFlight", {"flight": "TK1"}, call) for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert len(calls) == 3 and cache.stats()["entries"] == 0
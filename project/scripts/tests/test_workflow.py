@@ -0,0 +1,90 @@
+import asyncio
+
+from src.database.state_store import StateStore
+from src.main import workflow
+from src.main.workflow import WorkflowEngine
+
+
+class _FakeGraph:
+    """Derlenmiş graph yerine: iki düğüm çalıştırır, cevabı token token akıtır."""
+
+    def __init__(self, tokens=("Mer", "ha", "ba")):
+        self.tokens = tokens
+
+    async def astream(self, state, stream_mode):
+        yield {"orchestrator_agent": {"route": "small_talk"}}
+        on_token = state["context"].on_token
+        for token in self.tokens:
+            await asyncio.sleep(0.01)
+            if on_token is not None:
+                await on_token(token)
+        yield {"output_generation_agent": {"answer": "".join(self.tokens)}}
+
+    async def ainvoke(self, state):
+        final_state = dict(state)
+        async for update in self.astream(state, "updates"):
+            for values in update.values():
+                final_state.update(values)
+        return final_state
+
+
+def _engine(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    engine = WorkflowEngine(data_store=store, session_id="s1")
+    engine.runnable = _FakeGraph()
+    return engine, store
+
+
+def test_stream_emits_nodes_tokens_and_done_then_persists_the_turn(tmp_path):
+    engine, store = _engine(tmp_path)
+    try:
+        async def scenario():
+            return [event async for event in engine.astream("merhaba")]
+
+        events = asyncio.run(scenario())
+        assert [event["event"] for event in events] == ["node", "token", "token", "token", "node", "done"]
+        assert events[-1]["answer"] == "Merhaba"
+        assert store.get_latest_conversation("s1") == ["Human: merhaba", "AI: Merhaba"]
+        assert store.get_latest_state("s1", "turn")["final_answer"] == "Merhaba"
+    finally:
+        store.close()
+
+
+def test_turn_is_persisted_when_the_stream_consumer_disconnects(tmp_path):
+    engine, store = _engine(tmp_path)
+    try:
+        async def scenario():
+            stream = engine.astream("merhaba")
+            assert (await stream.__anext__())["event"] == "node"
+            assert (await stream.__anext__())["event"] == "token"
+            # SSE istemcisi koptu: StreamingResponse üreteci kapatır
+            await stream.aclose()
+            assert workflow._detached_turns
+            await asyncio.gather(*workflow._detached_turns)
+            return await store.aget_latest_conversation("s1")
+
+        # Akış ve /chat aynı geçmişi görür
+        assert asyncio.run(scenario()) == ["Human: merhaba", "AI: Merhaba"]
+        assert not workflow._detached_turns
+    finally:
+        store.close()
+
+
+def test_graph_is_compiled_once_and_sessions_travel_in_the_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(workflow, "_compiled_graph", None)
+    compiled = []
+    build_graph = workflow.build_graph
+
+    def counting_build_graph():
+        compiled.append(1)
+        return build_graph()
+
+    monkeypatch.setattr(workflow, "build_graph", counting_build_graph)
+    store = StateStore(str(tmp_path / "state.db"), coherence="local")
+    try:
+        first = WorkflowEngine(data_store=store, session_id="s1")
+        second = WorkflowEngine(data_store=store, session_id="s2")
+        assert len(compiled) == 1 and first.runnable is second.runnable
+        assert (first.context.session_id, second.context.session_id) == ("s1", "s2")
+    finally:
+        store.close()